@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""碰撞避让基准：在笔画最多的 MMH 字形上对比空间哈希版与逐点参考实现。
+
+用法:
+	python scripts/bench_collision.py [--merged PATH] [--top 20] [--min-distance 0.03]
+缺少 MMH 数据时使用随机生成的密集字形。
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+from src.parser import normalize_medians_1024
+from src.constraints import apply_collision_avoidance, _apply_collision_avoidance_reference
+
+MERGED_DEFAULT = ROOT / "mmh_pipeline" / "data" / "hanzi_data_full.json"
+
+
+def load_dense_glyphs(path: Path, top: int) -> List[Tuple[str, List[List[Tuple[float, float]]]]]:
+	if not path.exists():
+		return []
+	with open(path, "r", encoding="utf-8") as f:
+		merged: Dict[str, Any] = json.load(f)
+	items = [(ch, meta.get("medians", [])) for ch, meta in merged.items() if isinstance(meta, dict)]
+	items.sort(key=lambda kv: (len(kv[1]), sum(len(s) for s in kv[1])), reverse=True)
+	return [(ch, normalize_medians_1024(med)) for ch, med in items[:top]]
+
+
+def synthetic_glyphs(top: int, seed: int = 7) -> List[Tuple[str, List[List[Tuple[float, float]]]]]:
+	rng = random.Random(seed)
+	res = []
+	for k in range(top):
+		med = []
+		for _ in range(20 + k % 12):
+			x0, y0 = rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9)
+			ang = rng.uniform(0, 2 * math.pi)
+			L = rng.uniform(0.15, 0.6)
+			n = rng.randint(6, 24)
+			med.append([(x0 + L * t / (n - 1) * math.cos(ang), y0 + L * t / (n - 1) * math.sin(ang)) for t in range(n)])
+		res.append((f"synthetic_{k}", med))
+	return res
+
+
+def _timeit(fn, repeat: int) -> float:
+	best = float("inf")
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - t0)
+	return best
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--merged", type=Path, default=MERGED_DEFAULT)
+	ap.add_argument("--top", type=int, default=20)
+	ap.add_argument("--min-distance", type=float, default=0.03)
+	ap.add_argument("--strength", type=float, default=0.8)
+	ap.add_argument("--iterations", type=int, default=2)
+	ap.add_argument("--repeat", type=int, default=3)
+	args = ap.parse_args()
+
+	glyphs = load_dense_glyphs(args.merged, args.top)
+	if not glyphs:
+		print(f"[BENCH] 未找到 MMH 数据 {args.merged}，改用随机密集字形")
+		glyphs = synthetic_glyphs(args.top)
+
+	total_ref = total_new = 0.0
+	worst = 0.0
+	print(f"{'char':>14} {'strokes':>7} {'points':>6} {'ref ms':>8} {'hash ms':>8} {'max |diff|':>11}")
+	for ch, med in glyphs:
+		kw = dict(min_distance=args.min_distance, strength=args.strength, iterations=args.iterations)
+		ref = _apply_collision_avoidance_reference(med, **kw)
+		new = apply_collision_avoidance(med, **kw)
+		diff = max((abs(p[0] - q[0]) + abs(p[1] - q[1]) for a, b in zip(ref, new) for p, q in zip(a, b)), default=0.0)
+		t_ref = _timeit(lambda: _apply_collision_avoidance_reference(med, **kw), args.repeat)
+		t_new = _timeit(lambda: apply_collision_avoidance(med, **kw), args.repeat)
+		total_ref += t_ref
+		total_new += t_new
+		worst = max(worst, diff)
+		print(f"{ch:>14} {len(med):>7} {sum(len(s) for s in med):>6} {t_ref*1e3:>8.2f} {t_new*1e3:>8.2f} {diff:>11.2e}")
+	speedup = total_ref / max(total_new, 1e-12)
+	print(f"[BENCH] total ref={total_ref*1e3:.1f}ms hash={total_new*1e3:.1f}ms speedup={speedup:.1f}x max|diff|={worst:.2e}")
+
+
+if __name__ == "__main__":
+	main()
@@ -52,20 +52,74 @@ def resample_uniform(points: List[Point], n: int) -> List[Point]:
     return res
 
 
+def _chaikin_packed(P: np.ndarray, offsets: np.ndarray, iters: int) -> Tuple[np.ndarray, np.ndarray]:
+    """对 stroke-offset 布局的所有笔画同时做 Chaikin 细分（每笔至少 2 点）。
+
+    每轮 n 点 -> 2n 点：首点、每条线段的 Q/R、尾点，写入预分配数组；
+    跨笔画的伪线段不参与。
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    for _ in range(iters):
+        n = P.shape[0]
+        starts = offsets[:-1]
+        ends = offsets[1:] - 1
+        out = np.empty((2 * n, 2), dtype=float)
+        seg = np.ones(n - 1, dtype=bool)
+        seg[ends[ends < n - 1]] = False
+        i = np.nonzero(seg)[0]
+        p0 = P[i]
+        p1 = P[i + 1]
+        out[2 * i + 1] = 0.75 * p0 + 0.25 * p1
+        out[2 * i + 2] = 0.25 * p0 + 0.75 * p1
+        out[2 * starts] = P[starts]
+        out[2 * ends + 1] = P[ends]
+        P = out
+        offsets = offsets * 2
+    return P, offsets
+
+
 def chaikin(points: List[Point], iters: int) -> List[Point]:
     if iters <= 0 or len(points) < 3:
         return points
-    pts = np.asarray(points, dtype=float)
-    for _ in range(iters):
-        new_pts = [pts[0]]
-        for i in range(len(pts) - 1):
-            p0, p1 = pts[i], pts[i + 1]
-            Q = 0.75 * p0 + 0.25 * p1
-            R = 0.25 * p0 + 0.75 * p1
-            new_pts.extend([tuple(Q), tuple(R)])
-        new_pts.append(tuple(pts[-1]))
-        pts = np.asarray(new_pts, dtype=float)
-    return [(float(x), float(y)) for x, y in pts]
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    P, _ = _chaikin_packed(P, np.array([0, len(P)], dtype=np.int64), iters)
+    return [(float(x), float(y)) for x, y in P.tolist()]
+
+
+def _length_preserving_adjust_packed(P: np.ndarray, offsets: np.ndarray, orig_start: np.ndarray,
+                                     orig_end: np.ndarray, target_len: np.ndarray,
+                                     active: np.ndarray | None = None) -> np.ndarray:
+    """_length_preserving_adjust 的数组版本，按笔画同时处理。
+
+    每笔：线段向量统一缩放 s = target_len / L1，从 orig_start 累加；
+    再把尾点与 orig_end 的差按 i/(n-1) 线性分摊。active 为 False 的笔画保持不变。
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    nstroke = len(counts)
+    if P.shape[0] == 0 or nstroke == 0:
+        return P
+    starts = offsets[:-1]
+    sid = np.repeat(np.arange(nstroke), counts)
+    d = np.zeros_like(P)
+    d[1:] = P[1:] - P[:-1]
+    d[starts[counts > 0]] = 0.0  # 每笔首点不继承上一笔的差分
+    seglen = np.sqrt(np.einsum('ij,ij->i', d, d))
+    L1 = np.bincount(sid, weights=seglen, minlength=nstroke)
+    ok = (counts >= 2) & (L1 > 1e-12)
+    if active is not None:
+        ok &= np.asarray(active, dtype=bool)
+    if not np.any(ok):
+        return P
+    scale = np.where(ok, np.asarray(target_len, dtype=float) / np.where(L1 > 1e-12, L1, 1.0), 1.0)
+    C = np.cumsum(d * scale[sid][:, None], axis=0)
+    first = np.minimum(starts, P.shape[0] - 1)
+    q = np.asarray(orig_start, dtype=float)[sid] + (C - C[first][sid])
+    last = offsets[1:] - 1
+    tail = np.asarray(orig_end, dtype=float) - q[np.maximum(last, 0)]
+    w = (np.arange(P.shape[0]) - starts[sid]) / np.maximum(counts - 1, 1)[sid]
+    q += w[:, None] * tail[sid]
+    return np.where(ok[sid][:, None], q, P)
 
 
 def _length_preserving_adjust(smoothed: List[Point], orig_start: Point, orig_end: Point, target_len: float) -> List[Point]:
@@ -76,41 +130,54 @@ def _length_preserving_adjust(smoothed: List[Point], orig_start: Point, orig_end
     """
     if len(smoothed) < 2:
         return smoothed
-    L1 = _length(smoothed)
-    if L1 <= 1e-12:
+    P = np.asarray(smoothed, dtype=float).reshape(-1, 2)
+    if _length(smoothed) <= 1e-12:
         return smoothed
-    s = float(target_len / L1)
-    q: List[Point] = [orig_start]
-    for i in range(len(smoothed) - 1):
-        dx = smoothed[i+1][0] - smoothed[i][0]
-        dy = smoothed[i+1][1] - smoothed[i][1]
-        q.append((q[-1][0] + s * dx, q[-1][1] + s * dy))
-    # Anchor tail to original end by distributing delta
-    dx_tail = orig_end[0] - q[-1][0]
-    dy_tail = orig_end[1] - q[-1][1]
-    n = len(q)
-    if n > 1:
-        out: List[Point] = []
-        for i, (x, y) in enumerate(q):
-            w = i / float(n - 1)
-            out.append((x + w * dx_tail, y + w * dy_tail))
-        return out
-    return q
+    out = _length_preserving_adjust_packed(
+        P, np.array([0, len(P)], dtype=np.int64),
+        np.asarray([orig_start], dtype=float), np.asarray([orig_end], dtype=float),
+        np.asarray([target_len], dtype=float))
+    return [(float(x), float(y)) for x, y in out.tolist()]
+
+
+def length_preserving_chaikin_glyph(medians: List[List[Point]], iters: int) -> List[List[Point]]:
+    """整字一次性做长度保持的 Chaikin：所有笔画拼成 stroke-offset 布局，
+    细分、弧长缩放与尾点锚定均为数组运算。结果与逐笔 length_preserving_chaikin 一致。
+    """
+    if iters <= 0 or not medians:
+        return medians
+    idx = [i for i, st in enumerate(medians) if len(st) >= 3]
+    if not idx:
+        return medians
+    from src.geometry import pack_strokes, unpack_strokes
+    P0, off0 = pack_strokes([medians[i] for i in idx])
+    starts0 = off0[:-1]
+    ends0 = off0[1:] - 1
+    d0 = np.diff(P0, axis=0)
+    seg0 = np.sqrt(np.einsum('ij,ij->i', d0, d0))
+    seg0[ends0[:-1]] = 0.0  # 跨笔画伪线段
+    L0 = np.add.reduceat(np.append(seg0, 0.0), starts0) if len(seg0) else np.zeros(len(idx))
+
+    P1, off1 = _chaikin_packed(P0, off0, iters)
+    d1 = np.diff(P1, axis=0)
+    seg1 = np.sqrt(np.einsum('ij,ij->i', d1, d1))
+    seg1[off1[1:-1] - 1] = 0.0
+    L1 = np.add.reduceat(np.append(seg1, 0.0), off1[:-1])
+    # 变化可忽略的笔画直接保留细分结果（与单笔版本 early exit 一致）
+    active = np.abs(L1 - L0) / np.maximum(1e-9, L0) >= 1e-4
+    P2 = _length_preserving_adjust_packed(P1, off1, P0[starts0], P0[ends0], L0, active)
+
+    out = list(medians)
+    for k, st in zip(idx, unpack_strokes(P2, off1)):
+        out[k] = st
+    return out
 
 
 def length_preserving_chaikin(points: List[Point], iters: int) -> List[Point]:
     """Apply Chaikin refinement while approximately preserving total arc length and endpoints."""
     if iters <= 0 or len(points) < 3:
         return points
-    L0 = _length(points)
-    sm = chaikin(points, iters)
-    if len(sm) < 2:
-        return sm
-    # early exit if change insignificant
-    L1 = _length(sm)
-    if abs(L1 - L0) / max(1e-9, L0) < 1e-4:
-        return sm
-    return _length_preserving_adjust(sm, points[0], points[-1], L0)
+    return length_preserving_chaikin_glyph([points], iters)[0]
 
 
 def smooth_moving_avg(points: List[Point], window: int) -> List[Point]:
@@ -701,8 +768,8 @@ class CenterlineProcessor:
         iters = int(self.cfg.get("chaikin_iters", 1))
         if iters <= 0:
             return medians
-        # 使用长度保持版Chaikin，避免弧长缩短
-        return [length_preserving_chaikin(st, iters) for st in medians]
+        # 使用长度保持版Chaikin，避免弧长缩短（整字批量）
+        return length_preserving_chaikin_glyph(medians, iters)
 
     def resample_stage(self, medians: List[List[Point]]) -> List[List[Point]]:
         # 重采样功能已移除，直接返回原始数据
@@ -765,16 +832,11 @@ class CenterlineProcessor:
         # 创建变换管理器
         transform_manager = TransformManager()
         
-        result = []
-        for i, stroke in enumerate(medians):
-            # 构建变换配置，使用原始中心点
-            config = self._build_transform_config(i)
-            
-            # 应用变换
-            transformed_stroke = transform_manager.apply_transforms(stroke, config)
-            result.append(transformed_stroke)
+        # 构建变换配置，使用原始中心点
+        configs = [self._build_transform_config(i) for i in range(len(medians))]
         
-        return result
+        # 整字应用变换（参数一致的平滑阶段走批量内核）
+        return transform_manager.apply_transforms_glyph(medians, configs)
     
     def _build_transform_config(self, stroke_index: int = 0) -> dict:
         """构建变换配置字典"""
@@ -1,6 +1,9 @@
 from __future__ import annotations
 import math
 from typing import List, Tuple, Dict, Any
+import numpy as np
+
+from src.geometry import pack_strokes, unpack_strokes, stroke_ids, segment_mask
 
 Point = Tuple[float, float]
 
@@ -77,7 +80,8 @@ def _nearest_point_on_segment(px: float, py: float, a: Point, b: Point) -> Tuple
 	return qx, qy, t
 
 
-def apply_collision_avoidance(medians: List[List[Point]], min_distance: float, strength: float, iterations: int = 2) -> List[List[Point]]:
+def _apply_collision_avoidance_reference(medians: List[List[Point]], min_distance: float, strength: float, iterations: int = 2) -> List[List[Point]]:
+	"""逐点纯 Python 版本（Gauss-Seidel），保留作为 apply_collision_avoidance 的对照基准。"""
 	if min_distance <= 1e-9 or strength <= 1e-6:
 		return medians
 	pts = [list(st) for st in medians]
@@ -156,3 +160,165 @@ def apply_collision_avoidance(medians: List[List[Point]], min_distance: float, s
 					drx, dry = nx * proj, ny * proj
 				st[j] = (x + drx, y + dry)
 	return pts
+
+
+def _build_segment_hash(P: np.ndarray, seg_start: np.ndarray, cell: float, origin: np.ndarray, ny: int) -> Tuple[np.ndarray, np.ndarray]:
+	"""均匀网格空间哈希：每条线段登记到其包围盒覆盖的所有格子。
+	返回按格子键排序的 (keys, seg_start)。"""
+	a = P[seg_start]
+	b = P[seg_start + 1]
+	lo = np.floor((np.minimum(a, b) - origin) / cell).astype(np.int64)
+	hi = np.floor((np.maximum(a, b) - origin) / cell).astype(np.int64)
+	span = hi - lo + 1
+	counts = span[:, 0] * span[:, 1]
+	rep = np.repeat(np.arange(len(seg_start)), counts)
+	local = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+	cx = lo[rep, 0] + local // span[rep, 1]
+	cy = lo[rep, 1] + local % span[rep, 1]
+	keys = cx * ny + cy
+	order = np.argsort(keys, kind="stable")
+	return keys[order], seg_start[rep][order]
+
+
+def _candidate_pairs(P: np.ndarray, seg_start: np.ndarray, sid: np.ndarray, offsets: np.ndarray, md: float):
+	"""按当前坐标建哈希，返回每个点 3x3 邻域内的他笔 (点, 线段) 候选对。
+
+	格宽取 2*min_distance 以上，线段在此后移动不超过 slack = cell - md 时候选集仍完整。
+	Returns: (pair_pt, pair_seg, bounds, slack)，pair_pt 按点序排列，bounds 为各笔画切片位置。
+	"""
+	n = P.shape[0]
+	seg_vec = P[seg_start + 1] - P[seg_start]
+	mean_len = float(np.mean(np.sqrt(np.einsum("ij,ij->i", seg_vec, seg_vec))))
+	extent = float(np.max(P.max(axis=0) - P.min(axis=0)))
+	# 同时限制单条线段覆盖的格子数
+	cell = max(2.0 * md, mean_len, extent / 64.0)
+	origin = P.min(axis=0) - 2.0 * cell
+	ny = int(np.floor((P[:, 1].max() - origin[1]) / cell)) + 3
+	keys, seg_sorted = _build_segment_hash(P, seg_start, cell, origin, ny)
+
+	pc = np.floor((P - origin) / cell).astype(np.int64)
+	off = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+	qk = ((pc[:, None, 0] + off[None, :, 0]) * ny + (pc[:, None, 1] + off[None, :, 1])).ravel()
+	lo = np.searchsorted(keys, qk, side="left")
+	hi = np.searchsorted(keys, qk, side="right")
+	cnt = hi - lo
+	pair_pt = np.repeat(np.repeat(np.arange(n), 9), cnt)
+	idx = np.arange(int(cnt.sum())) - np.repeat(np.cumsum(cnt) - cnt, cnt) + np.repeat(lo, cnt)
+	pair_seg = seg_sorted[idx]
+	keep = sid[pair_seg] != sid[pair_pt]
+	# 同一线段可能登记在多个邻域格子中，去重（np.unique 结果仍按点序排列）
+	u = np.unique(pair_pt[keep] * n + pair_seg[keep])
+	pair_pt = u // n
+	pair_seg = u % n
+	# 按建表时坐标预筛：距离超过 cell 的线段在余量耗尽前不可能进入 min_distance
+	d = _point_segment_dist(P[pair_pt], P[pair_seg], P[pair_seg + 1])[0]
+	keep = d <= cell
+	pair_pt = pair_pt[keep]
+	pair_seg = pair_seg[keep]
+	bounds = np.searchsorted(pair_pt, offsets)
+	return pair_pt, pair_seg, bounds, cell - md
+
+
+def _point_segment_dist(p: np.ndarray, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+	"""_nearest_point_on_segment 的批量版本，返回 (距离, p - q)。"""
+	ab = b - a
+	len2 = np.einsum("ij,ij->i", ab, ab)
+	valid = len2 > 1e-12
+	t = np.einsum("ij,ij->i", p - a, ab) / np.where(valid, len2, 1.0)
+	t = np.where(valid, np.clip(t, 0.0, 1.0), 0.0)
+	dv = p - (a + t[:, None] * ab)
+	return np.hypot(dv[:, 0], dv[:, 1]), dv
+
+
+def apply_collision_avoidance(medians: List[List[Point]], min_distance: float, strength: float, iterations: int = 2) -> List[List[Point]]:
+	"""笔画间最小距离约束（空间哈希加速）。
+
+	每轮迭代按当前坐标重建线段的均匀网格哈希，每个点只查询 3x3 邻域格子内的他笔
+	线段；排斥量用 NumPy 计算。笔画之间仍按顺序更新（后处理的笔画看到前面已移动的
+	位置），结果与 _apply_collision_avoidance_reference 在浮点误差内一致。
+	"""
+	if min_distance <= 1e-9 or strength <= 1e-6:
+		return medians
+	if not medians:
+		return [list(st) for st in medians]
+	alpha = max(0.0, min(1.0, strength))
+	md = float(min_distance)
+	P, offsets = pack_strokes(medians)
+	n = P.shape[0]
+	if n == 0:
+		return [list(st) for st in medians]
+	sid = stroke_ids(offsets)
+	seg_start = np.nonzero(segment_mask(offsets))[0]
+	nstroke = len(offsets) - 1
+
+	for it in range(max(1, iterations)):
+		if len(seg_start) == 0:
+			break
+		pair_pt, pair_seg, bounds, slack = _candidate_pairs(P, seg_start, sid, offsets, md)
+		drift = 0.0
+
+		for i in range(nstroke):
+			s0, s1 = int(offsets[i]), int(offsets[i + 1])
+			if s1 <= s0:
+				continue
+			if drift > slack:
+				# 已处理笔画的位移超出哈希余量，按当前坐标重建，保证不漏掉近邻线段
+				pair_pt, pair_seg, bounds, slack = _candidate_pairs(P, seg_start, sid, offsets, md)
+				drift = 0.0
+			dr = np.zeros((s1 - s0, 2), dtype=float)
+			a0, a1 = int(bounds[i]), int(bounds[i + 1])
+			if a1 > a0:
+				pp = pair_pt[a0:a1]
+				ks = pair_seg[a0:a1]
+				d, dv = _point_segment_dist(P[pp], P[ks], P[ks + 1])
+				# 每个 (点, 他笔) 取最近线段；距离相同取编号最小的线段（与参考实现一致）
+				grp = (pp - s0) * nstroke + sid[ks]
+				order = np.lexsort((ks, d, grp))
+				g = grp[order]
+				first = np.ones(len(g), dtype=bool)
+				first[1:] = g[1:] != g[:-1]
+				best = order[first]
+				bd = d[best]
+				hit = bd < md
+				if np.any(hit):
+					best = best[hit]
+					bd = bd[hit]
+					bv = dv[best].copy()
+					tiny = bd <= 1e-9
+					if np.any(tiny):
+						# Symmetry break: alternate up/down by stroke index and iteration
+						bv[tiny, 0] = 0.0
+						bv[tiny, 1] = (1 if (i + it) % 2 == 0 else -1) * md
+					bdc = np.maximum(bd, 1e-9)
+					scale = alpha * (md - bdc) / bdc * 0.5
+					local = pp[best] - s0
+					dr[:, 0] = np.bincount(local, weights=bv[:, 0] * scale, minlength=s1 - s0)
+					dr[:, 1] = np.bincount(local, weights=bv[:, 1] * scale, minlength=s1 - s0)
+			# 投影到局部法向，保持笔画形状；切线使用已更新的前一点（与参考实现相同的顺序依赖，
+			# 逐点递推无法向量化，这里只剩少量标量运算）
+			# 没有排斥量的点保持不动，只需遍历受力点
+			moved = np.nonzero((dr[:, 0] != 0.0) | (dr[:, 1] != 0.0))[0]
+			if len(moved) == 0:
+				continue
+			st = P[s0:s1].tolist()
+			drl = dr.tolist()
+			m = s1 - s0
+			for j in moved.tolist():
+				x, y = st[j]
+				drx, dry = drl[j]
+				if m >= 2:
+					if j == 0:
+						tx, ty = st[1][0] - x, st[1][1] - y
+					elif j == m - 1:
+						tx, ty = x - st[-2][0], y - st[-2][1]
+					else:
+						tx, ty = st[j+1][0] - st[j-1][0], st[j+1][1] - st[j-1][1]
+					mag = math.hypot(tx, ty)
+					if mag > 1e-9:
+						nx, ny = -ty / mag, tx / mag
+						proj = drx * nx + dry * ny
+						drx, dry = nx * proj, ny * proj
+				st[j] = [x + drx, y + dry]
+				drift = max(drift, abs(drx) + abs(dry))
+			P[s0:s1] = st
+	return [list(st) for st in unpack_strokes(P, offsets)]
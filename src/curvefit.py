@@ -0,0 +1,211 @@
+from __future__ import annotations
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from src.svgpath import _fmt_q, _join_numbers, path_precision
+
+# 误差受控的折线 -> 三次贝塞尔拟合（Schneider, "An Algorithm for Automatically Fitting Digitized Curves"）。
+# 网格变形与 Chaikin 平滑后得到的致密折线在输出前拟合为少量三次段：
+# 先在尖角处切开，每段按弦长参数化做最小二乘拟合，误差超限时 Newton 重参数化，仍不满足则在最大误差点二分。
+
+_MAX_REPARAM = 8
+_MAX_DEPTH = 24
+
+
+def _dedupe(P: np.ndarray) -> np.ndarray:
+    if len(P) < 2:
+        return P
+    keep = np.ones(len(P), dtype=bool)
+    keep[1:] = np.hypot(*np.diff(P, axis=0).T) > 1e-9
+    return P[keep]
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    n = math.hypot(v[0], v[1])
+    return v / n if n > 1e-12 else np.zeros(2)
+
+
+def _bezier(ctrl: np.ndarray, u: np.ndarray) -> np.ndarray:
+    t = u[:, None]
+    s = 1.0 - t
+    return s ** 3 * ctrl[0] + 3 * s * s * t * ctrl[1] + 3 * s * t * t * ctrl[2] + t ** 3 * ctrl[3]
+
+
+def _bezier_d1(ctrl: np.ndarray, u: np.ndarray) -> np.ndarray:
+    t = u[:, None]
+    s = 1.0 - t
+    return 3 * (s * s * (ctrl[1] - ctrl[0]) + 2 * s * t * (ctrl[2] - ctrl[1]) + t * t * (ctrl[3] - ctrl[2]))
+
+
+def _bezier_d2(ctrl: np.ndarray, u: np.ndarray) -> np.ndarray:
+    t = u[:, None]
+    return 6 * ((1.0 - t) * (ctrl[2] - 2 * ctrl[1] + ctrl[0]) + t * (ctrl[3] - 2 * ctrl[2] + ctrl[1]))
+
+
+def _chord_params(P: np.ndarray) -> np.ndarray:
+    d = np.concatenate([[0.0], np.cumsum(np.hypot(*np.diff(P, axis=0).T))])
+    return d / d[-1] if d[-1] > 0 else np.linspace(0.0, 1.0, len(P))
+
+
+def _generate(P: np.ndarray, u: np.ndarray, t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """端点固定、端点切向给定，最小二乘求两个切向长度 alpha1/alpha2。"""
+    p0, p3 = P[0], P[-1]
+    s = 1.0 - u
+    b0, b1, b2, b3 = s ** 3, 3 * s * s * u, 3 * s * u * u, u ** 3
+    A1 = b1[:, None] * t1
+    A2 = b2[:, None] * t2
+    c00 = float((A1 * A1).sum())
+    c01 = float((A1 * A2).sum())
+    c11 = float((A2 * A2).sum())
+    tmp = P - (b0 + b1)[:, None] * p0 - (b2 + b3)[:, None] * p3
+    x0 = float((A1 * tmp).sum())
+    x1 = float((A2 * tmp).sum())
+    det = c00 * c11 - c01 * c01
+    seg_len = float(math.hypot(*(p3 - p0)))
+    eps = 1e-6 * seg_len
+    if abs(det) > 1e-12:
+        a1 = (x0 * c11 - x1 * c01) / det
+        a2 = (c00 * x1 - c01 * x0) / det
+    else:
+        a1 = a2 = 0.0
+    if a1 < eps or a2 < eps:
+        # 退化时采用 Wu/Barsky 启发：切向长度取弦长的 1/3
+        a1 = a2 = seg_len / 3.0
+    return np.array([p0, p0 + t1 * a1, p3 + t2 * a2, p3])
+
+
+def _max_error(P: np.ndarray, ctrl: np.ndarray, u: np.ndarray):
+    d = np.hypot(*(_bezier(ctrl, u) - P).T)
+    i = int(np.argmax(d))
+    return float(d[i]), i
+
+
+def _reparameterize(P: np.ndarray, ctrl: np.ndarray, u: np.ndarray) -> np.ndarray:
+    # 一步 Newton：求 (Q(u)-P)·Q'(u) = 0
+    diff = _bezier(ctrl, u) - P
+    d1 = _bezier_d1(ctrl, u)
+    d2 = _bezier_d2(ctrl, u)
+    num = (diff * d1).sum(1)
+    den = (d1 * d1).sum(1) + (diff * d2).sum(1)
+    step = np.where(np.abs(den) > 1e-12, num / np.where(np.abs(den) > 1e-12, den, 1.0), 0.0)
+    out = np.clip(u - step, 0.0, 1.0)
+    out[0], out[-1] = 0.0, 1.0
+    return out if np.all(np.diff(out) >= 0) else u
+
+
+def _end_tangent(P: np.ndarray, forward: bool, reach: float) -> np.ndarray:
+    """端点切向：取距端点至少 reach 的第一个点，降低致密采样点的局部抖动。"""
+    Q = P if forward else P[::-1]
+    d = np.hypot(*(Q[1:] - Q[0]).T)
+    k = int(np.argmax(d >= reach)) + 1 if np.any(d >= reach) else len(Q) - 1
+    return _unit(Q[k] - Q[0])
+
+
+def _fit(P: np.ndarray, t1: np.ndarray, t2: np.ndarray, tol: float, out: List[np.ndarray], depth: int) -> None:
+    if len(P) == 2 or depth >= _MAX_DEPTH:
+        d = float(math.hypot(*(P[-1] - P[0]))) / 3.0
+        out.append(np.array([P[0], P[0] + t1 * d, P[-1] + t2 * d, P[-1]]))
+        return
+    u = _chord_params(P)
+    ctrl = _generate(P, u, t1, t2)
+    err, split = _max_error(P, ctrl, u)
+    if err <= tol:
+        out.append(ctrl)
+        return
+    if err <= tol * 4.0:
+        for _ in range(_MAX_REPARAM):
+            u = _reparameterize(P, ctrl, u)
+            ctrl = _generate(P, u, t1, t2)
+            err, split = _max_error(P, ctrl, u)
+            if err <= tol:
+                out.append(ctrl)
+                return
+    split = max(1, min(len(P) - 2, split))
+    tc = _unit(P[split - 1] - P[split + 1])
+    if not tc.any():
+        tc = _unit(P[split - 1] - P[split])
+    _fit(P[:split + 1], t1, tc, tol, out, depth + 1)
+    _fit(P[split:], -tc, t2, tol, out, depth + 1)
+
+
+def corner_indices(P: np.ndarray, corner_deg: float) -> np.ndarray:
+    """相邻线段方向变化 >= corner_deg 的内部顶点。"""
+    if len(P) < 3:
+        return np.zeros(0, dtype=np.int64)
+    v = np.diff(P, axis=0)
+    a = np.arctan2(v[:, 1], v[:, 0])
+    turn = np.abs((np.diff(a) + np.pi) % (2 * np.pi) - np.pi)
+    return np.nonzero(turn >= math.radians(corner_deg))[0] + 1
+
+
+def fit_cubic_beziers(points: np.ndarray, tolerance: float = 0.25, corner_deg: float = 35.0) -> List[np.ndarray]:
+    """折线 -> 三次贝塞尔段列表（每段 (4,2) 控制点，首尾相接）。
+    输入点到拟合曲线（按拟合参数取点）的距离均 <= tolerance；尖角处保持为段端点。"""
+    P = _dedupe(np.asarray(points, dtype=float).reshape(-1, 2))
+    if len(P) < 2:
+        return []
+    out: List[np.ndarray] = []
+    cuts = [0] + corner_indices(P, corner_deg).tolist() + [len(P) - 1]
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        Q = P[a:b + 1]
+        reach = max(tolerance, 1e-9)
+        _fit(Q, _end_tangent(Q, True, reach), _end_tangent(Q, False, reach), tolerance, out, 0)
+    return out
+
+
+def _is_straight(ctrl: np.ndarray, tol: float) -> bool:
+    p0, p3 = ctrl[0], ctrl[3]
+    ab = p3 - p0
+    L2 = float(ab @ ab)
+    if L2 <= 1e-18:
+        return bool(np.all(np.hypot(*(ctrl[1:3] - p0).T) <= tol))
+    t = (ctrl[1:3] - p0) @ ab / L2
+    if np.any(t < 0.0) or np.any(t > 1.0):
+        return False
+    dv = ctrl[1:3] - p0 - t[:, None] * ab
+    # 控制点偏离量的 3/4 为曲线到弦的最大偏离上界
+    return bool(np.all(np.hypot(*dv.T) * 0.75 <= tol))
+
+
+def encode_beziers(segments: List[np.ndarray], *, pixel_size: float = 1.0, tolerance: Optional[float] = None,
+                   closed: bool = False) -> str:
+    """贝塞尔段 -> 紧凑 path d：'Mx y' + 相对 'c'（近乎直线的段写作 'l'）。
+    控制点量化为定点整数后相对当前点取差，无累积误差。"""
+    if not segments:
+        return ""
+    tol = 0.25 * pixel_size if tolerance is None else tolerance
+    dec = path_precision(pixel_size)
+    scale = 10 ** dec
+    q0 = np.rint(segments[0][0] * scale).astype(np.int64)
+    parts = ["M" + _join_numbers([_fmt_q(int(q0[0]), dec), _fmt_q(int(q0[1]), dec)])]
+    cur = q0
+    last_cmd = ""
+    for i, ctrl in enumerate(segments):
+        q = np.rint(ctrl * scale).astype(np.int64)
+        if closed and i == len(segments) - 1 and (q[3] == q0).all() and _is_straight(ctrl, tol):
+            break  # 由 z 闭合
+        if _is_straight(ctrl, tol):
+            cmd, nums = "l", (q[3] - cur).tolist()
+        else:
+            cmd, nums = "c", (q[1:] - cur).ravel().tolist()
+        toks = [_fmt_q(k, dec) for k in nums]
+        if cmd == last_cmd:
+            parts.append(_join_numbers(toks) if toks[0][0] == "-" else " " + _join_numbers(toks))
+        else:
+            parts.append(cmd + _join_numbers(toks))
+        last_cmd = cmd
+        cur = q[3]
+    if closed:
+        parts.append("z")
+    return "".join(parts)
+
+
+def fit_path_d(points: np.ndarray, *, pixel_size: float = 1.0, tolerance: Optional[float] = None,
+               corner_deg: float = 35.0, closed: bool = False) -> str:
+    """致密折线 -> 拟合后的紧凑 path d（误差默认 0.25 个输出像素）。"""
+    tol = 0.25 * pixel_size if tolerance is None else tolerance
+    # 拟合误差与量化误差共享预算：量化最多 0.05 像素
+    segs = fit_cubic_beziers(points, tolerance=max(tol - 0.05 * pixel_size, 0.5 * tol), corner_deg=corner_deg)
+    return encode_beziers(segs, pixel_size=pixel_size, tolerance=tol, closed=closed)
@@ -20,7 +20,7 @@ import os
 import json
 import glob
 from datetime import datetime
-from typing import Dict, Optional, Any, List
+from typing import Callable, Dict, Optional, Any, List
 import logging
 
 # 导入现有的网格变形和SVG处理模块
@@ -32,14 +32,18 @@ import logging
 class D2Generator:
     """D2生成器 - 完整封装的D2生成功能"""
     
-    def __init__(self, output_dir: str = None):
+    def __init__(self, output_dir: str = None,
+                 deform: Optional[Callable[[str, Dict[str, Any]], str]] = None):
         """
         初始化D2生成器
         
         Args:
             output_dir: 输出目录，默认为 output/compare/C_processed_centerline
+            deform: 变形函数 (svg_content, grid_params) -> svg_content，由调用方注入
+                    （Web 层传入带缓存的 cached_transform_d1_to_d2）；未提供时不变形
         """
         self.output_dir = output_dir or os.path.join('output', 'compare', 'C_processed_centerline')
+        self.deform = deform
         self.logger = logging.getLogger(__name__)
         
         # 确保输出目录存在
@@ -143,9 +147,10 @@ class D2Generator:
             self.logger.info("无网格变形，返回原始SVG")
             return svg_content
         
-        # 暂时返回原始SVG，等待网格变形模块完善
-        self.logger.info("网格变形功能暂未实现，返回原始SVG")
-        return svg_content
+        if self.deform is None:
+            self.logger.info("未注入变形函数，返回原始SVG")
+            return svg_content
+        return self.deform(svg_content, grid_params)
     
     def save_d2_file(self, svg_content: str, filename: str) -> str:
         """
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from typing import List, Tuple, Sequence
+import numpy as np
+
+Point = Tuple[float, float]
+
+
+def pack_strokes(medians: Sequence[Sequence[Point]]) -> Tuple[np.ndarray, np.ndarray]:
+    """将一个字形的所有笔画压平为连续数组（stroke-offset 布局）。
+
+    Returns:
+        pts: (N,2) float64，所有笔画的点首尾相接
+        offsets: (S+1,) int64，第 i 笔为 pts[offsets[i]:offsets[i+1]]
+    """
+    lens = np.fromiter((len(st) for st in medians), dtype=np.int64, count=len(medians))
+    offsets = np.zeros(len(medians) + 1, dtype=np.int64)
+    np.cumsum(lens, out=offsets[1:])
+    total = int(offsets[-1])
+    if total == 0:
+        return np.zeros((0, 2), dtype=float), offsets
+    flat = [p for st in medians for p in st]
+    pts = np.asarray(flat, dtype=float).reshape(total, 2)
+    return pts, offsets
+
+
+def unpack_strokes(pts: np.ndarray, offsets: np.ndarray) -> List[List[Point]]:
+    """pack_strokes 的逆操作，返回 List[List[(x,y)]]。"""
+    flat = [tuple(p) for p in np.asarray(pts, dtype=float).tolist()]
+    offs = np.asarray(offsets).tolist()
+    return [flat[offs[i]:offs[i + 1]] for i in range(len(offs) - 1)]
+
+
+def stroke_ids(offsets: np.ndarray) -> np.ndarray:
+    """每个点所属笔画序号，长度 N。"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def segment_mask(offsets: np.ndarray) -> np.ndarray:
+    """长度 N-1 的布尔掩码：pts[i]->pts[i+1] 是否属于同一笔画（排除跨笔画的伪线段）。"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = int(offsets[-1]) if len(offsets) else 0
+    if n < 2:
+        return np.zeros(0, dtype=bool)
+    mask = np.ones(n - 1, dtype=bool)
+    ends = offsets[1:-1] - 1
+    mask[ends[(ends >= 0) & (ends < n - 1)]] = False
+    return mask
@@ -0,0 +1,166 @@
+from __future__ import annotations
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+# 按目标输出尺寸的细节层级（LOD）：文章中每字只有 ~40px，256px 画布上的致密几何
+# 在该尺寸下不可见。容差取 0.25 个输出像素（换算到画布像素），用 RDP / Visvalingam 抽稀。
+
+LOD_TOLERANCE_PX = 0.25
+
+
+def lod_level(target_px: Optional[float], canvas_px: int = 256) -> int:
+    """目标尺寸向上取 2 的幂作为缓存层级（不超过画布尺寸），相近字号共用同一份简化结果。"""
+    if not target_px or target_px <= 0:
+        return int(canvas_px)
+    return int(min(canvas_px, 2 ** math.ceil(math.log2(max(1.0, float(target_px))))))
+
+
+def lod_pixel_size(target_px: Optional[float], canvas_px: int = 256) -> float:
+    """一个输出像素对应的画布像素数（>= 1）。"""
+    return max(1.0, float(canvas_px) / lod_level(target_px, canvas_px))
+
+
+def rdp_mask(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Ramer–Douglas–Peucker：返回保留点的布尔掩码（首尾恒保留）。显式栈，逐段向量化求距离。"""
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(P)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        ab = P[b] - P[a]
+        L = math.hypot(ab[0], ab[1])
+        rel = P[a + 1:b] - P[a]
+        if L <= 1e-12:
+            d = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            d = np.abs(rel[:, 0] * ab[1] - rel[:, 1] * ab[0]) / L
+        i = int(np.argmax(d))
+        if d[i] > tolerance:
+            m = a + 1 + i
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    return keep
+
+
+def rdp(points: np.ndarray, tolerance: float) -> np.ndarray:
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    return P[rdp_mask(P, tolerance)]
+
+
+def visvalingam(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Visvalingam–Whyatt：反复删除有效面积最小的顶点，直到最小面积 >= tolerance²/2。"""
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(P)
+    if n < 3:
+        return P
+    min_area = 0.5 * tolerance * tolerance
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    alive = [True] * n
+
+    def area(i: int) -> float:
+        a, b, c = P[prev[i]], P[i], P[nxt[i]]
+        return 0.5 * abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1]))
+
+    areas = [0.0] * n
+    heap = []
+    for i in range(1, n - 1):
+        areas[i] = area(i)
+        heap.append((areas[i], i))
+    heapq.heapify(heap)
+    while heap:
+        ar, i = heapq.heappop(heap)
+        if not alive[i] or ar != areas[i]:
+            continue
+        if ar >= min_area:
+            break
+        alive[i] = False
+        p, q = prev[i], nxt[i]
+        nxt[p] = q
+        prev[q] = p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                # 有效面积单调不减，避免先删除的点反而让邻点更易被删
+                areas[j] = max(area(j), ar)
+                heapq.heappush(heap, (areas[j], j))
+    return P[np.asarray(alive)]
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float, method: str = "rdp") -> np.ndarray:
+    if tolerance <= 0:
+        return np.asarray(points, dtype=float).reshape(-1, 2)
+    if method == "visvalingam":
+        return visvalingam(points, tolerance)
+    return rdp(points, tolerance)
+
+
+def simplify_polylines(buf: np.ndarray, offsets: np.ndarray, tolerance: float,
+                       method: str = "rdp") -> Tuple[np.ndarray, np.ndarray]:
+    """打包布局（buf + offsets）的逐条抽稀，返回新的 (buf, offsets)。"""
+    buf = np.asarray(buf, dtype=float).reshape(-1, 2)
+    offs = np.asarray(offsets).tolist()
+    parts = [simplify_polyline(buf[offs[i]:offs[i + 1]], tolerance, method) for i in range(len(offs) - 1)]
+    sizes = [len(p) for p in parts]
+    new_offs = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    out = np.vstack(parts) if parts and new_offs[-1] else np.zeros((0, 2))
+    return out, new_offs
+
+
+class LodCache:
+    """每字形的 LOD 结果缓存：键为 (字形键, 层级)，LRU 淘汰。"""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = int(maxsize)
+        self._data: "OrderedDict[Tuple[Hashable, int], Any]" = OrderedDict()
+        # 进程级实例由多个请求线程共享，LRU 表与计数器的读写都在锁内（build 不持锁）
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, level: int) -> Any:
+        k = (key, int(level))
+        with self._lock:
+            value = self._data.get(k)
+            if value is not None:
+                self._data.move_to_end(k)
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def put(self, key: Hashable, level: int, value: Any) -> None:
+        k = (key, int(level))
+        with self._lock:
+            self._data[k] = value
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_build(self, key: Hashable, level: int, build: Callable[[], Any]) -> Any:
+        value = self.get(key, level)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.put(key, level, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
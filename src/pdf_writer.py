@@ -0,0 +1,228 @@
+from __future__ import annotations
+import re
+import xml.etree.ElementTree as ET
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from src.raster import Matrix, _IDENTITY, _mat_mul, _parse_color, _parse_transform, _Unsupported
+from src.svgdoc import SHAPE_TAGS, commands_to_d, shape_commands
+from src.svgpath import fmt_number, iter_path_commands
+
+# 流式多页 PDF 输出器：对象写出即落盘，只保留各对象偏移（xref）与页对象号，
+# 内存与页数无关（每页仅一个整数）。重复出现的字形写成 Form XObject，页面内容只写 `cm` + `Do`。
+# 页面坐标沿用 SVG 像素（96dpi，y 向下），由每页开头的一次 cm 换算到 PDF 点。
+
+PX_TO_PT = 72.0 / 96.0
+_BBox = Tuple[float, float, float, float]
+
+
+def _n(v: float) -> str:
+    return fmt_number(v, 3) if v == v else "0"
+
+
+class PdfWriter:
+    """Streaming PDF writer; pages share one resource dictionary written on close()."""
+
+    def __init__(self, stream: BinaryIO, *, compress: bool = True):
+        self._out = stream
+        self._pos = 0
+        self._offsets: Dict[int, int] = {}
+        self._next_id = 1
+        self._compress = compress
+        self._closed = False
+        self._catalog = self._reserve()
+        self._pages = self._reserve()
+        self._resources = self._reserve()
+        self._page_ids: List[int] = []
+        self._forms: Dict[str, int] = {}   # 资源名 -> 对象号
+        self._page_ops: Optional[List[bytes]] = None
+        self._page_size = (0.0, 0.0)
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # ---- 底层对象输出 ----
+    def _write(self, data: bytes) -> None:
+        self._out.write(data)
+        self._pos += len(data)
+
+    def _reserve(self) -> int:
+        oid = self._next_id
+        self._next_id += 1
+        return oid
+
+    def _object(self, oid: int, body: bytes) -> None:
+        self._offsets[oid] = self._pos
+        self._write(b"%d 0 obj\n" % oid + body + b"\nendobj\n")
+
+    def _stream_object(self, oid: int, dict_entries: str, data: bytes) -> None:
+        if self._compress:
+            data = zlib.compress(data, 6)
+            dict_entries += " /Filter /FlateDecode"
+        self._object(oid, b"<< " + dict_entries.encode("ascii") + b" /Length %d >>\nstream\n" % len(data)
+                     + data + b"\nendstream")
+
+    # ---- 字形 XObject ----
+    def has_form(self, name: str) -> bool:
+        return name in self._forms
+
+    def define_form(self, name: str, ops: bytes, bbox: _BBox) -> None:
+        """写出一个 Form XObject（name 为资源名，如 G0），之后各页可用 draw_form 引用。"""
+        if name in self._forms:
+            return
+        oid = self._reserve()
+        x0, y0, x1, y1 = bbox
+        self._stream_object(oid, f"/Type /XObject /Subtype /Form /BBox [{_n(x0)} {_n(y0)} {_n(x1)} {_n(y1)}]", ops)
+        self._forms[name] = oid
+
+    # ---- 页面 ----
+    def begin_page(self, width_px: float, height_px: float) -> None:
+        if self._page_ops is not None:
+            self.end_page()
+        self._page_size = (width_px * PX_TO_PT, height_px * PX_TO_PT)
+        # 像素坐标（y 向下）-> PDF 点（y 向上）
+        self._page_ops = [f"{_n(PX_TO_PT)} 0 0 {_n(-PX_TO_PT)} 0 {_n(self._page_size[1])} cm\n".encode("ascii")]
+
+    def draw_form(self, name: str, matrix: Matrix) -> None:
+        a, b, c, d, e, f = matrix
+        self._page_ops.append(f"q {_n(a)} {_n(b)} {_n(c)} {_n(d)} {_n(e)} {_n(f)} cm /{name} Do Q\n".encode("ascii"))
+
+    def draw_ops(self, ops: bytes) -> None:
+        self._page_ops.append(ops)
+
+    def end_page(self) -> None:
+        if self._page_ops is None:
+            return
+        content = self._reserve()
+        self._stream_object(content, "", b"".join(self._page_ops))
+        page = self._reserve()
+        w, h = self._page_size
+        self._object(page, (f"<< /Type /Page /Parent {self._pages} 0 R /MediaBox [0 0 {_n(w)} {_n(h)}] "
+                            f"/Resources {self._resources} 0 R /Contents {content} 0 R >>").encode("ascii"))
+        self._page_ids.append(page)
+        self._page_ops = None
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.end_page()
+        xobj = " ".join(f"/{k} {v} 0 R" for k, v in self._forms.items())
+        self._object(self._resources, f"<< /XObject << {xobj} >> >>".encode("ascii"))
+        kids = " ".join(f"{p} 0 R" for p in self._page_ids)
+        self._object(self._pages, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode("ascii"))
+        self._object(self._catalog, f"<< /Type /Catalog /Pages {self._pages} 0 R >>".encode("ascii"))
+        xref = self._pos
+        n = self._next_id
+        lines = [b"xref\n0 %d\n" % n, b"0000000000 65535 f \n"]
+        for oid in range(1, n):
+            lines.append(b"%010d 00000 n \n" % self._offsets.get(oid, 0))
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (n, self._catalog, xref))
+        self._closed = True
+
+
+# ---- SVG 片段 -> PDF 绘图指令 ----
+
+_CAPS = {"butt": 0, "round": 1, "square": 2}
+_JOINS = {"miter": 0, "round": 1, "bevel": 2}
+_WIDTH = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+
+
+def _stroke_width(value: Optional[str], inherited: Optional[str]) -> float:
+    """stroke-width 数值；空值/inherit/非数字时取继承值，再退回默认 1。"""
+    for v in (value, inherited):
+        m = _WIDTH.match(v) if v else None
+        if m:
+            return float(m.group(1))
+    return 1.0
+
+
+def _path_ops(d: str, m: Matrix, pts: List[Tuple[float, float]]) -> List[str]:
+    a, b, c, dd, e, f = m
+
+    def tp(p):
+        x, y = a * p[0] + c * p[1] + e, b * p[0] + dd * p[1] + f
+        pts.append((x, y))
+        return "%.2f %.2f" % (x, y)   # 字形坐标（256 画布）两位小数已远小于设备像素
+
+    ops: List[str] = []
+    cur = (0.0, 0.0)
+    for cmd, P in iter_path_commands(d):
+        if cmd == "M":
+            ops.append(tp(P[0]) + " m")
+        elif cmd == "L":
+            ops.append(tp(P[0]) + " l")
+        elif cmd == "C":
+            ops.append(f"{tp(P[0])} {tp(P[1])} {tp(P[2])} c")
+        elif cmd == "Q":
+            (qx, qy), (ex, ey) = P
+            c1 = (cur[0] + 2.0 / 3.0 * (qx - cur[0]), cur[1] + 2.0 / 3.0 * (qy - cur[1]))
+            c2 = (ex + 2.0 / 3.0 * (qx - ex), ey + 2.0 / 3.0 * (qy - ey))
+            ops.append(f"{tp(c1)} {tp(c2)} {tp(P[1])} c")
+        elif cmd == "Z":
+            ops.append("h")
+        cur = P[-1]
+    return ops
+
+
+def _element_ops(el: ET.Element, inherited: Dict[str, str], matrix: Matrix,
+                 out: List[str], pts: List[Tuple[float, float]], widths: List[float]) -> None:
+    tag = el.tag.split("}")[-1]
+    a = dict(inherited)
+    for k, v in el.attrib.items():
+        a[k.split("}")[-1]] = v
+    m = _mat_mul(matrix, _parse_transform(el.get("transform"))) if el.get("transform") else matrix
+    if tag in ("g", "svg", "symbol"):
+        inh = {k: v for k, v in a.items() if k not in ("transform", "d", "id", "class", "viewBox")}
+        for child in el:
+            _element_ops(child, inh, m, out, pts, widths)
+        return
+    if tag in ("defs", "title", "desc", "metadata"):
+        return
+    if tag not in SHAPE_TAGS:
+        raise _Unsupported(tag)
+    # 基本形状（rect/circle/ellipse/line/polyline/polygon）与 SVG 文档改写共用同一套路径命令
+    d = a.get("d", "") if tag == "path" else commands_to_d(shape_commands(tag, a), decimals=6)
+    path = _path_ops(d, m, pts)
+    if not path:
+        return
+    fill = None if tag == "line" else _parse_color(a.get("fill", "black"))
+    stroke = _parse_color(a.get("stroke"))
+    if fill is None and stroke is None:
+        return
+    gs: List[str] = []
+    if fill is not None:
+        gs.append(" ".join(_n(v / 255.0) for v in fill) + " rg")
+    if stroke is not None:
+        # 线宽随当前矩阵缩放（与 SVG 一致），取矩阵的几何平均缩放
+        k = abs(m[0] * m[3] - m[1] * m[2]) ** 0.5
+        w = _stroke_width(el.get("stroke-width"), inherited.get("stroke-width")) * k
+        widths.append(w)
+        gs.append(" ".join(_n(v / 255.0) for v in stroke) + " RG")
+        gs.append(f"{_n(w)} w {_CAPS.get(a.get('stroke-linecap', 'butt'), 0)} J "
+                  f"{_JOINS.get(a.get('stroke-linejoin', 'miter'), 0)} j")
+    evenodd = a.get("fill-rule") == "evenodd"
+    paint = ("B*" if evenodd else "B") if (fill is not None and stroke is not None) else \
+        (("f*" if evenodd else "f") if fill is not None else "S")
+    out.append("\n".join(gs + path + [paint]))
+
+
+def svg_markup_to_ops(markup: str, matrix: Matrix = _IDENTITY) -> Tuple[bytes, _BBox]:
+    """SVG 片段（path/rect/line/polyline/polygon/g）-> (PDF 内容流, 含线宽外扩的包围盒)。
+    不支持的元素或颜色抛出 ValueError。"""
+    try:
+        root = ET.fromstring(f'<g xmlns="http://www.w3.org/2000/svg">{markup}</g>')
+        out: List[str] = []
+        pts: List[Tuple[float, float]] = []
+        widths: List[float] = []
+        _element_ops(root, {}, matrix, out, pts, widths)
+    except (_Unsupported, ET.ParseError) as e:
+        raise ValueError(f"unsupported SVG markup: {e}")
+    if not pts:
+        return b"", (0.0, 0.0, 0.0, 0.0)
+    pad = max(widths, default=0.0) / 2.0 + 1.0
+    xs = [p[0] for p in pts]
+    ys = [p[1] for p in pts]
+    return ("\n".join(out) + "\n").encode("ascii"), (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Tuple
 import numpy as np
 
+from .profiles import unit_grid
+
 
 def _to_float(v: Any, d: float) -> float:
     try:
@@ -21,12 +24,7 @@ def _ease(name: str, x: np.ndarray, power: float = 2.0) -> np.ndarray:
     return 0.5 - 0.5 * np.cos(x * np.pi)
 
 
-def compute_nib_taper(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
-    """Return multiplicative taper scale for pen tips (start/end), independent from pressure.
-    This is used to emphasize 藏锋/露锋/回锋 等效果：
-      start.mode in {none,cang,luo}
-      end.mode   in {none,hui,ti}
-    """
+def _nib_params(style: Dict[str, Any]) -> Tuple:
     nib = style.get("nib", {}) if isinstance(style, dict) else {}
     start = nib.get("start", {}) if isinstance(nib, dict) else {}
     end = nib.get("end", {}) if isinstance(nib, dict) else {}
@@ -42,7 +40,11 @@ def compute_nib_taper(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
     e_len = _to_float(end.get("len", 0.08), 0.08)
     e_min = _to_float(end.get("min", 0.03), 0.03)
     e_ease = (end.get("easing") or "cosine").lower()
+    return (s_mode, s_len, s_min, s_ease, e_mode, e_len, e_min, e_ease)
+
 
+def _nib_taper(ts: np.ndarray, s_mode: str, s_len: float, s_min: float, s_ease: str,
+               e_mode: str, e_len: float, e_min: float, e_ease: str) -> np.ndarray:
     scale = np.ones_like(ts, dtype=float)
 
     # Start tip
@@ -70,3 +72,24 @@ def compute_nib_taper(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
         scale *= local
 
     return np.clip(scale, 0.01, 2.0)
+
+
+def compute_nib_taper(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
+    """Return multiplicative taper scale for pen tips (start/end), independent from pressure.
+    This is used to emphasize 藏锋/露锋/回锋 等效果：
+      start.mode in {none,cang,luo}
+      end.mode   in {none,hui,ti}
+    """
+    return _nib_taper(np.asarray(ts, dtype=float), *_nib_params(style))
+
+
+@lru_cache(maxsize=256)
+def _nib_curve(params: Tuple, samples: int) -> np.ndarray:
+    out = _nib_taper(unit_grid(samples), *params)
+    out.setflags(write=False)
+    return out
+
+
+def nib_taper_for_samples(style: Dict[str, Any], samples: int) -> np.ndarray:
+    """compute_nib_taper on linspace(0,1,samples), memoized by (nib params, samples)."""
+    return _nib_curve(_nib_params(style), int(samples))
@@ -1,23 +1,9 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 import numpy as np
 
-
-def _eval_profile(profile: Dict[str, Any], t: float) -> float:
-    pts = profile.get("points") or []
-    if not pts:
-        return 1.0
-    if t <= pts[0][0]:
-        return float(pts[0][1])
-    for i in range(len(pts) - 1):
-        t0, y0 = float(pts[i][0]), float(pts[i][1])
-        t1, y1 = float(pts[i + 1][0]), float(pts[i + 1][1])
-        if t0 <= t <= t1:
-            if t1 - t0 < 1e-9:
-                return y1
-            r = (t - t0) / (t1 - t0)
-            return y0 * (1 - r) + y1 * r
-    return float(pts[-1][1])
+from .profiles import profile_key, _interp, unit_grid
 
 
 def _easing(easing: str, x: np.ndarray, power: float = 2.0) -> np.ndarray:
@@ -37,12 +23,8 @@ def _to_float(v: Any, default: float) -> float:
         return default
 
 
-def compute_pressure_scale(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
-    """Compute pressure scale along stroke parameter ts in [0,1].
-    Sources: pressure.base, pressure.profile, rhythm.speed_profile, pressure.from_speed,
-    and cap_taper to guarantee pleasant taper at the ends.
-    """
-    # Defaults
+def _pressure_params(style: Dict[str, Any]) -> Tuple:
+    """Hashable pressure parameters (curve contents included) used as cache key."""
     pressure = style.get("pressure", {}) if isinstance(style, dict) else {}
     base = _to_float(pressure.get("pressure_base", 1.0), 1.0)
     prof = pressure.get("pressure_profile", {}) if isinstance(pressure, dict) else {}
@@ -53,19 +35,24 @@ def compute_pressure_scale(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
     alpha = _to_float(pressure.get("from_speed", {}).get("alpha", -0.3), -0.3)
     gamma = _to_float(pressure.get("from_speed", {}).get("gamma", 1.0), 1.0)
 
-    p_prof = np.array([_eval_profile(prof, float(t)) for t in ts], dtype=float)
-    s = np.array([_eval_profile(prof_speed, float(t)) for t in ts], dtype=float)
-    s_factor = 1.0 + alpha * (np.power(s, gamma) - 1.0)
-
     # cap taper
     taper = pressure.get("cap_taper", {}) if isinstance(pressure, dict) else {}
-    start_len = _to_float(taper.get("start_len", 0.08), 0.08)
-    end_len = _to_float(taper.get("end_len", 0.12), 0.12)
-    start_min = _to_float(taper.get("start_min", 0.05), 0.05)
-    end_min = _to_float(taper.get("end_min", 0.05), 0.05)
-    easing_name = (taper.get("easing", "cosine") or "cosine").lower()
-    easing_pow = _to_float(taper.get("power", 2.0), 2.0)
+    cap = (
+        _to_float(taper.get("start_len", 0.08), 0.08),
+        _to_float(taper.get("end_len", 0.12), 0.12),
+        _to_float(taper.get("start_min", 0.05), 0.05),
+        _to_float(taper.get("end_min", 0.05), 0.05),
+        (taper.get("easing", "cosine") or "cosine").lower(),
+        _to_float(taper.get("power", 2.0), 2.0),
+    )
 
+    smooth = pressure.get("smooth", {}) if isinstance(pressure, dict) else {}
+    win = int(_to_float(smooth.get("window", 0), 0))
+    return (base, profile_key(prof), profile_key(prof_speed), alpha, gamma, cap, win)
+
+
+def _cap_taper(ts: np.ndarray, start_len: float, end_len: float, start_min: float, end_min: float,
+               easing_name: str, easing_pow: float) -> np.ndarray:
     taper_w = np.ones_like(ts, dtype=float)
     # start
     if start_len > 1e-6:
@@ -77,12 +64,28 @@ def compute_pressure_scale(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
         x = np.clip((1.0 - ts) / max(1e-6, end_len), 0.0, 1.0)
         e = _easing(easing_name, x, easing_pow)
         taper_w *= (end_min + (1.0 - end_min) * e)
+    return taper_w
+
+
+@lru_cache(maxsize=256)
+def cap_taper_curve(cap: Tuple, samples: int) -> np.ndarray:
+    """cap_taper on linspace(0,1,samples), memoized by (taper params, samples)."""
+    out = _cap_taper(unit_grid(samples), *cap)
+    out.setflags(write=False)
+    return out
+
+
+def _pressure_from_params(ts: np.ndarray, params: Tuple, taper_w: np.ndarray | None = None) -> np.ndarray:
+    base, prof_key, speed_key, alpha, gamma, cap, win = params
+    p_prof = _interp(prof_key, ts)
+    s = _interp(speed_key, ts)
+    s_factor = 1.0 + alpha * (np.power(s, gamma) - 1.0)
+    if taper_w is None:
+        taper_w = _cap_taper(ts, *cap)
 
     scale = base * p_prof * s_factor * taper_w
 
     # smoothing (optional)
-    smooth = pressure.get("smooth", {}) if isinstance(pressure, dict) else {}
-    win = int(_to_float(smooth.get("window", 0), 0))
     if win and win > 1:
         k = np.ones(win, dtype=float) / float(win)
         # pad reflect to keep vector length
@@ -93,3 +96,23 @@ def compute_pressure_scale(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
         scale = np.convolve(tmp, k, mode="same")[pad:-pad or None]
 
     return np.clip(scale, 0.01, 5.0)
+
+
+def compute_pressure_scale(ts: np.ndarray, style: Dict[str, Any]) -> np.ndarray:
+    """Compute pressure scale along stroke parameter ts in [0,1].
+    Sources: pressure.base, pressure.profile, rhythm.speed_profile, pressure.from_speed,
+    and cap_taper to guarantee pleasant taper at the ends.
+    """
+    return _pressure_from_params(np.asarray(ts, dtype=float), _pressure_params(style))
+
+
+@lru_cache(maxsize=512)
+def _pressure_curve(params: Tuple, samples: int) -> np.ndarray:
+    out = _pressure_from_params(unit_grid(samples), params, cap_taper_curve(params[5], samples))
+    out.setflags(write=False)
+    return out
+
+
+def pressure_scale_for_samples(style: Dict[str, Any], samples: int) -> np.ndarray:
+    """compute_pressure_scale on linspace(0,1,samples), memoized by (style content, samples)."""
+    return _pressure_curve(_pressure_params(style), int(samples))
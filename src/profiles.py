@@ -0,0 +1,55 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+import numpy as np
+
+# 分段线性曲线统一求值：profile = {"points": [[t, y], ...]}，t 递增；无点时恒为 1.0。
+# 原 renderer/stroker/pressure 各自逐点循环的 _eval_profile 由此替代。
+
+ProfileKey = Tuple[Tuple[float, float], ...]
+
+
+def profile_key(profile: Dict[str, Any] | None) -> ProfileKey:
+    """曲线内容的可哈希表示，用作缓存键。"""
+    pts = (profile or {}).get("points") if isinstance(profile, dict) else None
+    if not pts:
+        return ()
+    return tuple((float(p[0]), float(p[1])) for p in pts)
+
+
+def _interp(key: ProfileKey, ts: np.ndarray) -> np.ndarray:
+    if not key:
+        return np.ones_like(ts, dtype=float)
+    xp = np.fromiter((p[0] for p in key), dtype=float, count=len(key))
+    fp = np.fromiter((p[1] for p in key), dtype=float, count=len(key))
+    # 超出范围取端点值（np.interp 默认行为）
+    return np.interp(ts, xp, fp)
+
+
+def eval_profile_array(profile: Dict[str, Any] | None, ts: np.ndarray) -> np.ndarray:
+    """任意 ts 上的向量化求值。"""
+    return _interp(profile_key(profile), np.asarray(ts, dtype=float))
+
+
+def eval_profile(profile: Dict[str, Any] | None, t: float) -> float:
+    return float(eval_profile_array(profile, np.asarray([t], dtype=float))[0])
+
+
+@lru_cache(maxsize=1024)
+def _profile_curve(key: ProfileKey, samples: int) -> np.ndarray:
+    out = _interp(key, np.linspace(0.0, 1.0, samples))
+    out.setflags(write=False)
+    return out
+
+
+def profile_curve(profile: Dict[str, Any] | None, samples: int) -> np.ndarray:
+    """在 linspace(0,1,samples) 上求值，按 (曲线内容, samples) 缓存；返回只读数组。"""
+    return _profile_curve(profile_key(profile), int(samples))
+
+
+@lru_cache(maxsize=64)
+def unit_grid(samples: int) -> np.ndarray:
+    """只读的 linspace(0,1,samples)。"""
+    ts = np.linspace(0.0, 1.0, int(samples))
+    ts.setflags(write=False)
+    return ts
@@ -0,0 +1,345 @@
+from __future__ import annotations
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageChops, ImageDraw
+
+from src.svgpath import path_subpaths
+
+# 原生栅格后端：直接由几何数组（多边形/折线）绘制到超采样 Pillow 画布，再盒式下采样得到抗锯齿图像。
+# 字形 PNG 不必再经过 SVG 字符串 -> cairosvg -> PNG -> Image.open 的往返；
+# 对本项目自己生成的简单 SVG（path/rect/g+matrix）也提供轻量栅格化，替代 cairosvg。
+
+Color = Tuple[int, int, int, int]
+Matrix = Tuple[float, float, float, float, float, float]
+
+_IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _mat_mul(m: Matrix, n: Matrix) -> Matrix:
+    """m·n（先 n 后 m），SVG matrix(a b c d e f) 约定。"""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (a * a2 + c * b2, b * a2 + d * b2,
+            a * c2 + c * d2, b * c2 + d * d2,
+            a * e2 + c * f2 + e, b * e2 + d * f2 + f)
+
+
+def _signed_area(P: np.ndarray) -> float:
+    x, y = P[:, 0], P[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+class RasterCanvas:
+    """超采样 RGBA 画布。坐标为用户单位（与 SVG 一致），scale 控制输出 DPI。"""
+
+    def __init__(self, width: float, height: float, *, scale: float = 1.0, supersample: int = 4,
+                 background: Color = (255, 255, 255, 0)):
+        self.scale = float(scale)
+        self.supersample = max(1, int(supersample))
+        self.width = max(1, int(round(width * self.scale)))
+        self.height = max(1, int(round(height * self.scale)))
+        self._k = self.scale * self.supersample
+        self._img = Image.new("RGBA", (self.width * self.supersample, self.height * self.supersample), background)
+        self._draw = ImageDraw.Draw(self._img)
+
+    def _dev(self, pts: np.ndarray, matrix: Matrix) -> np.ndarray:
+        a, b, c, d, e, f = matrix
+        P = np.asarray(pts, dtype=float).reshape(-1, 2)
+        out = np.empty_like(P)
+        out[:, 0] = (a * P[:, 0] + c * P[:, 1] + e) * self._k
+        out[:, 1] = (b * P[:, 0] + d * P[:, 1] + f) * self._k
+        return out
+
+    def fill_polygons(self, polys: Sequence[np.ndarray], color: Color, matrix: Matrix = _IDENTITY,
+                      evenodd: bool = False) -> None:
+        """同一路径的各子路径按 fill-rule 合成填充（nonzero 或 evenodd）。"""
+        polys = [self._dev(p, matrix) for p in polys if len(p) >= 3]
+        if not polys:
+            return
+        if evenodd:
+            if len(polys) == 1:
+                self._draw.polygon(polys[0].ravel().tolist(), fill=color)
+                return
+            mask = Image.new("1", self._img.size, 0)
+            for P in polys:
+                layer = Image.new("1", self._img.size, 0)
+                ImageDraw.Draw(layer).polygon(P.ravel().tolist(), fill=1)
+                mask = ImageChops.logical_xor(mask, layer)
+            self._img.paste(color, mask=mask)
+            return
+        # nonzero：各子路径按方向计 ±1 绕数（简单多边形内部绕数恒为 ±1），绕数非零处填充。
+        # 方向全部相同时绕数只会叠加，等价于直接逐个填充
+        signs = [1 if _signed_area(P) >= 0 else -1 for P in polys]
+        if len(set(signs)) == 1:
+            self._fill_union(polys, color)
+            return
+        lo = np.floor(np.min([P.min(axis=0) for P in polys], axis=0)).astype(int)
+        hi = np.ceil(np.max([P.max(axis=0) for P in polys], axis=0)).astype(int) + 1
+        x0, y0 = max(0, lo[0]), max(0, lo[1])
+        x1, y1 = min(self._img.size[0], hi[0]), min(self._img.size[1], hi[1])
+        if x1 <= x0 or y1 <= y0:
+            return
+        # 只在包围盒内累计绕数
+        winding = np.zeros((y1 - y0, x1 - x0), dtype=np.int16)
+        for P, sign in zip(polys, signs):
+            layer = Image.new("1", (x1 - x0, y1 - y0), 0)
+            ImageDraw.Draw(layer).polygon((P - (x0, y0)).ravel().tolist(), fill=1)
+            winding += sign * np.asarray(layer, dtype=np.int16)
+        mask = Image.fromarray(np.where(winding != 0, 255, 0).astype(np.uint8), "L")
+        self._img.paste(color, (x0, y0, x1, y1), mask=mask)
+
+    def _fill_union(self, polys: Sequence[np.ndarray], color: Color) -> None:
+        for P in polys:
+            self._draw.polygon(P.ravel().tolist(), fill=color)
+
+    def fill_glyph(self, buf: np.ndarray, offsets: np.ndarray, color: Color, matrix: Matrix = _IDENTITY) -> None:
+        """stroke-offset 布局的多边形缓冲区（如 build_glyph_polygons 的输出）。
+        各笔画是独立的形状（SVG 中各自一个 path），按并集填充，与方向无关。"""
+        offs = np.asarray(offsets).tolist()
+        self._fill_union([self._dev(buf[offs[i]:offs[i + 1]], matrix) for i in range(len(offs) - 1)
+                          if offs[i + 1] - offs[i] >= 3], color)
+
+    def stroke_polylines(self, polys: Sequence[np.ndarray], color: Color, width: float,
+                         matrix: Matrix = _IDENTITY, round_cap: bool = True, scale_width: bool = True) -> None:
+        """定宽折线；round_cap 时两端补圆。scale_width=False 对应 vector-effect=non-scaling-stroke。"""
+        a, b, c, d, _, _ = matrix
+        w = width * self._k * (abs(a * d - b * c) ** 0.5 if scale_width else 1.0)
+        iw = max(1, int(round(w)))
+        r = w * 0.5
+        for p in polys:
+            if len(p) < 1:
+                continue
+            P = self._dev(p, matrix)
+            if len(P) >= 2:
+                self._draw.line(P.ravel().tolist(), fill=color, width=iw, joint="curve")
+            if round_cap and r >= 1.0:
+                for x, y in (P[0], P[-1]):
+                    self._draw.ellipse([x - r, y - r, x + r, y + r], fill=color)
+
+    def fill_rect(self, x: float, y: float, w: float, h: float, color: Color, matrix: Matrix = _IDENTITY) -> None:
+        self.fill_polygons([np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=float)], color, matrix)
+
+    def image(self) -> Image.Image:
+        """下采样后的 RGBA 图像（预乘 alpha 下做盒式平均，避免透明边缘发灰）。"""
+        if self.supersample == 1:
+            return self._img.copy()
+        return self._img.convert("RGBa").reduce(self.supersample).convert("RGBA")
+
+    def array(self) -> np.ndarray:
+        return np.asarray(self.image())
+
+
+# ---- 由几何直接绘制字形 ----
+
+def rasterize_char(
+    medians: List[List[Tuple[float, float]]],
+    sampled_styles: List[Dict[str, Any]],
+    *,
+    render_mode: str = "median_fill",
+    size_px: int = 256,
+    padding: int = 8,
+    scale: float = 1.0,
+    supersample: int = 4,
+    outlines: Optional[List[str]] = None,
+    rep_style: Optional[Dict[str, Any]] = None,
+    color: Color = (0, 0, 0, 255),
+    background: Color = (255, 255, 255, 0),
+    line_width: float = 2.0,
+) -> Image.Image:
+    """与 SvgRenderer.render_char 相同的几何（size_px/padding 坐标系），输出 size_px*scale 像素的 RGBA 图像。
+
+    render_mode: median_fill（笔画多边形）| outline（MMH 轮廓）| centerline（定宽中轴线）
+    """
+    from src.renderer import SvgRenderer
+    r = SvgRenderer(size_px=size_px, padding=padding)
+    canvas = RasterCanvas(size_px, size_px, scale=scale, supersample=supersample, background=background)
+    mode = (render_mode or "median_fill").lower()
+    if mode == "outline":
+        m = r.outline_matrix(rep_style or {})
+        tol = 0.25 / max(1e-6, scale * supersample * (abs(m[0] * m[3] - m[1] * m[2]) ** 0.5))
+        for d in (outlines or []):
+            canvas.fill_polygons([p for p, _ in path_subpaths(d, tol)], color, m)
+    elif mode == "centerline":
+        polys = [r._to_px_array(np.asarray(st, dtype=float).reshape(-1, 2)) for st in medians if st]
+        canvas.stroke_polylines(polys, color, line_width)
+    else:
+        from src.stroker import build_glyph_polygons
+        buf, offsets = build_glyph_polygons(medians, sampled_styles, samples=96)
+        canvas.fill_glyph(r._to_px_array(buf), offsets, color)
+    return canvas.image()
+
+
+# ---- 轻量 SVG 栅格化（仅覆盖本项目生成的子集） ----
+
+_NAMED = {"black": (0, 0, 0), "white": (255, 255, 255), "red": (255, 0, 0), "green": (0, 128, 0),
+          "blue": (0, 0, 255), "gray": (128, 128, 128), "grey": (128, 128, 128), "purple": (128, 0, 128),
+          "orange": (255, 165, 0)}
+_NUM = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_SUPPORTED = {"svg", "g", "path", "rect", "polyline", "polygon", "line", "defs", "title", "desc", "metadata",
+              "symbol", "use"}
+_XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _parse_color(value: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    if value is None:
+        return None
+    v = value.strip().lower()
+    if v in ("none", "transparent", ""):
+        return None
+    if v.startswith("#"):
+        h = v[1:]
+        if len(h) == 3:
+            h = "".join(ch * 2 for ch in h)
+        if len(h) == 6:
+            return int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+        raise _Unsupported(value)
+    m = re.fullmatch(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)", v)
+    if m:
+        return int(m.group(1)), int(m.group(2)), int(m.group(3))
+    if v in _NAMED:
+        return _NAMED[v]
+    raise _Unsupported(value)
+
+
+def _parse_transform(value: Optional[str]) -> Matrix:
+    m = _IDENTITY
+    for name, args in re.findall(r"(\w+)\s*\(([^)]*)\)", value or ""):
+        v = [float(x) for x in re.findall(_NUM, args)]
+        if name == "matrix" and len(v) == 6:
+            t = tuple(v)
+        elif name == "translate" and v:
+            t = (1.0, 0.0, 0.0, 1.0, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == "scale" and v:
+            t = (v[0], 0.0, 0.0, v[1] if len(v) > 1 else v[0], 0.0, 0.0)
+        else:
+            raise _Unsupported(name)
+        m = _mat_mul(m, t)
+    return m
+
+
+def _length(value: Optional[str], default: float) -> float:
+    if value is None:
+        return default
+    m = re.match(_NUM, value.strip())
+    return float(m.group(0)) if m else default
+
+
+def _attrs(el: ET.Element, inherited: Dict[str, str]) -> Dict[str, str]:
+    a = dict(inherited)
+    for k, v in el.attrib.items():
+        a[k.split("}")[-1]] = v
+    style = a.pop("style", None)
+    if style:
+        for decl in style.split(";"):
+            if ":" in decl:
+                k, v = decl.split(":", 1)
+                a[k.strip()] = v.strip()
+    for k in ("opacity", "fill-opacity", "stroke-opacity"):
+        if k in a and float(a[k]) < 1.0:
+            raise _Unsupported(k)
+    return a
+
+
+def _draw_element(canvas: RasterCanvas, el: ET.Element, inherited: Dict[str, str], matrix: Matrix,
+                  ids: Optional[Dict[str, ET.Element]] = None) -> None:
+    tag = el.tag.split("}")[-1]
+    if tag not in _SUPPORTED:
+        raise _Unsupported(tag)
+    if tag in ("defs", "title", "desc", "metadata", "symbol"):
+        return
+    a = _attrs(el, inherited)
+    own = dict(el.attrib)
+    m = _mat_mul(matrix, _parse_transform(own.get("transform"))) if "transform" in own else matrix
+    child_inh = {k: v for k, v in a.items() if k not in ("transform", "d", "x", "y", "width", "height", "viewBox", "id", "class", "href")}
+    if tag in ("svg", "g"):
+        for child in el:
+            _draw_element(canvas, child, child_inh, m, ids)
+        return
+    if tag == "use":
+        # <use href="#id" x y>：引用 <symbol>（无 viewBox，按 overflow 可见处理）或任意元素
+        ref = (own.get("href") or own.get(_XLINK_HREF) or "").lstrip("#")
+        target = (ids or {}).get(ref)
+        if target is None:
+            raise _Unsupported("use")
+        m = _mat_mul(m, (1.0, 0.0, 0.0, 1.0, _length(own.get("x"), 0.0), _length(own.get("y"), 0.0)))
+        if target.tag.split("}")[-1] == "symbol":
+            if target.get("viewBox"):
+                raise _Unsupported("symbol viewBox")
+            inh = {k: v for k, v in _attrs(target, child_inh).items() if k not in ("id", "class", "overflow")}
+            for child in target:
+                _draw_element(canvas, child, inh, m, ids)
+        else:
+            _draw_element(canvas, target, child_inh, m, ids)
+        return
+    if tag == "rect":
+        subpaths = [(np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+                     * [_length(a.get("width"), 0.0), _length(a.get("height"), 0.0)]
+                     + [_length(a.get("x"), 0.0), _length(a.get("y"), 0.0)], True)]
+    elif tag == "line":
+        subpaths = [(np.array([[_length(a.get("x1"), 0.0), _length(a.get("y1"), 0.0)],
+                               [_length(a.get("x2"), 0.0), _length(a.get("y2"), 0.0)]]), False)]
+    elif tag in ("polyline", "polygon"):
+        v = [float(x) for x in re.findall(_NUM, a.get("points", ""))]
+        subpaths = [(np.asarray(v[:len(v) // 2 * 2], dtype=float).reshape(-1, 2), tag == "polygon")]
+    else:
+        k = canvas.scale * canvas.supersample * (abs(m[0] * m[3] - m[1] * m[2]) ** 0.5)
+        subpaths = path_subpaths(a.get("d", ""), 0.25 / max(k, 1e-6))
+    fill = _parse_color(a.get("fill", "black"))
+    if fill is not None and tag != "line":
+        canvas.fill_polygons([p for p, _ in subpaths], fill + (255,), m, evenodd=(a.get("fill-rule") == "evenodd"))
+    stroke = _parse_color(a.get("stroke"))
+    if stroke is not None:
+        width = _length(a.get("stroke-width"), 1.0)
+        canvas.stroke_polylines([np.vstack([p, p[:1]]) if closed else p for p, closed in subpaths],
+                                stroke + (255,), width, m,
+                                round_cap=(a.get("stroke-linecap") == "round"),
+                                scale_width=(a.get("vector-effect") != "non-scaling-stroke"))
+
+
+def rasterize_svg(svg_text: str, width: Optional[int] = None, height: Optional[int] = None,
+                  supersample: int = 4) -> Optional[Image.Image]:
+    """栅格化 SVG 子集为 RGBA 图像（未绘制处透明）；遇到不支持的元素/属性返回 None。"""
+    try:
+        root = ET.fromstring(svg_text.encode("utf-8") if isinstance(svg_text, str) else svg_text)
+    except ET.ParseError:
+        return None
+    vb = [float(x) for x in re.findall(_NUM, root.get("viewBox", ""))]
+    vw = _length(root.get("width"), vb[2] if len(vb) == 4 else 256.0)
+    vh = _length(root.get("height"), vb[3] if len(vb) == 4 else 256.0)
+    if len(vb) == 4 and vb[2] > 0 and vb[3] > 0:
+        ox, oy, vw, vh = vb
+    else:
+        ox = oy = 0.0
+    out_w = int(width) if width else int(round(vw))
+    out_h = int(height) if height else int(round(vh))
+    # viewBox -> 输出像素（非等比时按各轴拉伸，与 output_width/height 语义一致）
+    base: Matrix = (out_w / vw, 0.0, 0.0, out_h / vh, -ox * out_w / vw, -oy * out_h / vh)
+    canvas = RasterCanvas(out_w, out_h, supersample=supersample, background=(255, 255, 255, 0))
+    try:
+        ids = {el.get("id"): el for el in root.iter() if el.get("id")}
+        _draw_element(canvas, root, {}, base, ids)
+    except (_Unsupported, ValueError, RecursionError):
+        return None
+    return canvas.image()
+
+
+def svg_to_image(svg_text: str, width: int, height: int, supersample: int = 4) -> Optional[Image.Image]:
+    """SVG -> RGBA Image：优先原生栅格化，不支持的内容回退 cairosvg；两者都不可用时返回 None。"""
+    img = rasterize_svg(svg_text, width, height, supersample=supersample)
+    if img is not None:
+        return img
+    try:
+        import io
+        import cairosvg
+        png = cairosvg.svg2png(bytestring=svg_text.encode("utf-8"), output_width=width, output_height=height)
+        return Image.open(io.BytesIO(png)).convert("RGBA")
+    except Exception as e:
+        print(f"[RASTER] SVG栅格化失败: {e}")
+        return None
@@ -1,32 +1,23 @@
 from __future__ import annotations
-from typing import List, Tuple, Dict, Any, Optional
-import svgwrite
+import io
+from typing import Callable, List, Tuple, Dict, Any, Optional, IO, Union
+import numpy as np
 
-Point = Tuple[float, float]
+from src.svg_writer import SvgWriter, rgb
 
+from src.profiles import eval_profile_array
+from src.segments import turn_angles_deg, arc_positions, runs_from_labels, corner_labels
+from src.svgpath import format_polyline
 
-def _eval_profile(profile: Dict[str, Any], t: float) -> float:
-	# piecewise-linear interpolation over points: [[t,y], ...]
-	pts = profile.get("points") or []
-	if not pts:
-		return 1.0
-	if t <= pts[0][0]:
-		return float(pts[0][1])
-	for i in range(len(pts) - 1):
-		t0, y0 = float(pts[i][0]), float(pts[i][1])
-		t1, y1 = float(pts[i+1][0]), float(pts[i+1][1])
-		if t0 <= t <= t1:
-			if t1 - t0 < 1e-6:
-				return y1
-			r = (t - t0) / (t1 - t0)
-			return y0 * (1 - r) + y1 * r
-	return float(pts[-1][1])
+Point = Tuple[float, float]
 
 
 class SvgRenderer:
 	def __init__(self, size_px: int = 256, padding: int = 8):
 		self.size_px = size_px
 		self.padding = padding
+		# bounding box (min_x, min_y, max_x, max_y) in canvas px of the last median_fill glyph, from the polygon buffer
+		self.last_bounds: Optional[Tuple[float, float, float, float]] = None
 
 	def _to_px(self, p: Point) -> Point:
 		# Flip Y so that mathematical Y-up becomes screen Y-down
@@ -34,50 +25,89 @@ class SvgRenderer:
 		y = self.padding + (1.0 - p[1]) * (self.size_px - 2 * self.padding)
 		return x, y
 
-	def render_char(self, medians: List[List[Point]], sampled_styles: List[Dict[str, Any]], filename: str,
+	def _to_px_array(self, pts: np.ndarray) -> np.ndarray:
+		# _to_px 的数组版本，(N,2) -> (N,2)
+		s = self.size_px - 2 * self.padding
+		out = np.empty_like(pts, dtype=float)
+		out[:, 0] = self.padding + pts[:, 0] * s
+		out[:, 1] = self.padding + (1.0 - pts[:, 1]) * s
+		return out
+
+	def outline_matrix(self, rep_style: Dict[str, Any]) -> Tuple[float, float, float, float, float, float]:
+		"""MMH 轮廓（1024 坐标）到像素的 SVG matrix(a b c d e f)。"""
+		from src.transformer import build_svg_matrix
+		a, b, c, d, e, f = build_svg_matrix(rep_style)
+		sx = (self.size_px - 2 * self.padding)
+		sy = (self.size_px - 2 * self.padding)
+		tx = self.padding
+		sn = 1.0 / 1024.0
+		A = sx * a * sn
+		B = -sy * b * sn
+		C = sx * c * sn
+		D = -sy * d * sn
+		E = tx + sx * e * sn
+		F = 220  # 固定Y偏移值220
+		return A, B, C, D, E, F
+
+	def _emit(self, svg_text: str, target: Union[str, IO, None]) -> Optional[bytes]:
+		# target: 文件路径 / 文本或二进制流 / None（返回 bytes）
+		if target is None:
+			return svg_text.encode("utf-8")
+		if hasattr(target, "write"):
+			if isinstance(target, io.TextIOBase):
+				target.write(svg_text)
+			else:
+				target.write(svg_text.encode("utf-8"))
+			return None
+		with open(target, "w", encoding="utf-8") as f:
+			f.write(svg_text)
+		return None
+
+	def render_char(self, medians: List[List[Point]], sampled_styles: List[Dict[str, Any]], filename: Union[str, IO, None],
 				  outlines: Optional[List[str]] = None, rep_style: Optional[Dict[str, Any]] = None,
-				  render_mode: str = "auto") -> None:
-		dwg = svgwrite.Drawing(filename, size=(self.size_px, self.size_px))
-		dwg.add(dwg.rect(insert=(0, 0), size=(self.size_px, self.size_px), fill="white"))
+				  render_mode: str = "auto", pixel_size: float = 1.0,
+				  deform: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> Optional[bytes]:
+		"""Render one glyph. filename may be a path, a text/binary stream, or None to get the SVG as bytes.
+		pixel_size > 1 (canvas px per output px) simplifies median_fill polygons for small target sizes.
+		deform maps (N,2) canvas pixels to deformed canvas pixels; median_fill polygons are deformed before encoding."""
+		dwg = SvgWriter(self.size_px, self.size_px)
+		dwg.rect(0, 0, self.size_px, self.size_px, fill="white")
 
 		mode = (render_mode or "auto").lower()
 
 		# Handle outlines if requested or auto with outlines available
 		if (mode == "outline") or (mode == "auto" and outlines):
-			from src.transformer import build_svg_matrix
-			geom_style = rep_style or {}
-			a, b, c, d, e, f = build_svg_matrix(geom_style)
-			sx = (self.size_px - 2 * self.padding)
-			sy = (self.size_px - 2 * self.padding)
-			tx = self.padding
-			ty = self.padding
-			sn = 1.0 / 1024.0
-			A = sx * a * sn
-			B = -sy * b * sn
-			C = sx * c * sn
-			D = -sy * d * sn
-			E = tx + sx * e * sn
-			F = 220  # 固定Y偏移值220
-			grp = dwg.g(transform=f"matrix({A:.6f},{B:.6f},{C:.6f},{D:.6f},{E:.6f},{F:.6f})")
+			A, B, C, D, E, F = self.outline_matrix(rep_style or {})
+			dwg.open_group(f"matrix({A:.6f},{B:.6f},{C:.6f},{D:.6f},{E:.6f},{F:.6f})")
 			for d_path in (outlines or []):
-				grp.add(dwg.path(d=d_path, fill="black", stroke="none", fill_rule="nonzero"))
-			dwg.add(grp)
-			dwg.save()
-			return
+				dwg.outline_path(d_path, fill="black")
+			dwg.close_group()
+			return self._emit(dwg.getvalue(), filename)
 
 		# median_fill mode uses polygon stroker
 		if mode == "median_fill":
-			from src.stroker import build_stroke_polygon
-			for stroke_points, style in zip(medians, sampled_styles):
-				if not stroke_points:
-					continue
-				poly = build_stroke_polygon(stroke_points, style, samples=96)
-				pts = [self._to_px(p) for p in poly]
-				path_d = "M" + " ".join(f"{x:.2f},{y:.2f}" for x, y in pts) + " Z"
-				shape = dwg.path(d=path_d, fill="black", stroke="none")
-				dwg.add(shape)
-			dwg.save()
-			return
+			from src.stroker import build_glyph_polygons
+			from src.svgpath import format_polylines
+			# 整字一次性生成多边形缓冲区，批量映射到像素并格式化
+			buf, offsets = build_glyph_polygons(medians, sampled_styles, samples=96)
+			px = self._to_px_array(buf)
+			if deform is not None and len(px):
+				px = deform(px)
+			self.last_bounds = None
+			if len(px):
+				lo, hi = px.min(axis=0), px.max(axis=0)
+				self.last_bounds = (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]))
+			if pixel_size > 1.0:
+				# LOD：按 1/4 个输出像素抽稀，再按输出像素取坐标精度
+				from src.lod import LOD_TOLERANCE_PX, simplify_polylines
+				from src.svgpath import encode_polylines
+				px, offsets = simplify_polylines(px, offsets, LOD_TOLERANCE_PX * pixel_size)
+				paths = encode_polylines(px, offsets, pixel_size=pixel_size, closed=True)
+			else:
+				paths = format_polylines(px, offsets, precision=2, closed=True)
+			for path_d in paths:
+				dwg.fill_path(path_d, fill="black")
+			return self._emit(dwg.getvalue(), filename)
 
 		# median_stroke mode: draw along medians with variable width segments and round caps
 		for stroke_points, style in zip(medians, sampled_styles):
@@ -91,109 +121,73 @@ class SvgRenderer:
 			linejoin = "round" if join_type == "round" else ("miter" if join_type == "miter" else "bevel")
 
 			# segment-based coloring: 起笔(blue) | 中间(gray) | 笔锋(red)
-			start_color = svgwrite.rgb(30, 144, 255)
-			middle_color = svgwrite.rgb(40, 40, 40)
-			peak_color = svgwrite.rgb(220, 50, 47)
+			start_color = rgb(30, 144, 255)
+			middle_color = rgb(40, 40, 40)
+			peak_color = rgb(220, 50, 47)
 
 			# partition by corners using angle threshold + positional windows
-			corner_thresh = 35.0
+			cmin, cmax = 7.0, 80.0
 			first_region = 0.30  # 前段窗口（前百分之几）
 			last_region = 0.30   # 末段窗口（后百分之几）
+			cfg = {}
 			try:
 				cfg = style.get('start_orientation', {})
 				# Use corner range [min,max] if provided; fallback to single thresh
 				cmin = float(cfg.get('corner_thresh_min_deg', 7.0))
 				cmax = float(cfg.get('corner_thresh_max_deg', 80.0))
-				corner_thresh = max(cmin, 0.0)
 				first_region = float(cfg.get('first_corner_region_frac', 0.30))
 				last_region = float(cfg.get('last_corner_region_frac', 0.30))
 			except Exception:
 				pass
+			corner_thresh = max(cmin, 0.0)
 			first_region = max(0.05, min(0.5, first_region))
 			last_region = max(0.05, min(0.5, last_region))
-			pts = stroke_points
-			N = max(2, len(pts))
-			def _turn(a,b,c):
-				import math
-				v1=(b[0]-a[0], b[1]-a[1]); v2=(c[0]-b[0], c[1]-b[1])
-				n1=(v1[0]**2+v1[1]**2)**0.5; n2=(v2[0]**2+v2[1]**2)**0.5
-				if n1<1e-9 or n2<1e-9: return 0.0
-				cosv=(v1[0]*v2[0]+v1[1]*v2[1])/(n1*n2)
-				cosv=max(-1.0,min(1.0,cosv))
-				# 角ABC：以 acos 定义的夹角（0..180°），不再取绝对值
-				return math.degrees(math.acos(cosv))
-			# 按“向量夹角”范围筛选：角度在 [cmin, cmax] 内即候选（不区分正负方向）
-			cand=[i for i in range(1,len(pts)-1) if (lambda ang: (ang >= cmin and ang <= cmax))(_turn(pts[i-1],pts[i],pts[i+1]))]
-			# compute length fractions per index
-			import math
-			if len(pts)>=2:
-				lengths=[math.hypot(pts[i+1][0]-pts[i][0], pts[i+1][1]-pts[i][1]) for i in range(len(pts)-1)]
-				total=max(1e-9, sum(lengths))
-				cum=[0.0]
-				for L in lengths:
-					cum.append(cum[-1]+L)
-				pos=lambda idx: cum[idx]/total
-				first_corner = None
-				for i in cand:
-					if pos(i) <= first_region:
-						first_corner = i
-						break
-				last_corner = None
-				for i in reversed(cand):
-					if pos(i) >= (1.0 - last_region):
-						last_corner = i
-						break
-				# 若窗口内未命中，则逐步放宽范围：下调下限，直至 7°（或配置最小值），分别为起笔/笔锋独立搜寻
-				min_deg = 7.0
-				step_deg = 5.0
-				try:
-					min_deg = float(cfg.get('corner_min_deg', 7.0))
-					step_deg = float(cfg.get('corner_search_step_deg', 5.0))
-				except Exception:
-					pass
-				min_deg = max(1.0, min(min_deg, corner_thresh))
-				step_deg = max(0.5, min(step_deg, corner_thresh))
+			P = np.asarray(stroke_points, dtype=float).reshape(-1, 2)
+			if len(P) < 2:
+				continue
+			N = len(P)
+			# 一次性计算全部顶点的向量夹角（0..180°）与弧长占比
+			ang = turn_angles_deg(P)
+			_, pos, _ = arc_positions(P)
+			inner = np.zeros(N, dtype=bool)
+			inner[1:-1] = True
+			in_first = inner & (pos <= first_region)
+			in_last = inner & (pos >= (1.0 - last_region))
+
+			def _pick(window: np.ndarray, lo: float, last: bool) -> Optional[int]:
+				hit = np.nonzero(window & (ang >= lo) & (ang <= cmax))[0]
+				if len(hit) == 0:
+					return None
+				return int(hit[-1] if last else hit[0])
+
+			# 按“向量夹角”范围 [cmin, cmax] 在前/后窗口内取首个/末个折点
+			first_corner = _pick(in_first, cmin, False)
+			last_corner = _pick(in_last, cmin, True)
+			# 若窗口内未命中，则逐步放宽范围：下调下限，直至 7°（或配置最小值），分别为起笔/笔锋独立搜寻
+			min_deg = 7.0
+			step_deg = 5.0
+			try:
+				min_deg = float(cfg.get('corner_min_deg', 7.0))
+				step_deg = float(cfg.get('corner_search_step_deg', 5.0))
+			except Exception:
+				pass
+			min_deg = max(1.0, min(min_deg, corner_thresh))
+			step_deg = max(0.5, min(step_deg, corner_thresh))
+			thr = cmin - step_deg
+			while thr >= min_deg and (first_corner is None or last_corner is None):
 				if first_corner is None:
-					thr = cmin - step_deg
-					while thr >= min_deg and first_corner is None:
-						cand2 = [i for i in range(1, len(pts)-1) if (lambda ang: (ang >= thr and ang <= cmax))(_turn(pts[i-1], pts[i], pts[i+1]))]
-						for i in cand2:
-							if pos(i) <= first_region:
-								first_corner = i
-								break
-						thr -= step_deg
+					first_corner = _pick(in_first, thr, False)
 				if last_corner is None:
-					thr = cmin - step_deg
-					while thr >= min_deg and last_corner is None:
-						cand2 = [i for i in range(1, len(pts)-1) if (lambda ang: (ang >= thr and ang <= cmax))(_turn(pts[i-1], pts[i], pts[i+1]))]
-						for i in reversed(cand2):
-							if pos(i) >= (1.0 - last_region):
-								last_corner = i
-								break
-						thr -= step_deg
-			else:
-				first_corner = None
-				last_corner = None
+					last_corner = _pick(in_last, thr, True)
+				thr -= step_deg
 
 			# 不强制三段：若未命中窗口的折点，则相应段与“中间段”同色（满足“颜色自然而然保持一致”）
-
-			for i in range(N - 1):
-				p0 = stroke_points[i]
-				p1 = stroke_points[i+1]
-				t = (i + 0.5) / float(max(1, N - 1))
-				w_scale = _eval_profile(profile, t)
-				# Convert normalized width_base (~0-0.1) to pixel width (heuristic factor)
-				stroke_width = max(0.5, width_base * w_scale * (self.size_px * 0.08))
-				x0, y0 = self._to_px(p0)
-				x1, y1 = self._to_px(p1)
-				path_d = f"M{x0:.2f},{y0:.2f} L{x1:.2f},{y1:.2f}"
-				# choose color by segment index
-				if first_corner is not None and i <= first_corner:
-					color = start_color
-				elif last_corner is not None and i >= last_corner:
-					color = peak_color
-				else:
-					color = middle_color
-				seg = dwg.path(d=path_d, stroke=color, fill="none", stroke_width=stroke_width, stroke_linecap="round", stroke_linejoin=linejoin)
-				dwg.add(seg)
-		dwg.save()
+			# 线段宽度按中点参数求值；同色连续线段合并为一条折线，宽度取该段均值
+			w_scales = eval_profile_array(profile, (np.arange(N - 1) + 0.5) / float(max(1, N - 1)))
+			widths = np.maximum(0.5, width_base * w_scales * (self.size_px * 0.08))
+			colors = (start_color, middle_color, peak_color)
+			px = self._to_px_array(P)
+			for label, a, b in runs_from_labels(corner_labels(N - 1, first_corner, last_corner)):
+				path_d = format_polyline(px[a:b + 1], precision=2)
+				dwg.stroke_path(path_d, stroke=colors[label], width=round(float(widths[a:b].mean()), 4), linejoin=linejoin)
+		return self._emit(dwg.getvalue(), filename)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+# 笔画线段分类的向量化基础操作（起笔/中间/笔锋三色预览共用）
+
+# 线段标签
+START, MIDDLE, PEAK, ISOLATE, SHORT_FIRST, SHORT_SECOND = range(6)
+
+Run = Tuple[int, np.ndarray]
+
+
+def _turn_and_valid(P: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(P)
+    ang = np.zeros(n, dtype=float)
+    ok = np.zeros(n, dtype=bool)
+    if n < 3:
+        return ang, ok
+    v = np.diff(P, axis=0)
+    v1 = v[:-1]
+    v2 = v[1:]
+    n1 = np.hypot(v1[:, 0], v1[:, 1])
+    n2 = np.hypot(v2[:, 0], v2[:, 1])
+    ok = (n1 >= 1e-9) & (n2 >= 1e-9)
+    den = np.where(ok, n1 * n2, 1.0)
+    cosv = np.clip((v1[:, 0] * v2[:, 0] + v1[:, 1] * v2[:, 1]) / den, -1.0, 1.0)
+    ang[1:-1] = np.where(ok, np.degrees(np.arccos(cosv)), 0.0)
+    ok_full = np.zeros(n, dtype=bool)
+    ok_full[1:-1] = ok
+    return ang, ok_full
+
+
+def turn_angles_deg(P: np.ndarray) -> np.ndarray:
+    """内部顶点 1..n-2 处相邻线段向量的夹角（acos，0..180°），长度 n，端点为 0。
+    任一相邻线段长度 < 1e-9 时记为 0（与逐点 _turn 一致）。"""
+    return _turn_and_valid(P)[0]
+
+
+def interior_angles_deg(P: np.ndarray) -> np.ndarray:
+    """顶点内角 180-转角（直线为 180°）；端点及退化顶点为 0。"""
+    turn, ok = _turn_and_valid(P)
+    return np.where(ok, 180.0 - turn, 0.0)
+
+
+def arc_positions(P: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """返回 (各线段长度, 各顶点累计弧长占比 cum/total, total)；total 至少 1e-9。"""
+    seg = np.hypot(*np.diff(P, axis=0).T) if len(P) >= 2 else np.zeros(0)
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    total = max(1e-9, float(cum[-1]))
+    return seg, cum / total, total
+
+
+def runs_from_labels(labels: np.ndarray) -> List[Tuple[int, int, int]]:
+    """把逐线段标签合并为连续段 [(label, seg_begin, seg_end_exclusive), ...]。"""
+    labels = np.asarray(labels)
+    if len(labels) == 0:
+        return []
+    cut = np.nonzero(labels[1:] != labels[:-1])[0] + 1
+    starts = np.concatenate([[0], cut])
+    ends = np.concatenate([cut, [len(labels)]])
+    return [(int(labels[a]), int(a), int(b)) for a, b in zip(starts.tolist(), ends.tolist())]
+
+
+def corner_labels(nseg: int, first_corner: Optional[int], last_corner: Optional[int],
+                  start_inclusive: bool = True) -> np.ndarray:
+    """线段标签：0=起笔(i<=first_corner，start_inclusive=False 时 i<first_corner)，
+    2=笔锋(i>=last_corner)，1=中间；起笔优先。"""
+    idx = np.arange(nseg)
+    labels = np.ones(nseg, dtype=np.int8)
+    if last_corner is not None:
+        labels[idx >= last_corner] = PEAK
+    if first_corner is not None:
+        labels[(idx <= first_corner) if start_inclusive else (idx < first_corner)] = START
+    return labels
+
+
+class StrokeGeometry(NamedTuple):
+    """单笔预计算量：点列、线段长度、累计弧长（绝对值）、总长、转角。
+    B/C/D1 预览及短笔画遮罩共用，避免每个面板各算一遍。"""
+    P: np.ndarray
+    seg: np.ndarray
+    cum: np.ndarray
+    total: float
+    turn: np.ndarray
+    valid: np.ndarray
+
+
+def stroke_geometry(stroke: Sequence[Tuple[float, float]]) -> Optional[StrokeGeometry]:
+    if not stroke or len(stroke) < 2:
+        return None
+    P = np.asarray(stroke, dtype=float).reshape(-1, 2)
+    seg = np.hypot(*np.diff(P, axis=0).T)
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    turn, ok = _turn_and_valid(P)
+    return StrokeGeometry(P, seg, cum, float(cum[-1]), turn, ok)
+
+
+def glyph_geometry(medians: Sequence[Sequence[Tuple[float, float]]]) -> List[Optional[StrokeGeometry]]:
+    return [stroke_geometry(st) for st in medians]
+
+
+def short_mask(geoms: Sequence[Optional[StrokeGeometry]], min_len: float) -> List[bool]:
+    """总弧长 < min_len 的笔画（不足两点的笔画为 False）。"""
+    return [bool(g is not None and g.total < min_len) for g in geoms]
+
+
+def labels_to_runs(P: np.ndarray, labels: np.ndarray) -> List[Run]:
+    """逐线段标签 -> [(label, 该段连续点列)]，相邻同标签线段合并为一条折线。"""
+    return [(lab, P[a:b + 1]) for lab, a, b in runs_from_labels(labels)]
+
+
+def _window_lengths(total: float, sr: float, er: float) -> Tuple[float, float]:
+    start_len = max(0.0, min(total, sr * total))
+    tip_len = max(0.0, min(total, (1.0 - er) * total))
+    if tip_len <= start_len:
+        tip_len = min(total, start_len + 0.05 * total)
+    return start_len, tip_len
+
+
+def window_runs(g: StrokeGeometry, sr: float, er: float,
+                isolate_min_len: Optional[float] = None) -> List[Run]:
+    """按弧长比例窗口切分：起笔窗口 | 中间 | 笔锋窗口，窗口边界落在线段内部时插值分割。
+    isolate_min_len 给定且总长不足时整笔标为 ISOLATE。总长为 0 返回 []。"""
+    P, seg, cum, total = g.P, g.seg, g.cum, g.total
+    if total <= 1e-12:
+        return []
+    if isolate_min_len is not None and total < max(0.0, float(isolate_min_len)):
+        return [(ISOLATE, P)]
+    nseg = len(seg)
+    start_len, tip_len = _window_lengths(total, sr, er)
+    js, jt = (np.clip(np.searchsorted(cum, [start_len, tip_len], side='right') - 1, 0, nseg - 1)).tolist()
+
+    def cut(j: int, length: float) -> np.ndarray:
+        r = 0.0 if seg[j] <= 1e-12 else (length - cum[j]) / seg[j]
+        return P[j] + (P[j + 1] - P[j]) * r
+
+    p_start = cut(js, start_len) if start_len > 0 else P[0]
+    p_tip = cut(jt, tip_len) if tip_len < total else P[-1]
+    runs: List[Run] = []
+    head = P[:js + 1]
+    if start_len > 0:
+        head = np.vstack([head, p_start])
+    if len(head) >= 2:
+        runs.append((START, head))
+    runs.append((MIDDLE, np.vstack([p_start, P[js + 1:jt + 1], p_tip]) if js != jt else np.vstack([p_start, p_tip])))
+    if tip_len < total:
+        runs.append((PEAK, np.vstack([p_tip, P[jt + 1:]])))
+    return runs
+
+
+def segmented_runs(g: StrokeGeometry, corner_thresh: float, frac_fallback: float) -> List[Run]:
+    """全笔转角 >= corner_thresh 的首/末折点分段；无可用折点时按点数比例回退。"""
+    n = len(g.P)
+    corners = np.nonzero(g.turn[1:-1] >= corner_thresh)[0] + 1
+    fc = int(corners[0]) if len(corners) else None
+    lc = int(corners[-1]) if len(corners) else None
+    if fc is None or lc is None or fc >= lc:
+        fc = max(0, min(n - 2, int(round(frac_fallback * (n - 1)))))
+        lc = max(fc + 1, min(n - 2, int(round((1.0 - frac_fallback) * (n - 1)))))
+    return labels_to_runs(g.P, corner_labels(n - 1, fc, lc))
+
+
+def _angle_at(angles: np.ndarray, i: Optional[int]) -> Optional[float]:
+    if i is None or not (0 <= i < len(angles)):
+        return None
+    return round(float(angles[i]), 1)
+
+
+def mixed_runs(g: StrokeGeometry, *, is_short: bool, sr: float, er: float,
+               corner_min: float, corner_max: float,
+               fixed: Optional[Dict[str, Any]] = None) -> Tuple[List[Run], Optional[Dict[str, Any]]]:
+    """处理后中轴的着色分段。返回 (runs, debug)；总长为 0 的普通笔画返回 ([], None)。
+
+    - 短笔画：取内角最大的顶点作为唯一折点（无有效折点取中点），两段 SHORT_FIRST/SHORT_SECOND
+    - 普通笔画：首折点在起笔窗口内取第一个、末折点在笔锋窗口内取最后一个内角落在
+      [corner_min, corner_max] 的顶点；fixed 给出时直接采用其 first_idx/last_idx
+    """
+    P = g.P
+    n = len(P)
+    angles = np.where(g.valid, 180.0 - g.turn, 0.0)
+    if is_short:
+        if n == 2:
+            return [(SHORT_FIRST, P)], {'is_short': True, 'short_split_idx': 0, 'short_angle': None,
+                                        'first_idx': None, 'last_idx': None, 'first_angle': None, 'last_angle': None}
+        best_i = int(np.argmax(angles[1:-1])) + 1
+        best_ang = float(angles[best_i])
+        split_i = best_i if best_ang > 0.5 else max(1, (n - 1) // 2)
+        labels = np.where(np.arange(n - 1) < split_i, SHORT_FIRST, SHORT_SECOND)
+        return labels_to_runs(P, labels), {'is_short': True, 'short_split_idx': split_i, 'short_angle': round(best_ang, 1),
+                                           'first_idx': None, 'last_idx': None, 'first_angle': None, 'last_angle': None}
+    if g.total <= 1e-12:
+        return [], None
+    if fixed is not None:
+        first = fixed.get('first_idx', None)
+        last = fixed.get('last_idx', None)
+    else:
+        start_len, tip_len = _window_lengths(g.total, sr, er)
+        inner = angles[1:-1]
+        in_range = (inner >= corner_min) & (inner <= corner_max)
+        cand_first = np.nonzero(in_range & (g.cum[1:-1] <= start_len))[0]
+        cand_last = np.nonzero(in_range & (g.cum[1:-1] >= tip_len))[0]
+        first = int(cand_first[0]) + 1 if len(cand_first) else None
+        last = int(cand_last[-1]) + 1 if len(cand_last) else None
+    # 退化规则：两端都有且 first<last → 蓝|灰|红；仅一端存在 → 只着色该端；否则全灰
+    if first is not None and last is not None and not first < last:
+        first = last = None
+    labels = corner_labels(n - 1, first, last, start_inclusive=False)
+    dbg = {'is_short': False,
+           'first_idx': None if first is None else int(first), 'last_idx': None if last is None else int(last),
+           'first_angle': _angle_at(angles, first), 'last_angle': _angle_at(angles, last)}
+    return labels_to_runs(P, labels), dbg
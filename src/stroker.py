@@ -2,29 +2,14 @@ from __future__ import annotations
 from typing import List, Tuple, Dict, Any
 import numpy as np
 import math
-from .pressure import compute_pressure_scale
-from .pen_tip import compute_nib_taper
+from .pressure import pressure_scale_for_samples
+from .pen_tip import nib_taper_for_samples
+from .profiles import profile_curve, unit_grid
+from .geometry import pack_strokes
 
 Point = Tuple[float, float]
 
 
-def _eval_profile(profile: Dict[str, Any], t: float) -> float:
-	pts = profile.get("points") or []
-	if not pts:
-		return 1.0
-	if t <= pts[0][0]:
-		return float(pts[0][1])
-	for i in range(len(pts) - 1):
-		t0, y0 = float(pts[i][0]), float(pts[i][1])
-		t1, y1 = float(pts[i + 1][0]), float(pts[i + 1][1])
-		if t0 <= t <= t1:
-			if t1 - t0 < 1e-9:
-				return y1
-			r = (t - t0) / (t1 - t0)
-			return y0 * (1 - r) + y1 * r
-	return float(pts[-1][1])
-
-
 def _resample_polyline(points: List[Point], num_samples: int = 128) -> List[Point]:
 	if not points:
 		return []
@@ -36,19 +21,9 @@ def _resample_polyline(points: List[Point], num_samples: int = 128) -> List[Poin
 	cum = np.concatenate([[0.0], np.cumsum(seg)])
 	total = cum[-1]
 	samples = np.linspace(0.0, total, num_samples)
-	res = []
-	j = 0
-	for s in samples:
-		while j + 1 < len(cum) and cum[j + 1] < s:
-			j += 1
-		if j >= len(seg):
-			res.append(tuple(P[-1]))
-			continue
-		den = seg[j] if seg[j] > 1e-12 else 1.0
-		r = (s - cum[j]) / den
-		Q = P[j] * (1 - r) + P[j + 1] * r
-		res.append((float(Q[0]), float(Q[1])))
-	return res
+	# 弧长参数上的分段线性插值（零长度线段的重复点不影响结果）
+	Q = np.stack([np.interp(samples, cum, P[:, 0]), np.interp(samples, cum, P[:, 1])], axis=1)
+	return [(float(x), float(y)) for x, y in Q.tolist()]
 
 
 def _to_float(v: Any, default: float) -> float:
@@ -58,6 +33,15 @@ def _to_float(v: Any, default: float) -> float:
 		return default
 
 
+def stroke_half_width(style: Dict[str, Any], samples: int) -> np.ndarray:
+	"""Half width along linspace(0,1,samples): width_base * profile * pressure * nib / 2, clipped."""
+	th = style.get("thickness", {}) if isinstance(style, dict) else {}
+	width_base = _to_float(th.get("width_base", 0.04), 0.04)
+	profile_w = th.get("width_profile", {}) if isinstance(th, dict) else {}
+	w_half = width_base * profile_curve(profile_w, samples) * pressure_scale_for_samples(style, samples) * nib_taper_for_samples(style, samples) * 0.5
+	return np.clip(w_half, 0.0015, 0.12)
+
+
 def build_stroke_polygon(points: List[Point], style: Dict[str, Any], samples: int = 128) -> List[Point]:
 	if len(points) < 2:
 		return points
@@ -71,23 +55,70 @@ def build_stroke_polygon(points: List[Point], style: Dict[str, Any], samples: in
 	# normals (perpendicular)
 	normal = np.stack([-tangent[:, 1], tangent[:, 0]], axis=1)
 
-	th = style.get("thickness", {}) if isinstance(style, dict) else {}
-	width_base = _to_float(th.get("width_base", 0.04), 0.04)
-	profile_w = th.get("width_profile", {}) if isinstance(th, dict) else {}
-
-	# parameterization
-	ts = np.linspace(0.0, 1.0, len(P))
-
-	# pressure + nib taper
-	pressure_scale = compute_pressure_scale(ts, style)
-	nib_scale = compute_nib_taper(ts, style)
-	w_scale = np.array([_eval_profile(profile_w, float(t)) for t in ts], dtype=float)
-
-	# final half widths
-	w_half = width_base * w_scale * pressure_scale * nib_scale * 0.5
-	w_half = np.clip(w_half, 0.0015, 0.12)
+	# width profile + pressure + nib taper on ts = linspace(0,1,n)（各曲线按参数缓存）
+	w_half = stroke_half_width(style, len(P))
 
 	left = P + normal * w_half.reshape(-1, 1)
 	right = P - normal * w_half.reshape(-1, 1)
 	poly = np.vstack([left, right[::-1]])
 	return [(float(x), float(y)) for x, y in poly]
+
+
+def build_glyph_polygons(medians: List[List[Point]], styles: List[Dict[str, Any]], samples: int = 128) -> Tuple[np.ndarray, np.ndarray]:
+	"""Whole-glyph version of build_stroke_polygon.
+
+	All strokes are resampled (arc length), differentiated and offset in one
+	vectorized pass over a (S, samples, 2) array. Returns a contiguous polygon
+	buffer (M,2) plus offsets (K+1,), one polygon per non-empty stroke in
+	zip(medians, styles) order; degenerate strokes fall back to build_stroke_polygon.
+	"""
+	pairs = [(st, style) for st, style in zip(medians, styles) if st]
+	if not pairs:
+		return np.zeros((0, 2), dtype=float), np.zeros(1, dtype=np.int64)
+	polys: List[np.ndarray | None] = [None] * len(pairs)
+
+	# 可批量处理的笔画：至少2点且总长 > 0
+	P, offsets = pack_strokes([st for st, _ in pairs])
+	counts = np.diff(offsets)
+	d = np.zeros_like(P)
+	d[1:] = P[1:] - P[:-1]
+	d[offsets[:-1]] = 0.0
+	seg = np.sqrt(np.einsum("ij,ij->i", d, d))
+	sid = np.repeat(np.arange(len(pairs)), counts)
+	total = np.bincount(sid, weights=seg, minlength=len(pairs))
+	batch = (counts >= 2) & (total > 1e-12)
+
+	idx = np.nonzero(batch)[0]
+	if len(idx):
+		keep = batch[sid]
+		Pb = P[keep]
+		sb = sid[keep]
+		rank = np.cumsum(batch) - 1  # 批内序号
+		cum = np.cumsum(seg[keep])
+		first = np.searchsorted(sb, idx)
+		cum = cum - np.repeat(cum[first], counts[idx])
+		# 每笔弧长归一到 [0,1] 后平移到 [2r, 2r+1]，一次 np.interp 完成全部笔画的重采样
+		key = 2.0 * rank[sb] + cum / total[sb]
+		ts = unit_grid(samples)
+		target = (2.0 * np.arange(len(idx))[:, None] + ts[None, :]).ravel()
+		R = np.stack([np.interp(target, key, Pb[:, 0]), np.interp(target, key, Pb[:, 1])], axis=-1)
+		R = R.reshape(len(idx), samples, 2)
+		# tangents / normals
+		dR = np.gradient(R, axis=1)
+		norms = np.linalg.norm(dR, axis=2, keepdims=True)
+		norms[norms < 1e-9] = 1.0
+		tangent = dR / norms
+		normal = np.stack([-tangent[..., 1], tangent[..., 0]], axis=-1)
+		w_half = np.stack([stroke_half_width(pairs[k][1], samples) for k in idx.tolist()])[..., None]
+		poly = np.concatenate([R + normal * w_half, (R - normal * w_half)[:, ::-1]], axis=1)
+		for j, k in enumerate(idx.tolist()):
+			polys[k] = poly[j]
+
+	for k in np.nonzero(~batch)[0].tolist():
+		st, style = pairs[k]
+		polys[k] = np.asarray(build_stroke_polygon(st, style, samples=samples), dtype=float).reshape(-1, 2)
+
+	lens = np.fromiter((len(p) for p in polys), dtype=np.int64, count=len(polys))
+	out_offsets = np.zeros(len(polys) + 1, dtype=np.int64)
+	np.cumsum(lens, out=out_offsets[1:])
+	return np.concatenate(polys, axis=0), out_offsets
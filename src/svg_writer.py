@@ -0,0 +1,83 @@
+from __future__ import annotations
+import io
+from typing import Any, IO, Optional
+
+# 轻量 SVG 输出器：替代 svgwrite.Drawing 的对象树 + 逐属性校验。
+# 模板在模块加载时格式化一次，渲染时只做字符串写入；输出与 svgwrite 保存结果逐字节一致
+# （属性按名称排序、自闭合标签带空格、无换行）。
+
+_HEADER = (
+    '<?xml version="1.0" encoding="utf-8" ?>\n'
+    '<svg baseProfile="full" height="{h}" version="1.1" width="{w}" '
+    'xmlns="http://www.w3.org/2000/svg" xmlns:ev="http://www.w3.org/2001/xml-events" '
+    'xmlns:xlink="http://www.w3.org/1999/xlink"><defs />'
+)
+_RECT = '<rect fill="{fill}" height="{h}" width="{w}" x="{x}" y="{y}" />'
+_FILL_PATH = '<path d="{d}" fill="{fill}" stroke="none" />'
+_OUTLINE_PATH = '<path d="{d}" fill="{fill}" fill-rule="nonzero" stroke="none" />'
+_STROKE_PATH = ('<path d="{d}" fill="none" stroke="{stroke}" stroke-linecap="round" '
+                'stroke-linejoin="{join}" stroke-width="{width}" />')
+_GROUP_OPEN = '<g transform="{transform}">'
+
+_LINEJOINS = ("round", "miter", "bevel")
+
+
+def _escape(value: Any) -> str:
+    s = str(value)
+    if "&" in s or "<" in s or ">" in s or '"' in s:
+        s = s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    return s
+
+
+def rgb(r: int, g: int, b: int) -> str:
+    """svgwrite.rgb 的等价写法。"""
+    return f"rgb({int(r)},{int(g)},{int(b)})"
+
+
+class SvgWriter:
+    """Streaming SVG emitter writing into a text stream (io.StringIO by default)."""
+
+    def __init__(self, width: int, height: int, stream: Optional[IO[str]] = None):
+        self._out = stream if stream is not None else io.StringIO()
+        self._depth = 0
+        self._closed = False
+        self._out.write(_HEADER.format(w=int(width), h=int(height)))
+
+    def rect(self, x: float, y: float, width: float, height: float, fill: str) -> None:
+        self._out.write(_RECT.format(x=x, y=y, w=width, h=height, fill=_escape(fill)))
+
+    def fill_path(self, d: str, fill: str = "black") -> None:
+        self._out.write(_FILL_PATH.format(d=d, fill=_escape(fill)))
+
+    def outline_path(self, d: str, fill: str = "black") -> None:
+        self._out.write(_OUTLINE_PATH.format(d=_escape(d), fill=_escape(fill)))
+
+    def stroke_path(self, d: str, stroke: str, width: float, linejoin: str = "round") -> None:
+        if linejoin not in _LINEJOINS:
+            raise ValueError(f"invalid stroke-linejoin: {linejoin}")
+        self._out.write(_STROKE_PATH.format(d=d, stroke=_escape(stroke), join=linejoin, width=width))
+
+    def open_group(self, transform: str) -> None:
+        self._out.write(_GROUP_OPEN.format(transform=_escape(transform)))
+        self._depth += 1
+
+    def close_group(self) -> None:
+        if self._depth <= 0:
+            raise ValueError("no open group")
+        self._out.write("</g>")
+        self._depth -= 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        while self._depth > 0:
+            self.close_group()
+        self._out.write("</svg>")
+        self._closed = True
+
+    def getvalue(self) -> str:
+        self.close()
+        return self._out.getvalue()
+
+    def to_bytes(self) -> bytes:
+        return self.getvalue().encode("utf-8")
@@ -0,0 +1,280 @@
+from __future__ import annotations
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.svgpath import Pt, fmt_number, iter_path_commands
+
+# SVG 文档的单遍扫描与改写：逐个开始标签解析一次属性（单/双引号均可，属性名整体匹配，
+# 不会把 id="..." 误当成 d="..."），几何元素的路径命令按需解析并缓存；
+# 变形、包围盒、改色等都以 visitor 形式挂在同一遍扫描上。
+# 未被改动的元素原样输出，文档其余文本（注释、CDATA、文本节点、结束标签）不动。
+
+_MARKUP = re.compile(
+    r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE[^>]*>"
+    r"|<([A-Za-z][\w:.-]*)((?:\s+[^\s=/>]+\s*=\s*(?:\"[^\"]*\"|'[^']*'))*)\s*(/?)>",
+    re.S,
+)
+_ATTR = re.compile(r"([^\s=/>]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+_NUM = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+SHAPE_TAGS = ("path", "rect", "circle", "ellipse", "line", "polyline", "polygon")
+Command = Tuple[str, List[Pt]]
+
+
+def _num(v: Optional[str], default: float = 0.0) -> float:
+    m = _NUM.match(v.strip()) if v else None
+    return float(m.group(0)) if m else default
+
+
+def shape_commands(tag: str, attrs: Dict[str, str]) -> List[Command]:
+    """基本形状 -> 绝对坐标命令流（与 iter_path_commands 同格式）；圆与椭圆用 4 段三次贝塞尔。"""
+    if tag == "path":
+        return list(iter_path_commands(attrs.get("d", "")))
+    if tag == "rect":
+        x, y = _num(attrs.get("x")), _num(attrs.get("y"))
+        w, h = _num(attrs.get("width")), _num(attrs.get("height"))
+        if w <= 0 or h <= 0:
+            return []
+        return [("M", [(x, y)]), ("L", [(x + w, y)]), ("L", [(x + w, y + h)]), ("L", [(x, y + h)]), ("Z", [(x, y)])]
+    if tag in ("circle", "ellipse"):
+        cx, cy = _num(attrs.get("cx")), _num(attrs.get("cy"))
+        rx = _num(attrs.get("r")) if tag == "circle" else _num(attrs.get("rx"))
+        ry = rx if tag == "circle" else _num(attrs.get("ry"))
+        if rx <= 0 or ry <= 0:
+            return []
+        k = 0.5522847498307936  # 4/3*(sqrt(2)-1)
+        # 四个象限各一段：(端点方向, 起点切向) 单位向量
+        quads = [((1, 0), (0, 1)), ((0, 1), (-1, 0)), ((-1, 0), (0, -1)), ((0, -1), (1, 0))]
+        out: List[Command] = [("M", [(cx + rx, cy)])]
+        for (ux, uy), (vx, vy) in quads:
+            # 起点 u、终点 v；控制点沿各自切向偏移 k 倍半径
+            c1 = (cx + rx * (ux + k * vx), cy + ry * (uy + k * vy))
+            c2 = (cx + rx * (vx + k * ux), cy + ry * (vy + k * uy))
+            out.append(("C", [c1, c2, (cx + rx * vx, cy + ry * vy)]))
+        out.append(("Z", [(cx + rx, cy)]))
+        return out
+    if tag == "line":
+        p0 = (_num(attrs.get("x1")), _num(attrs.get("y1")))
+        p1 = (_num(attrs.get("x2")), _num(attrs.get("y2")))
+        return [("M", [p0]), ("L", [p1])]
+    if tag in ("polyline", "polygon"):
+        v = [float(t) for t in _NUM.findall(attrs.get("points", ""))]
+        pts = list(zip(v[0:len(v) - 1:2], v[1::2]))
+        if not pts:
+            return []
+        out = [("M", [pts[0]])] + [("L", [p]) for p in pts[1:]]
+        if tag == "polygon":
+            out.append(("Z", [pts[0]]))
+        return out
+    return []
+
+
+def commands_to_d(commands: Iterable[Command], decimals: int = 2) -> str:
+    """绝对坐标命令流 -> path d（绝对命令，最短数字写法）。"""
+    parts: List[str] = []
+    for cmd, pts in commands:
+        if cmd == "Z":
+            parts.append("Z")
+            continue
+        nums = [fmt_number(c, decimals) for p in pts for c in p]
+        body = nums[0] + "".join(t if t[0] == "-" else " " + t for t in nums[1:])
+        parts.append(cmd + body)
+    return "".join(parts)
+
+
+class SvgElement:
+    """扫描到的一个开始标签。visitor 可读写属性、替换几何（commands / d）或标记删除。"""
+
+    __slots__ = ("tag", "attrs", "self_closing", "source", "dropped", "_commands", "_dirty")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], self_closing: bool, source: str):
+        self.tag = tag
+        self.attrs = attrs
+        self.self_closing = self_closing
+        self.source = source
+        self.dropped = False
+        self._commands: Optional[List[Command]] = None
+        self._dirty = False
+
+    @property
+    def is_shape(self) -> bool:
+        return self.tag in SHAPE_TAGS
+
+    @property
+    def commands(self) -> List[Command]:
+        """绝对坐标命令流（懒解析，同一元素只解析一次）；非几何元素为空。"""
+        if self._commands is None:
+            self._commands = shape_commands(self.tag, self.attrs) if self.is_shape else []
+        return self._commands
+
+    def points(self) -> np.ndarray:
+        """所有端点与控制点 (N,2)（控制点凸包包含曲线本身）。"""
+        pts = [p for cmd, ps in self.commands if cmd != "Z" for p in ps]
+        return np.asarray(pts, dtype=float).reshape(-1, 2)
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.attrs.get(name, default)
+
+    def set(self, name: str, value: Optional[str]) -> None:
+        if value is None:
+            if name in self.attrs:
+                del self.attrs[name]
+                self._dirty = True
+        elif self.attrs.get(name) != value:
+            self.attrs[name] = value
+            self._dirty = True
+
+    def set_path(self, d: str) -> None:
+        """把元素替换为 <path d=...>（基本形状的几何属性随之去掉）。
+        <line> 从不填充，而 path 默认黑色填充：转换时补 fill="none"（变形成曲线后也不会填出细条）。"""
+        if self.tag != "path":
+            for k in _GEOMETRY_ATTRS.get(self.tag, ()):
+                self.attrs.pop(k, None)
+            if self.tag == "line":
+                self.attrs["fill"] = "none"
+            self.tag = "path"
+        self.attrs = {"d": d, **{k: v for k, v in self.attrs.items() if k != "d"}}
+        self._commands = None
+        self._dirty = True
+
+    def drop(self) -> None:
+        """删除元素（仅限自闭合元素，容器元素忽略）。"""
+        if self.self_closing:
+            self.dropped = True
+
+    def serialize(self) -> str:
+        if self.dropped:
+            return ""
+        if not self._dirty:
+            return self.source
+        attrs = "".join(f' {k}="{v.replace(chr(34), "&quot;")}"' for k, v in self.attrs.items())
+        return f"<{self.tag}{attrs}{'/' if self.self_closing else ''}>"
+
+
+_GEOMETRY_ATTRS = {
+    "rect": ("x", "y", "width", "height", "rx", "ry"),
+    "circle": ("cx", "cy", "r"),
+    "ellipse": ("cx", "cy", "rx", "ry"),
+    "line": ("x1", "y1", "x2", "y2"),
+    "polyline": ("points",),
+    "polygon": ("points",),
+}
+
+Visitor = Callable[[SvgElement], None]
+
+
+def iter_elements(svg: str) -> Iterable[Tuple[int, int, SvgElement]]:
+    """逐个产出 (起始偏移, 结束偏移, 元素)；注释/CDATA/处理指令跳过。"""
+    for m in _MARKUP.finditer(svg):
+        tag = m.group(1)
+        if tag is None:
+            continue
+        attrs = {a.group(1): (a.group(2) if a.group(2) is not None else a.group(3))
+                 for a in _ATTR.finditer(m.group(2) or "")}
+        yield m.start(), m.end(), SvgElement(tag, attrs, bool(m.group(3)), m.group(0))
+
+
+def rewrite_svg(svg: str, visitors: Sequence[Visitor]) -> str:
+    """单遍扫描文档，依次对每个元素调用各 visitor，再把改动过的元素重新序列化。"""
+    out: List[str] = []
+    pos = 0
+    for start, end, el in iter_elements(svg):
+        for visit in visitors:
+            visit(el)
+            if el.dropped:
+                break
+        text = el.serialize()
+        if text is not el.source:
+            out.append(svg[pos:start])
+            out.append(text)
+            pos = end
+    if pos == 0:
+        return svg
+    out.append(svg[pos:])
+    return "".join(out)
+
+
+def visit_svg(svg: str, visitors: Sequence[Visitor]) -> None:
+    """只读遍历（不序列化），用于包围盒等统计。"""
+    for _, _, el in iter_elements(svg):
+        for visit in visitors:
+            visit(el)
+
+
+# ---- 常用 visitor ----
+
+_WHITE = ("white", "#fff", "#ffffff")
+
+
+def is_background_rect(el: SvgElement) -> bool:
+    """纯白填充、无描边的 rect 视为背景。"""
+    return el.tag == "rect" and (el.get("fill") or "").strip().lower() in _WHITE and "stroke" not in el.attrs
+
+
+class BoundsVisitor:
+    """累计几何元素（不含背景矩形）的端点与控制点包围盒。"""
+
+    def __init__(self, skip_background: bool = True):
+        self.skip_background = skip_background
+        self.min_x = self.min_y = float("inf")
+        self.max_x = self.max_y = float("-inf")
+
+    def __call__(self, el: SvgElement) -> None:
+        if not el.is_shape or (self.skip_background and is_background_rect(el)):
+            return
+        pts = el.points()
+        pts = pts[np.isfinite(pts).all(axis=1)]
+        if len(pts):
+            self.min_x = min(self.min_x, float(pts[:, 0].min()))
+            self.min_y = min(self.min_y, float(pts[:, 1].min()))
+            self.max_x = max(self.max_x, float(pts[:, 0].max()))
+            self.max_y = max(self.max_y, float(pts[:, 1].max()))
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        if self.min_x == float("inf"):
+            return None
+        return (self.min_x, self.min_y, self.max_x, self.max_y)
+
+
+def svg_bounds(svg: str) -> Optional[Tuple[float, float, float, float]]:
+    """文档内几何元素的包围盒 (min_x, min_y, max_x, max_y)；无几何时返回 None。"""
+    v = BoundsVisitor()
+    visit_svg(svg, [v])
+    return v.bounds
+
+
+def recolor_strokes(color: str = "#000000") -> Visitor:
+    """把所有可见描边颜色改为 color（none/透明/白色与渐变引用保留）。"""
+    keep = ("none", "transparent", "currentcolor") + _WHITE
+
+    def visit(el: SvgElement) -> None:
+        v = el.get("stroke")
+        if v is not None and v.strip().lower() not in keep and not v.strip().startswith("url("):
+            el.set("stroke", color)
+    return visit
+
+
+def drop_background_rects(el: SvgElement) -> None:
+    """删除背景矩形。按解析后的属性判断（不是对文本做替换），本项目生成器的背景都是自闭合的
+    顶层 <rect fill="white"/>，笔画为 path/描边，不会被误删。"""
+    if is_background_rect(el):
+        el.drop()
+
+
+def drop_empty_defs(el: SvgElement) -> None:
+    if el.tag == "defs":
+        el.drop()
+
+
+def shapes_to_paths(skip_background: bool = True) -> Visitor:
+    """基本形状转为 <path>（背景矩形保留），便于后续按路径统一处理。"""
+    def visit(el: SvgElement) -> None:
+        if el.tag == "path" or not el.is_shape or (skip_background and is_background_rect(el)):
+            return
+        cmds = el.commands
+        if cmds:
+            el.set_path(commands_to_d(cmds))
+    return visit
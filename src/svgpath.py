@@ -0,0 +1,336 @@
+from __future__ import annotations
+import math
+import re
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+import numpy as np
+
+# SVG path 数据的批量格式化（替代逐点 f-string 拼接）
+
+
+@lru_cache(maxsize=512)
+def _polyline_template(n: int, precision: int, closed: bool, lineto: bool = False) -> str:
+    fmt = f"%.{precision}f,%.{precision}f"
+    tmpl = "M" + fmt + ((" L" if lineto else " ") + fmt) * (n - 1)
+    return tmpl + " Z" if closed else tmpl
+
+
+def format_polyline(points: np.ndarray, precision: int = 2, closed: bool = False, lineto: bool = False) -> str:
+    """(n,2) 点列 -> 'Mx,y x,y ...[ Z]'；lineto=True 时每点显式写 L（'Mx,y Lx,y ...'）。"""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(pts) == 0:
+        return ""
+    return _polyline_template(len(pts), precision, closed, lineto) % tuple(pts.ravel().tolist())
+
+
+def format_polylines(buf: np.ndarray, offsets: np.ndarray, precision: int = 2, closed: bool = False) -> List[str]:
+    """连续缓冲区 + offsets -> 每段一条 path d 字符串（空段跳过）。"""
+    buf = np.asarray(buf, dtype=float).reshape(-1, 2)
+    flat = buf.ravel().tolist()
+    offs = np.asarray(offsets).tolist()
+    out: List[str] = []
+    for i in range(len(offs) - 1):
+        a, b = offs[i], offs[i + 1]
+        if b <= a:
+            continue
+        out.append(_polyline_template(b - a, precision, closed) % tuple(flat[2 * a:2 * b]))
+    return out
+
+
+# ---- path d 解析（栅格化/包围盒/变形用）：支持 M/L/H/V/C/S/Q/T/A/Z 绝对与相对命令 ----
+
+_PATH_TOKEN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_ARITY = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+Pt = Tuple[float, float]
+
+
+def scan_path(d: str) -> Iterator[Tuple[str, List[float]]]:
+    """单遍词法扫描：按原写法逐组产出 (命令字母, 参数)，隐式重复的命令逐组产出，
+    M/m 之后多余的坐标对按 L/l 产出。圆弧标志位可紧挨书写（'a5 5 0 0110 10'）。
+    遇到非法数据时停止（与 SVG 的错误处理一致：渲染到出错处为止）。"""
+    toks = _PATH_TOKEN.findall(d or "")
+    cmd = ""
+    i = 0
+    n_toks = len(toks)
+    while i < n_toks:
+        t = toks[i]
+        if t.isalpha():
+            cmd = t
+            i += 1
+            if cmd in "Zz":
+                yield cmd, []
+                cmd = ""
+                continue
+        elif not cmd:
+            return
+        up = cmd.upper()
+        n = _ARITY[up]
+        args: List[float] = []
+        while len(args) < n:
+            if i >= n_toks or toks[i].isalpha():
+                return
+            t = toks[i]
+            if up == "A" and len(args) in (3, 4):
+                # 标志位只占一个字符，其余部分留作下一个数
+                if t[0] not in "01":
+                    return
+                args.append(float(t[0]))
+                if len(t) > 1:
+                    toks[i] = t[1:]
+                    continue
+            else:
+                args.append(float(t))
+            i += 1
+        yield cmd, args
+        if up == "M":
+            cmd = "l" if cmd == "m" else "L"
+
+
+def arc_to_cubics(p0: Pt, rx: float, ry: float, phi_deg: float, large: bool, sweep: bool,
+                  p1: Pt) -> List[List[Pt]]:
+    """SVG 椭圆弧（端点参数）-> 若干段三次贝塞尔 [[c1, c2, p], ...]，每段不超过 90°。
+    半径为 0 时退化为直线，端点重合时省略（SVG 规范 F.6）。"""
+    x0, y0 = p0
+    x1, y1 = p1
+    if x0 == x1 and y0 == y1:
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return [[(x0, y0), (x1, y1), (x1, y1)]]
+    phi = math.radians(phi_deg % 360.0)
+    cp, sp = math.cos(phi), math.sin(phi)
+    dx, dy = (x0 - x1) / 2, (y0 - y1) / 2
+    xp, yp = cp * dx + sp * dy, -sp * dx + cp * dy
+    lam = (xp / rx) ** 2 + (yp / ry) ** 2
+    if lam > 1:
+        k = math.sqrt(lam)
+        rx, ry = rx * k, ry * k
+    num = rx * rx * ry * ry - rx * rx * yp * yp - ry * ry * xp * xp
+    den = rx * rx * yp * yp + ry * ry * xp * xp
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * yp / ry, -coef * ry * xp / rx
+    cx = cp * cxp - sp * cyp + (x0 + x1) / 2
+    cy = sp * cxp + cp * cyp + (y0 + y1) / 2
+    th0 = math.atan2((yp - cyp) / ry, (xp - cxp) / rx)
+    th1 = math.atan2((-yp - cyp) / ry, (-xp - cxp) / rx)
+    dth = th1 - th0
+    if sweep and dth < 0:
+        dth += 2 * math.pi
+    elif not sweep and dth > 0:
+        dth -= 2 * math.pi
+    segs = max(1, int(math.ceil(abs(dth) / (math.pi / 2) - 1e-9)))
+    step = dth / segs
+    alpha = 4.0 / 3.0 * math.tan(step / 4)
+
+    def at(th: float) -> Tuple[Pt, Pt]:
+        c, s_ = math.cos(th), math.sin(th)
+        pt = (cx + rx * c * cp - ry * s_ * sp, cy + rx * c * sp + ry * s_ * cp)
+        dv = (-rx * s_ * cp - ry * c * sp, -rx * s_ * sp + ry * c * cp)
+        return pt, dv
+
+    out: List[List[Pt]] = []
+    pa, da = at(th0)
+    for k in range(segs):
+        pb, db = at(th0 + step * (k + 1))
+        if k == segs - 1:
+            pb = (x1, y1)  # 末点严格取给定端点
+        out.append([(pa[0] + alpha * da[0], pa[1] + alpha * da[1]),
+                    (pb[0] - alpha * db[0], pb[1] - alpha * db[1]), pb])
+        pa, da = pb, db
+    return out
+
+
+def iter_path_commands(d: str) -> Iterator[Tuple[str, List[Pt]]]:
+    """把 path d 规范化为绝对坐标命令流：('M',[p]) ('L',[p]) ('Q',[c,p]) ('C',[c1,c2,p]) ('Z',[起点])。
+    H/V 转为 L，S/T 展开反射控制点，圆弧 A 转为三次贝塞尔。"""
+    x = y = sx = sy = 0.0
+    prev_ctrl: Pt | None = None
+    prev_cmd = ""
+    for cmd, v in scan_path(d):
+        up = cmd.upper()
+        if up == "Z":
+            x, y = sx, sy
+            prev_cmd = "Z"
+            prev_ctrl = None
+            yield "Z", [(sx, sy)]
+            continue
+        rel = cmd.islower()
+        ox, oy = (x, y) if rel else (0.0, 0.0)
+        if up == "M":
+            x, y = ox + v[0], oy + v[1]
+            sx, sy = x, y
+            prev_ctrl = None
+            prev_cmd = "M"
+            yield "M", [(x, y)]
+            continue
+        if up in ("L", "H", "V"):
+            if up == "L":
+                x, y = ox + v[0], oy + v[1]
+            elif up == "H":
+                x = (x if rel else 0.0) + v[0]
+            else:
+                y = (y if rel else 0.0) + v[0]
+            prev_ctrl = None
+            prev_cmd = up
+            yield "L", [(x, y)]
+            continue
+        if up == "A":
+            end = (ox + v[5], oy + v[6])
+            for pts in arc_to_cubics((x, y), v[0], v[1], v[2], bool(v[3]), bool(v[4]), end):
+                yield "C", pts
+            x, y = end
+            prev_ctrl = None
+            prev_cmd = "A"
+            continue
+        n = _ARITY[up]
+        if up in ("C", "Q"):
+            pts = [(ox + v[k], oy + v[k + 1]) for k in range(0, n, 2)]
+        else:
+            # S/T：首控制点为上一条同类曲线控制点的反射
+            same = (up == "S" and prev_cmd in ("C", "S")) or (up == "T" and prev_cmd in ("Q", "T"))
+            refl = (2 * x - prev_ctrl[0], 2 * y - prev_ctrl[1]) if (same and prev_ctrl) else (x, y)
+            pts = [refl] + [(ox + v[k], oy + v[k + 1]) for k in range(0, n, 2)]
+        prev_ctrl = pts[-2]
+        x, y = pts[-1]
+        prev_cmd = up
+        yield ("C" if len(pts) == 3 else "Q"), pts
+
+
+def path_points(d: str) -> np.ndarray:
+    """所有端点与控制点的绝对坐标 (N,2)，用于包围盒等（控制点凸包包含曲线本身）。"""
+    pts = [p for cmd, ps in iter_path_commands(d) if cmd != "Z" for p in ps]
+    return np.asarray(pts, dtype=float).reshape(-1, 2)
+
+
+def _curve_steps(ctrl: np.ndarray, tolerance: float) -> int:
+    # 控制多边形长度 / 容差，开方后近似二次误差
+    length = float(np.hypot(*np.diff(ctrl, axis=0).T).sum())
+    return int(max(2, min(64, math.ceil(math.sqrt(length / max(tolerance, 1e-6))))))
+
+
+def _bezier(ctrl: np.ndarray, n: int) -> np.ndarray:
+    t = np.linspace(0.0, 1.0, n + 1)[1:, None]
+    u = 1.0 - t
+    if len(ctrl) == 3:
+        return u * u * ctrl[0] + 2 * u * t * ctrl[1] + t * t * ctrl[2]
+    return u ** 3 * ctrl[0] + 3 * u * u * t * ctrl[1] + 3 * u * t * t * ctrl[2] + t ** 3 * ctrl[3]
+
+
+def path_subpaths(d: str, tolerance: float = 0.25) -> List[Tuple[np.ndarray, bool]]:
+    """把 path d 展平为折线子路径 [(points(n,2), closed), ...]。
+    曲线按控制多边形长度自适应细分（tolerance 为用户坐标单位）。"""
+    out: List[Tuple[np.ndarray, bool]] = []
+    cur: List[Pt] = []
+
+    def flush(closed: bool) -> None:
+        if len(cur) >= 2 or (closed and cur):
+            out.append((np.asarray(cur, dtype=float), closed))
+
+    for cmd, pts in iter_path_commands(d):
+        if cmd == "M":
+            flush(False)
+            cur = [pts[0]]
+        elif cmd == "Z":
+            flush(True)
+            cur = []
+        else:
+            if not cur:
+                cur = [out[-1][0][0].tolist() if out else (0.0, 0.0)]
+            if cmd == "L":
+                cur.append(pts[0])
+            else:
+                ctrl = np.asarray([cur[-1]] + pts, dtype=float)
+                cur.extend(map(tuple, _bezier(ctrl, _curve_steps(ctrl, tolerance)).tolist()))
+    flush(False)
+    return out
+
+
+# ---- 紧凑编码：相对命令 + 按像素尺寸取精度 + 共线点抽稀 ----
+
+def path_precision(pixel_size: float = 1.0) -> int:
+    """小数位数，使量化误差不超过 0.05 个输出像素（pixel_size 为每输出像素对应的用户单位）。"""
+    return int(max(0, min(6, math.ceil(-math.log10(max(pixel_size, 1e-9) * 0.1)))))
+
+
+def _fmt_q(k: int, decimals: int) -> str:
+    # 定点整数 k / 10^decimals 的最短写法：去尾零、去前导 0（0.5 -> .5）
+    if decimals == 0:
+        return str(k)
+    s = f"{abs(k):0{decimals + 1}d}"
+    ip = s[:-decimals].lstrip("0")
+    fp = s[-decimals:].rstrip("0")
+    out = (ip + "." + fp) if fp else (ip or "0")
+    return "-" + out if k < 0 else out
+
+
+def fmt_number(v: float, decimals: int = 2) -> str:
+    return _fmt_q(int(round(v * 10 ** decimals)), decimals)
+
+
+def _join_numbers(nums: List[str]) -> str:
+    # 负号本身可作分隔符
+    parts = [nums[0]] if nums else []
+    for t in nums[1:]:
+        parts.append(t if t[0] == "-" else " " + t)
+    return "".join(parts)
+
+
+def decimate_collinear(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """贪心抽稀：从当前保留点出发尽量延长弦，只要被跳过的点到弦的距离都 <= tolerance。
+    首尾点始终保留；返回保留下来的点 (m,2)。"""
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(P)
+    if n <= 2 or tolerance <= 0:
+        return P
+    keep = [0]
+    a = 0
+    for i in range(2, n):
+        A = P[a]
+        ab = P[i] - A
+        ap = P[a + 1:i] - A
+        L2 = float(ab @ ab)
+        if L2 <= 1e-24:
+            dist = np.hypot(ap[:, 0], ap[:, 1])
+        else:
+            # 到线段（非直线）的距离，避免把折返的尖角当作共线
+            t = np.clip(ap @ ab / L2, 0.0, 1.0)
+            dv = ap - t[:, None] * ab
+            dist = np.hypot(dv[:, 0], dv[:, 1])
+        if float(dist.max()) > tolerance:
+            keep.append(i - 1)
+            a = i - 1
+    keep.append(n - 1)
+    return P[keep]
+
+
+def encode_polyline(points: np.ndarray, *, pixel_size: float = 1.0, tolerance: float | None = None,
+                    closed: bool = False) -> str:
+    """(n,2) 点列 -> 紧凑 path d：'Mx y' + 相对 'l' 坐标（可省略分隔的负号）+ 可选 'z'。
+
+    tolerance 默认 0.25 个输出像素，用于共线点抽稀；坐标先量化为定点整数再取差分，
+    相对命令不会累积舍入误差。"""
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(P) == 0:
+        return ""
+    tol = 0.25 * pixel_size if tolerance is None else tolerance
+    P = decimate_collinear(P, tol)
+    dec = path_precision(pixel_size)
+    q = np.rint(P * 10 ** dec).astype(np.int64)
+    if closed and len(q) > 1 and (q[-1] == q[0]).all():
+        q = q[:-1]  # 末点与起点重合时由 z 闭合
+    head = "M" + _join_numbers([_fmt_q(int(q[0, 0]), dec), _fmt_q(int(q[0, 1]), dec)])
+    dq = np.diff(q, axis=0)
+    body = ("l" + _join_numbers([_fmt_q(k, dec) for k in dq.ravel().tolist()])) if len(dq) else ""
+    return head + body + ("z" if closed else "")
+
+
+def encode_polylines(buf: np.ndarray, offsets: np.ndarray, *, pixel_size: float = 1.0,
+                     tolerance: float | None = None, closed: bool = False) -> List[str]:
+    """format_polylines 的紧凑版本。"""
+    buf = np.asarray(buf, dtype=float).reshape(-1, 2)
+    offs = np.asarray(offsets).tolist()
+    return [encode_polyline(buf[offs[i]:offs[i + 1]], pixel_size=pixel_size, tolerance=tolerance, closed=closed)
+            for i in range(len(offs) - 1) if offs[i + 1] > offs[i]]
@@ -1,21 +1,32 @@
 from __future__ import annotations
 import math
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Sequence
+import numpy as np
+
+from src.geometry import pack_strokes, unpack_strokes
 
 Point = Tuple[float, float]
 
 
+def _apply_affine_array(pts: np.ndarray, mat: np.ndarray) -> np.ndarray:
+	"""(N,2) 点阵一次性乘 3x3 齐次矩阵（含透视除法，w==0 时不除）。"""
+	if pts.size == 0:
+		return pts.reshape(0, 2)
+	m = np.asarray(mat, dtype=float)
+	out = pts @ m[:2, :2].T + m[:2, 2]
+	if m[2, 0] != 0.0 or m[2, 1] != 0.0 or m[2, 2] != 1.0:
+		w = pts @ m[2, :2] + m[2, 2]
+		nz = w != 0
+		out[nz] /= w[nz, None]
+	return out
+
+
 def _apply_affine(points: List[Point], mat: List[List[float]]) -> List[Point]:
-	res: List[Point] = []
-	for x, y in points:
-		xn = mat[0][0] * x + mat[0][1] * y + mat[0][2]
-		yn = mat[1][0] * x + mat[1][1] * y + mat[1][2]
-		wn = mat[2][0] * x + mat[2][1] * y + mat[2][2]
-		if wn != 0:
-			xn /= wn
-			yn /= wn
-		res.append((xn, yn))
-	return res
+	if not points:
+		return []
+	arr = _apply_affine_array(np.asarray(points, dtype=float).reshape(-1, 2), np.asarray(mat, dtype=float))
+	return [tuple(p) for p in arr.tolist()]
 
 
 def _mat_identity() -> List[List[float]]:
@@ -23,32 +34,61 @@ def _mat_identity() -> List[List[float]]:
 
 
 def _mat_mul(a: List[List[float]], b: List[List[float]]) -> List[List[float]]:
-	m = [[0.0, 0.0, 0.0] for _ in range(3)]
-	for i in range(3):
-		for j in range(3):
-			m[i][j] = sum(a[i][k] * b[k][j] for k in range(3))
-	return m
+	return (np.asarray(a, dtype=float) @ np.asarray(b, dtype=float)).tolist()
 
 
-def build_affine(style: Dict[str, Any]) -> List[List[float]]:
-	tilt_deg = float(style.get("geometry", {}).get("tilt_deg", 0.0))
-	shear = float(style.get("geometry", {}).get("shear", 0.0))
-	length_scale = float(style.get("geometry", {}).get("length_scale", 1.0))
+def _geometry_key(style: Dict[str, Any]) -> Tuple[float, float, float]:
+	geo = style.get("geometry", {}) if isinstance(style, dict) else {}
+	return (
+		float(geo.get("tilt_deg", 0.0)),
+		float(geo.get("shear", 0.0)),
+		float(geo.get("length_scale", 1.0)),
+	)
+
+
+@lru_cache(maxsize=256)
+def _affine_for(tilt_deg: float, shear: float, length_scale: float) -> np.ndarray:
 	ang = math.radians(tilt_deg)
 	cos_a, sin_a = math.cos(ang), math.sin(ang)
-	R = [[cos_a, -sin_a, 0.0], [sin_a, cos_a, 0.0], [0.0, 0.0, 1.0]]
-	Sx = [[length_scale, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
-	Sh = [[1.0, shear, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
-	M = _mat_identity()
-	M = _mat_mul(Sh, M)
-	M = _mat_mul(Sx, M)
-	M = _mat_mul(R, M)
+	R = np.array([[cos_a, -sin_a, 0.0], [sin_a, cos_a, 0.0], [0.0, 0.0, 1.0]])
+	Sx = np.array([[length_scale, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+	Sh = np.array([[1.0, shear, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+	M = R @ (Sx @ Sh)
+	M.setflags(write=False)  # 缓存共享，禁止原地修改
 	return M
 
 
+def build_affine_array(style: Dict[str, Any]) -> np.ndarray:
+	"""按 (tilt_deg, shear, length_scale) 缓存的 3x3 仿射矩阵（只读 ndarray）。"""
+	return _affine_for(*_geometry_key(style))
+
+
+def build_affine(style: Dict[str, Any]) -> List[List[float]]:
+	return build_affine_array(style).tolist()
+
+
 def transform_medians(medians: List[List[Point]], style: Dict[str, Any]) -> List[List[Point]]:
-	M = build_affine(style)
-	return [_apply_affine(st, M) for st in medians]
+	if not medians:
+		return []
+	M = build_affine_array(style)
+	pts, offsets = pack_strokes(medians)
+	return unpack_strokes(_apply_affine_array(pts, M), offsets)
+
+
+def transform_medians_batch(glyphs: Sequence[List[List[Point]]], style: Dict[str, Any]) -> List[List[List[Point]]]:
+	"""整篇文章（多个字形）共用一次矩阵乘法；返回与输入一一对应的字形列表。"""
+	if not glyphs:
+		return []
+	M = build_affine_array(style)
+	strokes = [st for g in glyphs for st in g]
+	pts, offsets = pack_strokes(strokes)
+	flat = unpack_strokes(_apply_affine_array(pts, M), offsets)
+	res: List[List[List[Point]]] = []
+	k = 0
+	for g in glyphs:
+		res.append(flat[k:k + len(g)])
+		k += len(g)
+	return res
 
 
 def apply_jitter(medians: List[List[Point]], style: Dict[str, Any], rng) -> List[List[Point]]:
@@ -81,3 +121,23 @@ def build_svg_matrix(style: Dict[str, Any]) -> Tuple[float, float, float, float,
 	e = M[0][2]
 	f = M[1][2]
 	return a, b, c, d, e, f
+
+
+def build_svg_px_matrix(style: Dict[str, Any], size_px: int, padding: int) -> Tuple[float, float, float, float, float, float]:
+	"""Return SVG matrix(a b c d e f) acting in pixel space, so that drawing the
+	untransformed medians with (pad + x*s, pad + (1-y)*s) and wrapping them in
+	<g transform=...> equals drawing transform_medians(medians, style).
+	"""
+	s = float(size_px - 2 * padding)
+	T = np.array([[s, 0.0, float(padding)], [0.0, -s, float(padding) + s], [0.0, 0.0, 1.0]])
+	T_inv = np.array([[1.0 / s, 0.0, -padding / s], [0.0, -1.0 / s, (padding + s) / s], [0.0, 0.0, 1.0]])
+	G = T @ build_affine_array(style) @ T_inv
+	return G[0, 0], G[1, 0], G[0, 1], G[1, 1], G[0, 2], G[1, 2]
+
+
+def svg_transform_attr(style: Dict[str, Any], size_px: int, padding: int) -> str:
+	"""SVG transform 属性值；几何参数为恒等时返回空串（无需包裹）。"""
+	if _geometry_key(style) == (0.0, 0.0, 1.0):
+		return ""
+	a, b, c, d, e, f = build_svg_px_matrix(style, size_px, padding)
+	return f"matrix({a:.6f},{b:.6f},{c:.6f},{d:.6f},{e:.4f},{f:.4f})"
@@ -29,6 +29,21 @@ class BaseTransform(ABC):
         """
         pass
     
+    def apply_glyph(self, strokes: List[List[Point]], params: Dict[str, Any]) -> List[List[Point]]:
+        """
+        对整字所有笔画应用同一组参数的变换
+        
+        默认逐笔调用 apply；可向量化的变换可覆盖此方法一次处理整字。
+        
+        Args:
+            strokes: 笔画列表
+            params: 变换参数字典
+            
+        Returns:
+            变换后的笔画列表
+        """
+        return [self.apply(st, params) if st else st for st in strokes]
+    
     @abstractmethod
     def get_default_params(self) -> Dict[str, Any]:
         """
@@ -6,7 +6,7 @@
 
 from typing import List, Dict, Any
 from .base_transform import BaseTransform
-from ..centerline import Point, length_preserving_chaikin
+from ..centerline import Point, length_preserving_chaikin, length_preserving_chaikin_glyph
 from ..centerline import _length as _poly_length  # type: ignore
 from ..centerline import _length_preserving_adjust  # type: ignore
 
@@ -40,6 +40,14 @@ class SmoothTransform(BaseTransform):
         else:
             return points
     
+    def apply_glyph(self, strokes: List[List[Point]], params: Dict[str, Any]) -> List[List[Point]]:
+        """整字平滑：Chaikin 走批量向量化内核，其余方法逐笔处理"""
+        if not self.is_enabled(params):
+            return strokes
+        if params.get("method", "chaikin") == "chaikin":
+            return length_preserving_chaikin_glyph(strokes, int(params.get("iterations", 1)))
+        return super().apply_glyph(strokes, params)
+    
     def _apply_chaikin_smooth(self, points: List[Point], params: Dict[str, Any]) -> List[Point]:
         """应用Chaikin平滑算法（长度与端点保持）"""
         iterations = int(params.get("iterations", 1))
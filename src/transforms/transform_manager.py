@@ -64,6 +64,43 @@ class TransformManager:
         
         return result
     
+    def apply_transforms_glyph(self, strokes: List[List[Point]], configs: List[Dict[str, Any]],
+                               order: Optional[List[str]] = None) -> List[List[Point]]:
+        """
+        按指定顺序对整字应用变换
+        
+        各笔参数相同时调用变换的 apply_glyph（可一次处理整字），
+        否则逐笔调用 apply；结果与逐笔 apply_transforms 一致。
+        
+        Args:
+            strokes: 笔画列表
+            configs: 与笔画一一对应的变换配置字典
+            order: 变换执行顺序，None使用默认顺序
+            
+        Returns:
+            变换后的笔画列表
+        """
+        result = [list(st) if st else st for st in strokes]
+        execution_order = order or self.default_order
+        
+        for transform_name in execution_order:
+            if transform_name not in self.transforms:
+                continue
+            transform = self.transforms[transform_name]
+            params_list = [cfg.get(transform_name) for cfg in configs]
+            if all(p is None for p in params_list):
+                continue
+            first = params_list[0]
+            if first is not None and all(p == first for p in params_list):
+                if transform.is_enabled(first):
+                    result = transform.apply_glyph(result, first)
+                continue
+            for i, params in enumerate(params_list):
+                if params is not None and result[i] and transform.is_enabled(params):
+                    result[i] = transform.apply(result[i], params)
+        
+        return result
+    
     def apply_single_transform(self, points: List[Point], transform_name: str, 
                               params: Dict[str, Any]) -> List[Point]:
         """
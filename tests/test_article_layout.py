@@ -0,0 +1,118 @@
+import io
+import unittest
+
+from web.services.article_layout import LayoutParams, PageSpec, iter_pages, write_page_svg, write_pages_pdf
+
+
+class TestArticleLayout(unittest.TestCase):
+    def test_pages_stream_and_stay_inside_margins(self):
+        spec = PageSpec()
+        params = LayoutParams(font_size=40, line_spacing=40, char_spacing=30)
+        bbox = lambda ch: None if ch == '?' else (20.0, 20.0, 220.0, 220.0)
+        text = ('字' * 50 + '\n') * 40 + '?'
+        pages = iter_pages(iter(text), bbox, params, spec)
+        first = next(pages)  # 生成器：第一页排满即可取得
+        rest = list(pages)
+        self.assertGreater(len(rest), 0)
+        for page in [first] + rest:
+            for p in page.placements:
+                self.assertGreaterEqual(p.ty + 20.0 * p.scale, spec.margin - 1e-6)
+                self.assertLessEqual(p.ty + 220.0 * p.scale, spec.height - spec.margin + 1e-6)
+                self.assertLessEqual(p.tx + 220.0 * p.scale, spec.width - spec.margin)
+            # 行排到右边距为止：行尾与右边距之间放不下下一个字
+            ends = {}
+            for p in page.placements:
+                ends[p.ty] = max(ends.get(p.ty, 0.0), p.tx + 220.0 * p.scale)
+            for end in ends.values():
+                self.assertGreater(end + params.char_spacing + params.font_size, spec.width - spec.margin)
+        self.assertEqual(sum(len(p.placements) for p in [first] + rest), 50 * 40)
+
+        out = io.StringIO()
+        write_page_svg(out, first, lambda ch: "<path d='M0 0L1 1'/>", params, spec)
+        svg = out.getvalue()
+        self.assertEqual(svg.count('<symbol '), 1)
+        self.assertEqual(svg.count('<use '), len(first.placements))
+
+    def test_pdf_streams_pages_and_shares_glyph_forms(self):
+        params = LayoutParams(font_size=40, line_spacing=40, char_spacing=30)
+        bbox = lambda ch: (20.0, 20.0, 220.0, 220.0)
+        glyphs = {'甲': "<path d='M20 20L220 220' stroke='#000000' stroke-width='4' fill='none'/>",
+                  '乙': "<path d='M20 20Q120 220 220 20Z' fill='#000000'/>"}
+        out = io.BytesIO()
+        n = write_pages_pdf(out, iter_pages(iter('甲乙' * 600), bbox, params), glyphs.get, params,
+                            background_type='lined')
+        pdf = out.getvalue()
+        self.assertGreater(n, 1)
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.rstrip().endswith(b'%%EOF'))
+        self.assertIn(b'/Count %d' % n, pdf)
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 2)
+        self.assertEqual(pdf.count(b'/Type /Page '), n)
+        # xref 偏移指向真实对象
+        start = int(pdf.rsplit(b'startxref', 1)[1].split()[0])
+        self.assertTrue(pdf[start:].startswith(b'xref'))
+        first = pdf[start:].split(b'\n')[3]
+        self.assertTrue(pdf[int(first[:10]):].startswith(b'1 0 obj'))
+
+
+    def test_pdf_draws_basic_shapes_and_refuses_to_drop_glyphs(self):
+        from src.pdf_writer import svg_markup_to_ops
+        params = LayoutParams(font_size=40, line_spacing=40, char_spacing=30)
+        glyphs = {'甲': "<path d='M20 20L220 220' stroke='#000000' stroke-width='inherit' fill='none'/>",
+                  '乙': "<circle cx='120' cy='120' r='80' fill='#000000'/>"
+                        "<ellipse cx='120' cy='120' rx='40' ry='20' stroke='#000000' stroke-width='' fill='none'/>"}
+        ops, bbox = svg_markup_to_ops(glyphs['乙'])
+        # 圆与椭圆各 4 段三次贝塞尔；无效线宽按默认 1
+        self.assertEqual(ops.count(b' c\n'), 8)
+        self.assertIn(b'1 w', ops)
+        self.assertEqual(tuple(round(v, 1) for v in bbox), (38.5, 38.5, 201.5, 201.5))  # 外扩 线宽/2 + 1
+        out = io.BytesIO()
+        pages = iter_pages(iter('甲乙'), lambda ch: (20.0, 20.0, 220.0, 220.0), params)
+        self.assertEqual(write_pages_pdf(out, pages, glyphs.get, params), 1)
+        self.assertIn(b'/G1 ', out.getvalue())
+        # 仍无法转换的元素（如 text）：报错而不是输出缺字的 PDF
+        pages = iter_pages(iter('甲乙'), lambda ch: (20.0, 20.0, 220.0, 220.0), params)
+        with self.assertRaises(ValueError):
+            write_pages_pdf(io.BytesIO(), pages, {'甲': glyphs['甲'], '乙': "<text x='0' y='0'>乙</text>"}.get, params)
+
+    def test_grid_variation_variants_are_seeded_and_small(self):
+        import numpy as np
+        from web.services.grid_variation import MAX_VARIANTS, GridVariation
+        a = GridVariation(seed=7, variants=4, amplitude=3.0)
+        b = GridVariation(seed=7, variants=4, amplitude=3.0)
+        pts = np.random.default_rng(0).uniform(20, 236, (50, 2))
+        for v in range(4):
+            np.testing.assert_allclose(a.deform(pts, v), b.deform(pts, v))
+        moved = a.deform(pts, 1)
+        # 网格画布 ±2.5σ = 7.5px，折合 SVG 坐标约 8px（格内插值可略有超出）
+        self.assertLess(np.abs(moved - pts).max(), 10.0)
+        self.assertGreater(np.abs(moved - pts).max(), 0.1)
+        # margin 是所有变体的位移上界（排版框按它外扩）；变体数有上限
+        grid = np.random.default_rng(1).uniform(-30, 285, (2000, 2))  # 场覆盖范围内（字形 256 画布）
+        for v in range(4):
+            self.assertLessEqual(np.abs(a.deform(grid, v) - grid).max(), a.margin + 1e-9)
+        self.assertEqual(GridVariation(variants=10 ** 6, resolution=3).variants, MAX_VARIANTS)
+        glyphs = [pts[:20], pts[20:]]
+        batch = a.deform_batch(glyphs, [1, 3])
+        np.testing.assert_allclose(batch[0], a.deform(pts[:20], 1))
+        np.testing.assert_allclose(batch[1], a.deform(pts[20:], 3))
+
+        markup = "<path d='M20 20C60 20 100 120 220 220' fill='none' stroke='#000000'/><rect x='0' y='0' width='256' height='256' fill='white'/>"
+        variants = a.variant_markups(markup)
+        self.assertEqual(len(variants), 4)
+        self.assertEqual(len(set(variants)), 4)
+        self.assertTrue(all("width='256'" in m for m in variants))  # 背景矩形不动
+
+        params = LayoutParams(font_size=40, line_spacing=40, char_spacing=30, variants=4, variant_seed=3)
+        page = next(iter_pages(iter('字' * 40), lambda ch: (20.0, 20.0, 220.0, 220.0), params))
+        self.assertGreater(len({p.variant for p in page.placements}), 1)
+        out = io.StringIO()
+        write_page_svg(out, page, lambda ch, v=0: variants[v], params)
+        svg = out.getvalue()
+        self.assertEqual(svg.count('<symbol '), len({p.variant for p in page.placements}))
+        again = next(iter_pages(iter('字' * 40), lambda ch: (20.0, 20.0, 220.0, 220.0), params))
+        self.assertEqual([p.variant for p in page.placements], [p.variant for p in again.placements])
+
+
+if __name__ == "__main__":
+    unittest.main()
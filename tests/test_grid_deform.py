@@ -0,0 +1,218 @@
+import unittest
+
+import numpy as np
+
+from web.services.grid_transform import (GridDeformer, apply_catmull_rom_coons_deformation,
+                                         apply_catmull_rom_coons_deformation_reference, deform_point,
+                                         flatten_deformed, get_deformation_field, grid_state_key)
+
+
+def _grid_state(size=4, seed=0, jitter=25.0, y0=150.0):
+    # 标准网格：800x600 画布中央 300x300（左上角 250,150）
+    rng = np.random.default_rng(seed)
+    pts = []
+    for r in range(size):
+        for c in range(size):
+            x, y = 250 + c * 300 / (size - 1), y0 + r * 300 / (size - 1)
+            dx, dy = rng.uniform(-jitter, jitter, 2)
+            pts.append({'x': x + dx, 'y': y + dy, 'originalX': x, 'originalY': y})
+    return {'size': size, 'controlPoints': pts}
+
+
+class TestGridDeform(unittest.TestCase):
+    def test_batch_deformer_matches_point_reference(self):
+        for size in (2, 4, 5):
+            gs = _grid_state(size, seed=size)
+            P = np.random.default_rng(1).uniform(-20, 276, (500, 2))
+            ref = np.array([deform_point(x, y, gs) for x, y in P])
+            got = GridDeformer.from_grid_state(gs).deform(P)
+            self.assertTrue(np.allclose(ref, got, atol=1e-9))
+        self.assertIsNone(GridDeformer.from_grid_state({'size': 4, 'controlPoints': []}))
+        self.assertIsNone(GridDeformer.from_grid_state({'size': 2, 'controlPoints': [{'y': 1}]}))
+
+    def test_baked_field_is_cached_and_close_to_exact(self):
+        gs = _grid_state(4, seed=3)
+        field = get_deformation_field(gs)
+        self.assertEqual(field.displacement.shape, (513, 513, 2))
+        P = np.random.default_rng(2).uniform(-60, 300, (2000, 2))
+        exact = GridDeformer.from_grid_state(gs).deform(P)
+        self.assertLess(np.abs(field.deform(P) - exact).max(), 0.05)
+        # 只影响显示的字段（originalX 等）不改变哈希，命中同一个场
+        same = {'size': 4, 'controlPoints': [{'y': p['y'], 'x': p['x']} for p in gs['controlPoints']]}
+        self.assertEqual(grid_state_key(same), grid_state_key(gs))
+        self.assertIs(get_deformation_field(same), field)
+        self.assertIsNone(get_deformation_field(None))
+
+    def test_fast_warps_match_triangle_reference(self):
+        from PIL import Image, ImageDraw
+        img = Image.new('RGBA', (96, 96), (255, 255, 255, 0))
+        draw = ImageDraw.Draw(img)
+        draw.line([(10, 10), (86, 80)], fill=(0, 0, 0, 255), width=6)
+        draw.ellipse([25, 25, 70, 70], outline=(0, 0, 0, 255), width=5)
+        # 网格整体下移 25px，图像内容相对网格偏移，覆盖到网格边缘外的透明区域
+        gs = _grid_state(3, seed=7, jitter=20, y0=175.0)
+        ref = np.asarray(apply_catmull_rom_coons_deformation_reference(img, gs, img_size=96))[..., 3] > 127
+        self.assertGreater(ref.sum(), 200)
+        for method, quality in (('inverse', 'normal'), ('mesh', 'normal'), ('mesh', 'high')):
+            fast = np.asarray(apply_catmull_rom_coons_deformation(img, gs, img_size=96, method=method,
+                                                                  quality=quality))[..., 3] > 127
+            self.assertLess((fast != ref).sum(), ref.sum() * 0.02, (method, quality))
+        for bad in ('ultra', 0, None):
+            with self.assertRaises(ValueError):
+                apply_catmull_rom_coons_deformation(img, gs, img_size=96, quality=bad)
+
+    def test_adaptive_flattening_follows_bend(self):
+        line = np.array([[[10, 10], [50, 10], [90, 10], [130, 10]]], dtype=float)
+        self.assertEqual(len(flatten_deformed(line, lambda P: P)), 2)
+        deform = GridDeformer.from_grid_state(_grid_state(4, seed=5)).deform
+        curve = np.array([[[20, 200], [60, 20], [200, 20], [236, 220]]], dtype=float)
+        for segs in (line, curve):
+            P = flatten_deformed(segs, deform, tolerance=0.05)
+            t = np.linspace(0, 1, 4000)[:, None]
+            c = segs[0]
+            dense = deform((1 - t) ** 3 * c[0] + 3 * (1 - t) ** 2 * t * c[1] + 3 * (1 - t) * t * t * c[2] + t ** 3 * c[3])
+            a, ab = P[:-1], P[1:] - P[:-1]
+            u = np.clip(((dense[:, None] - a) * ab).sum(-1) / np.maximum((ab * ab).sum(-1), 1e-12), 0, 1)
+            dist = np.hypot(*(a + u[..., None] * ab - dense[:, None]).transpose(2, 0, 1)).min(1)
+            self.assertLess(dist.max(), 0.06)
+            self.assertLess(len(P), 200)
+
+    def test_geometry_level_deformation_matches_svg_pass(self):
+        import re
+        from src.svgpath import path_subpaths
+        from web.services.generation import _emit_runs_svg
+        from web.services.grid_transform import apply_smooth_grid_deformation, geometry_deformer
+        gs = _grid_state(4, seed=11, jitter=30)
+        t = np.linspace(0, 1, 200)
+        runs = [(0, np.column_stack([0.1 + 0.8 * t, 0.5 + 0.3 * np.sin(6 * t)])),
+                (1, np.column_stack([0.3 + 0.2 * t, 0.9 - 0.7 * t]))]
+        colors = {0: '#000000', 1: '#ff0000'}
+        deform = geometry_deformer(gs)
+        # 与字符串级流程相同：所有控制点都在标准位置（画布 800x600 中央网格）5px 内时不变形
+        self.assertIsNone(geometry_deformer(_grid_state(4, jitter=4)))
+        geo = _emit_runs_svg(runs, colors, size=256, pad=8, fit_curves=True, deform=deform)
+        via_svg = apply_smooth_grid_deformation(_emit_runs_svg(runs, colors, size=256, pad=8, fit_curves=True), gs)
+        exact = GridDeformer.from_grid_state(gs).deform
+        for (label, P), d in zip(runs, re.findall(r"<path d='([^']*)'", geo)):
+            px = np.column_stack([8 + P[:, 0] * 240, 8 + (1 - P[:, 1]) * 240])
+            got = np.vstack([sub for sub, _ in path_subpaths(d, tolerance=0.05)])
+            # 几何级结果的顶点都落在精确变形曲线附近（拟合误差 <= 0.25px）
+            dense = exact(np.vstack([np.linspace(a, b, 8) for a, b in zip(px[:-1], px[1:])]))
+            self.assertLess(np.hypot(*(got[:, None] - dense[None]).transpose(2, 0, 1)).min(1).max(), 0.35)
+        self.assertEqual(geo.count('<path '), via_svg.count('<path '))
+
+    def test_geometry_bounds_replace_svg_parsing(self):
+        import re
+        from src.svgdoc import svg_bounds
+        from src.svgpath import path_subpaths
+        from web.services.generation import _emit_runs_svg
+        from web.services.grid_transform import apply_cropping_logic, geometry_deformer
+        t = np.linspace(0, 1, 200)
+        runs = [(0, np.column_stack([0.1 + 0.8 * t, 0.5 + 0.3 * np.sin(6 * t)]))]
+        for deform in (None, geometry_deformer(_grid_state(4, seed=11, jitter=30))):
+            glyph = _emit_runs_svg(runs, {0: '#000000'}, size=256, pad=8, fit_curves=True,
+                                   deform=deform, with_bounds=True)
+            # 几何包围盒是曲线本身的边界（拟合误差以内），比解析出的控制点包围盒更紧
+            d = re.search(r"<path d='([^']*)'", glyph.svg).group(1)
+            curve = np.vstack([sub for sub, _ in path_subpaths(d, tolerance=0.01)])
+            exact = (*curve.min(0), *curve.max(0))
+            self.assertTrue(np.allclose(glyph.bounds, exact, atol=0.3))
+            ctrl = svg_bounds(glyph.svg)
+            self.assertTrue(ctrl[0] <= glyph.bounds[0] + 0.3 and ctrl[1] <= glyph.bounds[1] + 0.3)
+            self.assertTrue(ctrl[2] >= glyph.bounds[2] - 0.3 and ctrl[3] >= glyph.bounds[3] - 0.3)
+            cropped = apply_cropping_logic(glyph.svg, bounds=glyph.bounds)
+            self.assertIn('viewBox="%.2f ' % ((glyph.bounds[0] + glyph.bounds[2]) / 2 - 128), cropped)
+
+    def test_smoothing_refits_only_flattened_curves(self):
+        from web.services.grid_transform import smooth_svg_paths
+        # 稀疏的直线段折线（转角 < 35°）保持原样，不能被拟合成在顶点间鼓出的曲线
+        zigzag = "<svg><path d='M10 10L100 20L190 10L280 20' stroke='#000'/></svg>"
+        self.assertEqual(smooth_svg_paths(zigzag), zigzag)
+        t = np.linspace(0, 1, 200)
+        dense = 'M' + 'L'.join('%.2f %.2f' % tuple(p) for p in np.c_[10 + 200 * t, 100 + 40 * np.sin(4 * t)])
+        out = smooth_svg_paths(f"<svg><path d='{dense}'/></svg>")
+        self.assertIn('c', out)
+        self.assertLess(len(out), len(dense) / 4)
+
+    def test_deform_cache_serves_repeats_from_memory_and_disk(self):
+        import tempfile
+        from web.services.deform_cache import DeformCache
+        gs = _grid_state(4, seed=2)
+        svg = "<svg xmlns='http://www.w3.org/2000/svg'><path d='M10 10L200 200'/></svg>"
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return svg.replace('200', '210')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DeformCache(maxsize=1, cache_dir=tmp)
+            first = cache.get_or_compute('smooth', svg, gs, compute, pixel_size=1.0)
+            self.assertEqual(cache.get_or_compute('smooth', svg, gs, compute, pixel_size=1.0), first)
+            # 参数或网格不同则是不同的键
+            cache.get_or_compute('smooth', svg, gs, compute, pixel_size=2.0)
+            self.assertEqual(len(calls), 2)
+            # 内存只保留 1 条，被挤出的结果从磁盘取回；新进程（新实例）同样命中磁盘
+            self.assertEqual(cache.get_or_compute('smooth', svg, gs, compute, pixel_size=1.0), first)
+            fresh = DeformCache(cache_dir=tmp)
+            self.assertEqual(fresh.get_or_compute('smooth', svg, gs, compute, pixel_size=1.0), first)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(cache.stats()['memory_hits'], 1)
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+            self.assertAlmostEqual(cache.stats()['hit_rate'], 0.5)
+            # 无网格时不缓存
+            cache.get_or_compute('smooth', svg, None, compute)
+            self.assertEqual(len(calls), 3)
+
+    def test_deform_cache_skips_identity_and_fallback_results(self):
+        import tempfile
+        from web.services.deform_cache import DeformCache
+        from web.services.grid_transform import _mark_fallback
+        svg = "<svg xmlns='http://www.w3.org/2000/svg'><path d='M10 10L200 200'/></svg>"
+        gs = _grid_state(4, seed=2)
+        # x/y 相同而原始坐标不同（是否算作变形不同）必须是不同的键
+        flat = {'size': 4, 'controlPoints': [dict(p, originalX=p['x'], originalY=p['y']) for p in gs['controlPoints']]}
+        self.assertNotEqual(DeformCache.key('smooth', svg, gs), DeformCache.key('smooth', svg, flat))
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = DeformCache(cache_dir=tmp)
+            self.assertEqual(cache.get_or_compute('smooth', svg, flat, lambda: svg), svg)
+            self.assertEqual(cache.get_or_compute('smooth', svg, gs, lambda: svg + ' '), svg + ' ')
+
+            def failing():
+                _mark_fallback()
+                return svg.replace('200', '190')
+
+            cache.get_or_compute('grid_svg', svg, gs, failing)
+            self.assertEqual(cache.stats()['size'], 1)
+            self.assertIsNone(cache.get(DeformCache.key('smooth', svg, flat)))
+            self.assertIsNone(cache.get(DeformCache.key('grid_svg', svg, gs)))
+
+    def test_deform_cache_shared_across_threads(self):
+        import threading
+        from web.services.deform_cache import DeformCache
+        gs = _grid_state(4, seed=2)
+        cache = DeformCache(maxsize=4, cache_dir=None)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(300):
+                    svg = "<svg><path d='M0 0L%d 1'/></svg>" % ((i + n) % 9)
+                    cache.get_or_compute('smooth', svg, gs, lambda: svg + ' ')
+                    cache.stats()
+            except Exception as e:  # 并发下不能抛 KeyError 等异常
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        stats = cache.stats()
+        self.assertLessEqual(stats['size'], 4)
+        self.assertEqual(stats['memory_hits'] + stats['misses'], 8 * 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from src.lod import LodCache, lod_level, lod_pixel_size, rdp, visvalingam
+
+
+def _max_dist(P, Q):
+    a, b = Q[:-1], Q[1:]
+    ab = b - a
+    out = 0.0
+    for p in P:
+        t = np.clip(((p - a) * ab).sum(1) / np.maximum((ab * ab).sum(1), 1e-12), 0, 1)
+        out = max(out, np.hypot(*(a + t[:, None] * ab - p).T).min())
+    return out
+
+
+def _grid_state(seed, jitter=30.0):
+    # 标准网格：800x600 画布中央 300x300（左上角 250,150），4x4 控制点随机扰动
+    rng = np.random.default_rng(seed)
+    pts = []
+    for r in range(4):
+        for c in range(4):
+            x, y = 250 + c * 100.0, 150 + r * 100.0
+            dx, dy = rng.uniform(-jitter, jitter, 2)
+            pts.append({'x': x + dx, 'y': y + dy, 'originalX': x, 'originalY': y})
+    return {'size': 4, 'controlPoints': pts}
+
+
+class TestLod(unittest.TestCase):
+    def test_simplifiers_stay_within_tolerance(self):
+        t = np.linspace(0.0, 1.0, 400)
+        P = np.c_[200 * t, 50 * np.sin(6 * t)]
+        for fn in (rdp, visvalingam):
+            Q = fn(P, 1.0)
+            self.assertLess(len(Q), len(P) // 5)
+            self.assertTrue(np.allclose(Q[0], P[0]) and np.allclose(Q[-1], P[-1]))
+            self.assertLessEqual(_max_dist(P, Q), 1.0 + 1e-9 if fn is rdp else 2.0)
+
+    def test_levels_and_cache(self):
+        self.assertEqual(lod_level(40), 64)
+        self.assertEqual(lod_level(None), 256)
+        self.assertEqual(lod_pixel_size(40), 4.0)
+        self.assertEqual(lod_pixel_size(1000), 1.0)
+        cache = LodCache(maxsize=2)
+        calls = []
+        for key in ("a", "a", "b", "c", "a"):
+            cache.get_or_build(key, 64, lambda: calls.append(key) or key.upper())
+        self.assertEqual(calls, ["a", "b", "c", "a"])
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_lod_generation_does_not_write_compare_files(self):
+        import os
+        import tempfile
+        from unittest import mock
+        import web.services.generation as gen
+        merged = {'十': {'medians': [[[100, 500], [900, 500]], [[500, 900], [500, 100]]]}}
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(gen, 'OUTPUT_COMPARE', tmp), \
+                mock.patch.object(gen, 'load_merged_cache', lambda: merged):
+            res = gen.generate_abcd('十', target_px=40)
+            # 抽稀版本只随结果返回，不能成为对比页（及 generate_single_type）读到的最新文件
+            self.assertEqual(os.listdir(tmp), [])
+            self.assertTrue(all(res['svg'][k] for k in ('C', 'D1', 'D2')))
+            self.assertNotIn('C', res)
+            # 文章字形在入 LOD 缓存前去掉背景矩形，只留笔画
+            glyph = gen.glyph_for_size('十', 'D1', target_px=40)
+            self.assertIn("fill='white'", res['svg']['D1'])
+            self.assertNotIn('<rect', glyph.svg)
+            self.assertIn('<path', glyph.svg)
+            # 文章路径的几何级变形只作用于 D1；D2 与字符串级流程一样不变形，除非显式 deform_d2
+            gs = _grid_state(seed=11)
+            deformed = gen.generate_abcd('十', grid_state=gs, target_px=40, geometry_deformation=True)
+            self.assertEqual(deformed['svg']['D2'], res['svg']['D2'])
+            self.assertNotEqual(deformed['svg']['D1'], res['svg']['D1'])
+            d2 = gen.generate_abcd('十', grid_state=gs, target_px=40, geometry_deformation=True, deform_d2=True)
+            self.assertNotEqual(d2['svg']['D2'], res['svg']['D2'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+
+from src.raster import rasterize_svg
+
+
+class TestRasterSvg(unittest.TestCase):
+    def test_raster_use_symbol_matches_inline(self):
+        glyph = "<path d='M-5 10L40 60' stroke='#000000' stroke-width='4' fill='none'/>"
+        head = '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100">'
+        used = (head + f'<defs><symbol id="g0" overflow="visible">{glyph}</symbol></defs>'
+                '<use href="#g0" transform="translate(10 0) scale(1.5)"/>'
+                '<use href="#g0" transform="translate(110 0)"/></svg>')
+        inline = (head + f'<g transform="translate(10 0) scale(1.5)">{glyph}</g>'
+                  f'<g transform="translate(110 0)">{glyph}</g></svg>')
+        a, b = rasterize_svg(used), rasterize_svg(inline)
+        self.assertIsNotNone(a)
+        self.assertTrue(np.array_equal(np.asarray(a), np.asarray(b)))
+
+    def test_raster_nonzero_keeps_reverse_wound_holes(self):
+        outer = "M10 10L90 10L90 90L10 90Z"
+        svgs = {rule: '<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">'
+                      f'<path d="{outer}{inner}" fill="#000000" fill-rule="{rule}"/></svg>'
+                for rule, inner in (("nonzero", "M30 30L30 70L70 70L70 30Z"),          # 反向：孔
+                                    ("evenodd", "M30 30L70 30L70 70L30 70Z"))}
+        same = svgs["nonzero"].replace("M30 30L30 70L70 70L70 30Z", "M30 30L70 30L70 70L30 70Z")
+        for rule, svg in svgs.items():
+            ink = np.asarray(rasterize_svg(svg))[..., 3] > 127
+            self.assertFalse(ink[50, 50], rule)    # 孔内不填
+            self.assertTrue(ink[20, 20], rule)     # 环上填充
+            self.assertFalse(ink[5, 5], rule)
+        # 同向内轮廓在 nonzero 下绕数为 2，整体填充
+        self.assertTrue((np.asarray(rasterize_svg(same))[..., 3] > 127)[50, 50])
+
+
+if __name__ == "__main__":
+    unittest.main()
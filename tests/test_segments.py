@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from src import segments as seg
+
+
+class TestSegments(unittest.TestCase):
+    def test_window_runs_split_by_arc_length(self):
+        # 10 段等长直线：25% / 25% 窗口的边界落在线段内部（不在顶点上）
+        st = [(i * 0.1, 0.5) for i in range(11)]
+        g = seg.stroke_geometry(st)
+        runs = seg.window_runs(g, 0.25, 0.25)
+        self.assertEqual([lab for lab, _ in runs], [seg.START, seg.MIDDLE, seg.PEAK])
+        self.assertAlmostEqual(runs[0][1][-1][0], 0.25)
+        self.assertAlmostEqual(runs[2][1][0][0], 0.75)
+        # 各段首尾相接，覆盖整笔
+        self.assertTrue(np.allclose(runs[0][1][-1], runs[1][1][0]))
+        self.assertTrue(np.allclose(runs[1][1][-1], runs[2][1][0]))
+        self.assertEqual(seg.window_runs(g, 0.25, 0.25, isolate_min_len=2.0)[0][0], seg.ISOLATE)
+
+    def test_mixed_runs_corner_window(self):
+        # 首端 90° 折角 + 直线 + 末端 90° 折角
+        st = [(0.0, 0.1), (0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (1.0, 0.1)]
+        g = seg.stroke_geometry(st)
+        runs, dbg = seg.mixed_runs(g, is_short=False, sr=0.3, er=0.3, corner_min=35.0, corner_max=179.0)
+        self.assertEqual((dbg['first_idx'], dbg['last_idx']), (1, 3))
+        self.assertEqual([(lab, len(P)) for lab, P in runs], [(seg.START, 2), (seg.MIDDLE, 3), (seg.PEAK, 2)])
+        runs, dbg = seg.mixed_runs(g, is_short=True, sr=0.3, er=0.3, corner_min=35.0, corner_max=179.0)
+        self.assertEqual(dbg['short_split_idx'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from src import parser
+from src.stroker import build_stroke_polygon, build_glyph_polygons
+from src.renderer import SvgRenderer
+
+
+class TestStroker(unittest.TestCase):
+    def test_glyph_polygons_match_per_stroke(self):
+        meds = parser.normalize_medians(parser.demo_glyph_shi()["medians"])
+        meds = meds + [[(0.4, 0.4)], []]
+        styles = [{"thickness": {"width_base": 0.05, "width_profile": {"points": [[0, 0.5], [0.5, 1.2], [1, 0.6]]}}}] * len(meds)
+        buf, offsets = build_glyph_polygons(meds, styles, samples=64)
+        ref = [build_stroke_polygon(st, sty, samples=64) for st, sty in zip(meds, styles) if st]
+        self.assertEqual(len(offsets) - 1, len(ref))
+        for i, poly in enumerate(ref):
+            got = buf[offsets[i]:offsets[i + 1]]
+            self.assertEqual(len(got), len(poly))
+            for (x0, y0), (x1, y1) in zip(poly, got.tolist()):
+                self.assertAlmostEqual(x0, x1, places=9)
+                self.assertAlmostEqual(y0, y1, places=9)
+
+    def test_renderer_returns_bytes_and_writes_stream(self):
+        import io
+        meds = parser.normalize_medians(parser.demo_glyph_shi()["medians"])
+        styles = [{"thickness": {"width_base": 0.05}}] * len(meds)
+        r = SvgRenderer(size_px=128, padding=4)
+        data = r.render_char(meds, styles, None, render_mode="median_fill")
+        self.assertTrue(data.startswith(b'<?xml version="1.0" encoding="utf-8" ?>'))
+        self.assertTrue(data.endswith(b"</svg>"))
+        self.assertEqual(data.count(b"<path "), len(meds))
+        buf = io.StringIO()
+        self.assertIsNone(r.render_char(meds, styles, buf, render_mode="median_fill"))
+        self.assertEqual(buf.getvalue().encode("utf-8"), data)
+
+    def test_raster_backend_matches_svg_geometry(self):
+        import numpy as np
+        from src.raster import rasterize_char, rasterize_svg
+        meds = parser.normalize_medians(parser.demo_glyph_shi()["medians"])
+        styles = [{"thickness": {"width_base": 0.05}}] * len(meds)
+        direct = np.asarray(rasterize_char(meds, styles, size_px=128, padding=4))
+        svg = SvgRenderer(size_px=128, padding=4).render_char(meds, styles, None, render_mode="median_fill")
+        via_svg = np.asarray(rasterize_svg(svg.decode("utf-8")))
+        self.assertEqual(direct.shape, (128, 128, 4))
+        ink_direct = direct[..., 3] > 127
+        ink_svg = via_svg[..., 0] < 128  # 白底黑字
+        self.assertGreater(ink_direct.sum(), 0)
+        # 仅允许 SVG 坐标取两位小数带来的边缘像素差异
+        self.assertLessEqual(int((ink_direct != ink_svg).sum()), int(ink_direct.sum()) // 100)
+        self.assertEqual(rasterize_char(meds, styles, size_px=128, padding=4, scale=2.0).size, (256, 256))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from src.curvefit import fit_cubic_beziers, fit_path_d
+from src.svgpath import encode_polyline, path_points, path_subpaths
+
+
+class TestSvgPath(unittest.TestCase):
+    def test_encode_polyline_roundtrip_within_tolerance(self):
+        t = np.linspace(0.0, 1.0, 500)
+        P = np.c_[20 + 200 * t, 128 + 60 * np.sin(3 * t)]
+        d = encode_polyline(P, pixel_size=1.0)
+        self.assertTrue(d.startswith("M") and "l" in d)
+        self.assertLess(len(d), len(P) * 2)
+        Q = path_subpaths(d)[0][0]
+        self.assertTrue(np.allclose(Q[0], P[0], atol=0.05) and np.allclose(Q[-1], P[-1], atol=0.05))
+        # 原始点到编码折线的距离 <= 抽稀容差 + 量化误差
+        seg_a, seg_b = Q[:-1], Q[1:]
+        ab = seg_b - seg_a
+        for p in P[::7]:
+            tt = np.clip(((p - seg_a) * ab).sum(1) / np.maximum((ab * ab).sum(1), 1e-12), 0, 1)
+            self.assertLessEqual(np.hypot(*(seg_a + tt[:, None] * ab - p).T).min(), 0.25 + 0.1)
+
+    def test_path_points_absolutizes_relative_commands(self):
+        pts = path_points("m10 20l5-3 .5.5h2v-1z")
+        self.assertEqual(pts.tolist(), [[10, 20], [15, 17], [15.5, 17.5], [17.5, 17.5], [17.5, 16.5]])
+
+    def test_curve_fit_is_error_bounded_and_keeps_corners(self):
+        # 致密圆弧 + 直线，中间为 90° 尖角
+        t = np.linspace(0.0, np.pi / 2, 400)
+        arc = np.c_[100 + 80 * np.cos(t), 100 + 80 * np.sin(t)]
+        line = np.c_[np.linspace(20, 20, 200), np.linspace(180, 250, 200)]
+        P = np.vstack([arc, line[1:]])
+        segs = fit_cubic_beziers(P, tolerance=0.2)
+        self.assertLess(len(segs), 10)
+        self.assertTrue(any(np.allclose(s[3], arc[-1]) for s in segs))
+        d = fit_path_d(P, pixel_size=1.0)
+        self.assertLess(len(d), len(encode_polyline(P, pixel_size=1.0)))
+        Q = path_subpaths(d, tolerance=0.01)[0][0]
+        ab = Q[1:] - Q[:-1]
+        for p in P[::5]:
+            tt = np.clip(((p - Q[:-1]) * ab).sum(1) / np.maximum((ab * ab).sum(1), 1e-12), 0, 1)
+            self.assertLessEqual(np.hypot(*(Q[:-1] + tt[:, None] * ab - p).T).min(), 0.25 + 0.02)
+
+    def test_document_rewriter_single_pass(self):
+        from src.svgdoc import recolor_strokes, rewrite_svg, svg_bounds
+        from src.svgpath import scan_path
+        self.assertEqual(list(scan_path("a5 5 0 0110 10")), [("a", [5.0, 5.0, 0.0, 0.0, 1.0, 10.0, 10.0])])
+        svg = ("<svg><!-- <path d='M0 0L999 999'/> --><rect width='256' height='256' fill='white'/>"
+               "<path id=\"M5 5\" d='M10 20a10 10 0 0 1 20 0' stroke='#123456'/>"
+               "<circle cx='50' cy='60' r='5' stroke=\"none\"/></svg>")
+        # id 属性与注释中的坐标都不计入；圆弧按真实曲线取控制点
+        x0, y0, x1, y1 = svg_bounds(svg)
+        self.assertEqual((x0, x1), (10.0, 55.0))
+        self.assertAlmostEqual(y0, 10.0, places=6)  # 半圆拆成两段 90° 弧，顶点处控制点水平
+        self.assertEqual(y1, 65.0)
+        seen = []
+        out = rewrite_svg(svg, [lambda el: seen.append(el.tag), recolor_strokes("#000000")])
+        self.assertEqual(seen, ["svg", "rect", "path", "circle"])
+        self.assertIn('id="M5 5" d="M10 20a10 10 0 0 1 20 0" stroke="#000000"', out)
+        self.assertIn("stroke=\"none\"/>", out)
+        self.assertTrue(out.startswith("<svg><!-- <path d='M0 0L999 999'/> -->"))
+
+    def test_converted_line_is_not_filled(self):
+        from src.svgdoc import iter_elements, rewrite_svg, shapes_to_paths
+        svg = "<svg><line x1='10' y1='10' x2='200' y2='40' stroke='#000000' fill='#000000'/><polyline points='0 0 5 5'/></svg>"
+        els = [el for _, _, el in iter_elements(rewrite_svg(svg, [shapes_to_paths()])) if el.tag == "path"]
+        self.assertEqual(len(els), 2)
+        # line 转 path 后不能继承 path 的默认黑色填充；polyline 本身按默认填充，不改
+        self.assertEqual(els[0].get("fill"), "none")
+        self.assertEqual(els[0].get("stroke"), "#000000")
+        self.assertIsNone(els[1].get("fill"))
+
+
+if __name__ == "__main__":
+    unittest.main()
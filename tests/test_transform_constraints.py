@@ -1,8 +1,37 @@
 import unittest
 import math
 
-from src.transformer import transform_medians
-from src.constraints import apply_collision_avoidance
+from src.transformer import transform_medians, transform_medians_batch, build_svg_px_matrix
+from src.constraints import apply_collision_avoidance, _apply_collision_avoidance_reference
+from src.centerline import length_preserving_chaikin, length_preserving_chaikin_glyph
+
+
+def _reference_length_preserving_chaikin(points, iters):
+    # 向量化之前的逐笔画实现（原样保留），作为独立参照
+    def length(pts):
+        return sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(pts, pts[1:]))
+
+    if iters <= 0 or len(points) < 3:
+        return points
+    L0 = length(points)
+    sm = list(points)
+    for _ in range(iters):
+        new_pts = [sm[0]]
+        for p0, p1 in zip(sm, sm[1:]):
+            new_pts.append((0.75 * p0[0] + 0.25 * p1[0], 0.75 * p0[1] + 0.25 * p1[1]))
+            new_pts.append((0.25 * p0[0] + 0.75 * p1[0], 0.25 * p0[1] + 0.75 * p1[1]))
+        new_pts.append(sm[-1])
+        sm = new_pts
+    L1 = length(sm)
+    if abs(L1 - L0) / max(1e-9, L0) < 1e-4 or L1 <= 1e-12:
+        return sm
+    s = L0 / L1
+    q = [points[0]]
+    for a, b in zip(sm, sm[1:]):
+        q.append((q[-1][0] + s * (b[0] - a[0]), q[-1][1] + s * (b[1] - a[1])))
+    dx, dy = points[-1][0] - q[-1][0], points[-1][1] - q[-1][1]
+    n = len(q)
+    return [(x + i / (n - 1) * dx, y + i / (n - 1) * dy) for i, (x, y) in enumerate(q)]
 
 
 class TestTransformConstraints(unittest.TestCase):
@@ -23,6 +52,41 @@ class TestTransformConstraints(unittest.TestCase):
         ys = [p[1] for p in out[0]]
         self.assertTrue((max(xs) - min(xs)) > (max(ys) - min(ys)))
 
+    def test_batch_and_svg_matrix_match(self):
+        style = {"geometry": {"length_scale": 1.3, "tilt_deg": 12.0, "shear": 0.2}}
+        g1 = [[(0.1, 0.2), (0.5, 0.6), (0.9, 0.4)], [(0.3, 0.3)]]
+        g2 = [[(0.7, 0.1), (0.2, 0.8)]]
+        out = transform_medians_batch([g1, g2], style)
+        self.assertEqual(out, [transform_medians(g1, style), transform_medians(g2, style)])
+        # 像素空间矩阵作用于未变换点 == 变换后的点映射到像素
+        a, b, c, d, e, f = build_svg_px_matrix(style, 256, 8)
+        s = 256 - 16
+        for (x, y), (tx, ty) in zip(g1[0], out[0][0]):
+            X, Y = 8 + x * s, 8 + (1 - y) * s
+            self.assertAlmostEqual(a * X + c * Y + e, 8 + tx * s, places=6)
+            self.assertAlmostEqual(b * X + d * Y + f, 8 + (1 - ty) * s, places=6)
+
+    def test_chaikin_glyph_matches_per_stroke(self):
+        med = [
+            [(0.1, 0.1), (0.5, 0.4), (0.6, 0.9), (0.9, 0.8)],
+            [(0.2, 0.5), (0.8, 0.5)],  # 少于3点保持原样
+            [(0.3, 0.2), (0.35, 0.7), (0.7, 0.75)],
+        ]
+        for iters in (1, 3):
+            out = length_preserving_chaikin_glyph(med, iters)
+            self.assertEqual(out[1], med[1])
+            for st, got in zip(med, out):
+                ref = _reference_length_preserving_chaikin(st, iters)
+                for res in (got, length_preserving_chaikin(st, iters)):
+                    self.assertEqual(len(ref), len(res))
+                    for p, q in zip(ref, res):
+                        self.assertAlmostEqual(p[0], q[0], places=9)
+                        self.assertAlmostEqual(p[1], q[1], places=9)
+        out = length_preserving_chaikin_glyph(med, 3)
+        # 端点锚定
+        self.assertAlmostEqual(out[0][-1][0], 0.9, places=9)
+        self.assertAlmostEqual(out[0][-1][1], 0.8, places=9)
+
     def test_collision_distance_increase(self):
         # two identical overlapping horizontal strokes
         med = [
@@ -36,6 +100,19 @@ class TestTransformConstraints(unittest.TestCase):
         self.assertNotEqual(y0, y1)
         self.assertGreater(abs(y0 - y1), 0.0)
 
+    def test_collision_hash_matches_reference(self):
+        med = []
+        for k in range(12):
+            ang = k * 0.53
+            x0, y0 = 0.5 + 0.3 * math.cos(k * 1.7), 0.5 + 0.3 * math.sin(k * 2.3)
+            med.append([(x0 + 0.04 * t * math.cos(ang), y0 + 0.04 * t * math.sin(ang)) for t in range(10)])
+        ref = _apply_collision_avoidance_reference(med, min_distance=0.04, strength=0.8, iterations=2)
+        out = apply_collision_avoidance(med, min_distance=0.04, strength=0.8, iterations=2)
+        for a, b in zip(ref, out):
+            for p, q in zip(a, b):
+                self.assertAlmostEqual(p[0], q[0], places=9)
+                self.assertAlmostEqual(p[1], q[1], places=9)
+
 
 if __name__ == "__main__":
     unittest.main()
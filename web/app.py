@@ -3,13 +3,16 @@ from flask import Flask, request, redirect, url_for, render_template_string, sen
 from flask_cors import CORS
 import threading
 import logging
+import shutil
 import subprocess
 import sys
 import os
 import time
 import json
+import re
 from typing import List, Dict, Any
 from web.routes.api import api_bp
+from src.svgdoc import drop_background_rects, drop_empty_defs, recolor_strokes, rewrite_svg, svg_bounds
 from web.config import ROOT, OUTPUT_COMPARE, MERGED_JSON, BASE_STYLE
 from web.services.files import latest_filenames_for_char, clean_compare_ab_only, clean_compare_all
 from web.services.generation import generate_abcd, quick_raw_svg, build_processed_centerline_svg
@@ -70,7 +73,8 @@ def generate_abcd(
     style_override_path: str | None = None,
     *,
     grid_state: Dict[str, Any] | None = None,
-    use_grid_deformation: bool = False
+    use_grid_deformation: bool = False,
+    target_px: int | None = None
 ) -> Dict[str, str]:
     from web.services.generation import generate_abcd as _impl
     return _impl(
@@ -78,6 +82,7 @@ def generate_abcd(
         style_override_path=style_override_path,
         grid_state=grid_state,
         use_grid_deformation=use_grid_deformation,
+        target_px=target_px,
     )
 HTML = None
 
@@ -488,14 +493,14 @@ def handle_d2_generation(ch, grid_state):
         if grid_state:
             try:
                 # 统一调用高质量网格变形函数
-                from web.services.grid_transform import apply_grid_deformation_to_svg
+                from web.services.deform_cache import cached_grid_deformation_to_svg
                 
                 # Read D1 SVG content
                 with open(d1_path, 'r', encoding='utf-8') as f:
                     d1_content = f.read()
                 
-                # Apply grid transformation
-                d2_content = apply_grid_deformation_to_svg(d1_content, grid_state)
+                # Apply grid transformation (cached by D1 content + grid_state)
+                d2_content = cached_grid_deformation_to_svg(d1_content, grid_state)
                 
                 # Save D2 file
                 d2_filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{ch}_d2.svg"
@@ -697,10 +702,10 @@ def save_d2():
         
         # 应用网格变形生成D2
         try:
-            from web.services.grid_transform import transform_d1_to_d2
+            from web.services.deform_cache import cached_transform_d1_to_d2
             
-            # 使用网格变形算法处理D1内容，传递画布尺寸
-            d2_content = transform_d1_to_d2(d1_content, grid_state, canvas_dimensions)
+            # 使用网格变形算法处理D1内容，传递画布尺寸（相同D1+网格直接取缓存）
+            d2_content = cached_transform_d1_to_d2(d1_content, grid_state, canvas_dimensions)
             logger.info(f"网格变形处理完成，内容长度: {len(d2_content)}")
             
             # 保存D2文件
@@ -779,6 +784,8 @@ def api_generate():
             style_override_path=style_path,
             grid_state=grid_state,
             use_grid_deformation=bool(grid_state),  # 保持参数兼容性，但实际逻辑在generate_abcd中
+            geometry_deformation=bool(data.get('geometry_deformation', False)),
+            deform_d2=bool(data.get('deform_d2', False)),
         )
         
         if urls:
@@ -833,7 +840,9 @@ def api_generate_single():
         # 生成单个类型的图像（支持可选的grid_state）
         from web.services.generation import generate_single_type
         grid_state = data.get('grid_state')
-        urls = generate_single_type(char, image_type, style_override_path=style_path, grid_state=grid_state)
+        urls = generate_single_type(char, image_type, style_override_path=style_path, grid_state=grid_state,
+                                    geometry_deformation=bool(data.get('geometry_deformation', False)),
+                                    deform_d2=bool(data.get('deform_d2', False)))
 
         # 如果生成C图，并且启用了chaikin/smooth等细化功能，则立即触发一次C生成以刷新角度数据
         if image_type == 'C' and urls.get('C'):
@@ -1316,6 +1325,48 @@ def generate_pdf():
         pdf_filename = svg_filename.replace('.svg', '.pdf')
         pdf_path = os.path.join('output', 'compare', 'articles', pdf_filename)
         
+        # 同一篇文章的全部页面：{basename}.svg, {basename}_p2.svg, ...
+        article_base = re.sub(r'(_p\d+)?\.svg$', '', svg_path)
+        page_svgs = [f"{article_base}.svg"] if os.path.exists(f"{article_base}.svg") else [svg_path]
+        n = 2
+        while os.path.exists(f"{article_base}_p{n}.svg"):
+            page_svgs.append(f"{article_base}_p{n}.svg")
+            n += 1
+        
+        # 方法0: 有排版记录时逐页重排并流式写出多页PDF（字形为共享 XObject）
+        layout_json = article_base + '.json'
+        if os.path.exists(layout_json):
+            with open(layout_json, 'r', encoding='utf-8') as f:
+                layout = json.load(f)
+            native_pdf = os.path.basename(layout_json)[:-len('.json')] + '.pdf'
+            native_path = os.path.join('output', 'compare', 'articles', native_pdf)
+            # 用排版时记录的样式快照与 grid_state 重排，与 SVG 页面一致（旧记录没有这两项时取当前值）
+            inputs = None
+            if 'grid_state' in layout:
+                style_snapshot = layout.pop('style_path', None)
+                if style_snapshot and not os.path.exists(style_snapshot):
+                    print(f"[PDF] 样式快照缺失: {style_snapshot}，使用默认样式")
+                    style_snapshot = None
+                layout.pop('grid_state_key', None)
+                inputs = (style_snapshot, layout.pop('grid_state'))
+            t0 = time.time()
+            try:
+                page_count = write_article_pdf(layout.pop('text'), native_path, None, inputs=inputs, **layout)
+            except ValueError as e:
+                # 有字形无法转换：不输出缺字的 PDF，改走下面的整页 SVG 转换
+                print(f"[PDF] 原生PDF输出失败，回退: {e}")
+                if os.path.exists(native_path):
+                    os.remove(native_path)
+            else:
+                print(f"[PDF] PDF生成成功 (native): {native_path}，{page_count}页，耗时{time.time() - t0:.2f}s")
+                return jsonify({
+                    'success': True,
+                    'pdf_url': f"/compare/articles/{native_pdf}",
+                    'pdf_path': native_path,
+                    'method': 'native',
+                    'page_count': page_count
+                })
+        
         # 方法1: 尝试使用cairosvg将SVG转换为PDF
         try:
             import cairosvg
@@ -1337,30 +1388,40 @@ def generate_pdf():
             # 返回PDF URL
             pdf_url = f"/compare/articles/{pdf_filename}"
             
-            return jsonify({
+            result = {
                 'success': True,
                 'pdf_url': pdf_url,
                 'pdf_path': pdf_path,
-                'method': 'cairosvg'
-            })
+                'method': 'cairosvg',
+                'page_count': 1,
+                'total_pages': len(page_svgs)
+            }
+            if len(page_svgs) > 1:
+                # cairosvg 每次只转换一个 SVG：明确告知只输出了所请求的这一页
+                result['warning'] = f'仅输出了第1页（共{len(page_svgs)}页），完整文章请使用可打印HTML'
+            return jsonify(result)
             
         except (ImportError, OSError) as e:
             print(f"[PDF] cairosvg方法失败: {e}")
             
             # 方法2: 生成HTML包装的SVG文件作为替代方案
             try:
-                # 读取SVG内容
-                with open(svg_path, 'r', encoding='utf-8') as f:
-                    svg_content = f.read()
+                # 读取全部页面的SVG内容
+                import html
+                page_contents = []
+                for page_svg in page_svgs:
+                    with open(page_svg, 'r', encoding='utf-8') as f:
+                        page_content = f.read()
+                    # 清理SVG内容，确保正确的XML格式
+                    page_contents.append(html.escape(page_content).replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&#x27;', "'"))
+                pages_html = '\n'.join(f'''    <div class="svg-container">
+        {c}
+    </div>''' for c in page_contents)
                 
                 # 创建HTML包装的文件
                 html_filename = svg_filename.replace('.svg', '_printable.html')
                 html_path = os.path.join('output', 'compare', 'articles', html_filename)
                 
-                # 清理SVG内容，确保正确的XML格式
-                import html
-                svg_content = html.escape(svg_content).replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"').replace('&#x27;', "'")
-                
                 # 生成可打印的HTML文件
                 html_content = f'''<!DOCTYPE html>
 <html lang="zh-CN">
@@ -1380,6 +1441,7 @@ def generate_pdf():
             margin: 0;
             padding: 0;
             display: flex;
+            flex-direction: column;
             justify-content: center;
             align-items: center;
             min-height: 100vh;
@@ -1394,6 +1456,7 @@ def generate_pdf():
             align-items: center;
             border: 1px solid #ddd;
             background: white;
+            page-break-after: always;
         }}
         svg {{
             max-width: 100%;
@@ -1429,9 +1492,7 @@ def generate_pdf():
     <div class="print-instructions">
         Press Ctrl+P to print or save as PDF
     </div>
-    <div class="svg-container">
-        {svg_content}
-    </div>
+{pages_html}
     <script>
         function autoPrint() {{
             if (window.location.search.includes('autoprint=true')) {{
@@ -1458,6 +1519,7 @@ def generate_pdf():
                     'pdf_url': html_url,
                     'pdf_path': html_path,
                     'method': 'html_fallback',
+                    'page_count': len(page_svgs),
                     'message': 'PDF生成功能不可用，已生成可打印的HTML文件。您可以在浏览器中打开并使用"打印"功能保存为PDF。'
                 })
                 
@@ -1563,13 +1625,20 @@ def generate_article():
         if not text:
             return jsonify({'success': False, 'error': '文本内容不能为空'}), 400
         
-        if len(text) > 100:
-            return jsonify({'success': False, 'error': '文本长度不能超过100个字符'}), 400
-        
-        # 获取参数
-        font_size = int(data.get('fontSize', 40))
-        line_spacing = int(data.get('lineSpacing', 40))
-        char_spacing = int(data.get('charSpacing', 30))
+        # 获取参数（数值参数缺失取默认值，无法解析时返回 400）
+        from web.services.grid_variation import MAX_VARIANTS
+        try:
+            font_size = int(data.get('fontSize', 40))
+            line_spacing = int(data.get('lineSpacing', 40))
+            char_spacing = int(data.get('charSpacing', 30))
+            # 逐字网格扰动：幅度（网格画布像素，0 为关闭）、变体数、种子（非负整数）
+            variation = min(10.0, max(0.0, float(data.get('variation', 0) or 0)))
+            variation_count = min(MAX_VARIANTS, max(1, int(data.get('variationCount', 8) or 8)))
+            variation_seed = int(data.get('variationSeed', 0) or 0)
+            if variation_seed < 0:
+                raise ValueError(variation_seed)
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'success': False, 'error': '排版参数必须为数字（variationSeed 为非负整数）'}), 400
         background_type = data.get('backgroundType', 'a4')
         font_type = data.get('fontType', 'D1')  # 新增字体类型参数
         reference_char = data.get('referenceChar', '一')
@@ -1580,28 +1649,35 @@ def generate_article():
         # 清除旧的文章SVG文件
         clear_article_svgs()
         
-        # 生成文章SVG
-        article_svg = compose_article_svg(text, None, font_size, line_spacing, char_spacing, background_type, font_type)
-        
-        if not article_svg:
-            return jsonify({'success': False, 'error': 'SVG合成失败'}), 500
-        
-        # 保存SVG文件
+        # 流式排版：逐页写出SVG文件（不限文本长度，内存不随页数增长）
         timestamp = int(time.time() * 1000)
-        svg_filename = f"article_{timestamp}.svg"
-        svg_path = os.path.join(OUTPUT_COMPARE, 'articles', svg_filename)
-        
-        # 确保目录存在
-        os.makedirs(os.path.dirname(svg_path), exist_ok=True)
-        
-        with open(svg_path, 'w', encoding='utf-8') as f:
-            f.write(article_svg)
+        basename = f"article_{timestamp}"
+        articles_dir = os.path.join(OUTPUT_COMPARE, 'articles')
+        os.makedirs(articles_dir, exist_ok=True)
+        pinned = _pin_article_inputs(articles_dir, basename)
+        page_paths = list(write_article_pages(text, articles_dir, basename, None, font_size, line_spacing,
+                                              char_spacing, background_type, font_type,
+                                              variation, variation_count, variation_seed,
+                                              inputs=(pinned['style_path'], pinned['grid_state'])))
+        if not page_paths:
+            return jsonify({'success': False, 'error': 'SVG合成失败'}), 500
+        svg_filename = os.path.basename(page_paths[0])
+        svg_path = page_paths[0]
+        # 记录排版参数，供 /generate_pdf 直接从排版结果流式输出整篇 PDF
+        with open(os.path.join(articles_dir, f"{basename}.json"), 'w', encoding='utf-8') as f:
+            json.dump({'text': text, 'font_size': font_size, 'line_spacing': line_spacing,
+                       'char_spacing': char_spacing, 'background_type': background_type,
+                       'font_type': font_type, 'variation': variation,
+                       'variation_count': variation_count, 'variation_seed': variation_seed, **pinned},
+                      f, ensure_ascii=False)
         
         result = {
             'success': True,
             'svg_url': f'/compare/articles/{svg_filename}',
             'svg_path': svg_path,
-            'message': f'文章SVG生成成功，包含{len(text)}个字符'
+            'pages': [f'/compare/articles/{os.path.basename(p)}' for p in page_paths],
+            'page_count': len(page_paths),
+            'message': f'文章SVG生成成功，包含{len(text)}个字符，共{len(page_paths)}页'
         }
         
         if result['success']:
@@ -1834,7 +1910,8 @@ def clear_article_svgs():
         
         articles_dir = os.path.join(OUTPUT_COMPARE, 'articles')
         if os.path.exists(articles_dir):
-            svg_files = glob.glob(os.path.join(articles_dir, 'article_*.svg'))
+            svg_files = glob.glob(os.path.join(articles_dir, 'article_*.svg')) + \
+                glob.glob(os.path.join(articles_dir, 'article_*.json'))
             total_cleared = 0
             
             for file_path in svg_files:
@@ -1859,7 +1936,15 @@ def extract_svg_content(svg_file_path: str) -> str:
     try:
         with open(svg_file_path, 'r', encoding='utf-8') as f:
             content = f.read()
-        
+    except Exception as e:
+        print(f"[SVG] 提取SVG内容失败: {e}")
+        return ""
+    return extract_svg_markup(content)
+
+
+def extract_svg_markup(content: str) -> str:
+    """extract_svg_content 的文本版本：输入为 SVG 文本。"""
+    try:
         # 提取<svg>标签内的内容
         import re
         # 匹配<svg...>到</svg>之间的内容
@@ -1869,18 +1954,10 @@ def extract_svg_content(svg_file_path: str) -> str:
         else:
             svg_content = content
         
-        # 将所有stroke颜色改为纯黑色 #000000
-        # 匹配 stroke='#颜色' 或 stroke="#颜色" 格式
-        svg_content = re.sub(r"stroke=['\"]#[0-9a-fA-F]{6}['\"]", "stroke='#000000'", svg_content)
-        svg_content = re.sub(r"stroke=['\"]#[0-9a-fA-F]{3}['\"]", "stroke='#000000'", svg_content)
-        
-        # 也处理可能的颜色名称
-        color_names = ['blue', 'red', 'gray', 'grey', 'green', 'yellow', 'purple', 'orange', 'pink', 'brown']
-        for color in color_names:
-            svg_content = re.sub(rf"stroke=['\"]#{color}['\"]", "stroke='#000000'", svg_content, flags=re.IGNORECASE)
-            svg_content = re.sub(rf"stroke=['\"]#{color}['\"]", "stroke='#000000'", svg_content, flags=re.IGNORECASE)
-        
-        return svg_content
+        # 单遍改写：去掉白色背景矩形与空 <defs />（排版时背景由页面提供，逐字背景只会遮挡相邻字并增大体积），
+        # 并将所有stroke颜色改为纯黑色 #000000。glyph_for_size 的字形入缓存前已去掉背景，
+        # 这里覆盖从磁盘读取的 SVG（extract_svg_content）
+        return rewrite_svg(svg_content, [drop_background_rects, drop_empty_defs, recolor_strokes('#000000')]).strip()
             
     except Exception as e:
         print(f"[SVG] 提取SVG内容失败: {e}")
@@ -1925,45 +2002,21 @@ def generate_font_sample_svg(sample_text: str, font_type: str = 'D1',
         except:
             style_override_path = None
         
+        from web.services.generation import glyph_svg_for_size
         for char in unique_chars:
             if char.strip():  # 跳过空白字符
                 try:
-                    from web.services.generation import generate_abcd
-                    
-                    # 传递网格变形参数
-                    urls = generate_abcd(
-                        char, 
+                    svg_text = glyph_svg_for_size(
+                        char, font_type,
                         style_override_path=style_override_path,
                         grid_state=grid_state,
-                        use_grid_deformation=use_grid
+                        target_px=font_size,
                     )
-                    
-                    if urls and font_type in urls:
-                        svg_url = urls[font_type]
-                        svg_path = svg_url.split('/')[-1]
-                        
-                        # 根据字体类型确定目录
-                        if font_type == 'D1':
-                            svg_dir = 'D1_grid_transform'
-                        elif font_type == 'D2':
-                            svg_dir = 'D2_median_fill'
-                        else:
-                            svg_dir = 'C_processed_centerline'
-                        
-                        svg_full_path = os.path.join('output', 'compare', svg_dir, svg_path)
-                        
-                        # 检查文件是否存在
-                        import glob
-                        pattern = os.path.join('output', 'compare', svg_dir, f'*{char}_{font_type}.svg')
-                        matches = glob.glob(pattern)
-                        if matches:
-                            svg_full_path = matches[-1]
-                        
-                        if os.path.exists(svg_full_path):
-                            char_svgs[char] = extract_svg_content(svg_full_path)
-                            print(f"[SAMPLE] 成功提取字符SVG ({font_type}): {char}")
-                        else:
-                            print(f"[SAMPLE] SVG文件不存在: {svg_full_path}")
+                    if svg_text:
+                        char_svgs[char] = extract_svg_markup(svg_text)
+                        print(f"[SAMPLE] 成功提取字符SVG ({font_type}): {char}")
+                    else:
+                        print(f"[SAMPLE] 字符{char}的{font_type}类型SVG未生成")
                             
                 except Exception as e:
                     print(f"[SAMPLE] 字符{char}生成失败: {e}")
@@ -2019,235 +2072,169 @@ def generate_font_sample_svg(sample_text: str, font_type: str = 'D1',
 
 def extract_svg_bbox(svg_content: str) -> tuple:
     """
-    提取SVG内容的实际边界框
+    提取SVG内容的实际边界框（单遍扫描几何元素的端点与控制点）
     返回 (min_x, min_y, max_x, max_y)
     """
-    import re
-    import xml.etree.ElementTree as ET
-    
     try:
-        # 解析SVG
-        root = ET.fromstring(f'<svg xmlns="http://www.w3.org/2000/svg">{svg_content}</svg>')
-        
-        # 收集所有坐标
-        all_x = []
-        all_y = []
-        
-        # 解析path元素
-        for path in root.findall('.//{http://www.w3.org/2000/svg}path'):
-            d = path.get('d', '')
-            # 提取所有数字坐标
-            coords = re.findall(r'[-+]?[0-9]*\.?[0-9]+', d)
-            for i in range(0, len(coords), 2):
-                if i + 1 < len(coords):
-                    all_x.append(float(coords[i]))
-                    all_y.append(float(coords[i + 1]))
-        
-        # 解析line元素
-        for line in root.findall('.//{http://www.w3.org/2000/svg}line'):
-            x1 = float(line.get('x1', 0))
-            y1 = float(line.get('y1', 0))
-            x2 = float(line.get('x2', 0))
-            y2 = float(line.get('y2', 0))
-            all_x.extend([x1, x2])
-            all_y.extend([y1, y2])
-        
-        if all_x and all_y:
-            return (min(all_x), min(all_y), max(all_x), max(all_y))
-        else:
-            # 如果无法解析，返回默认256x256
-            return (0, 0, 256, 256)
+        # 如果无法解析，返回默认256x256
+        return svg_bounds(svg_content) or (0, 0, 256, 256)
     except Exception as e:
         print(f"[BBOX] 提取边界框失败: {e}")
         return (0, 0, 256, 256)
 
 
+def _article_inputs(style_path: str = None):
+    """当前的文章生成输入：(样式路径, grid_state)。
+    样式取当前请求 cookie 的覆盖版本（非请求上下文时用 style_path），网格取已保存的状态。"""
+    from web.services.grid_state import load_grid_state, has_grid_deformation
+    grid_state = load_grid_state()
+    use_grid = has_grid_deformation()
+    print(f"[COMPOSE] grid_state 是否存在: {grid_state is not None}, use_grid 标志: {use_grid}")
+    if grid_state:
+        print(f"[COMPOSE] controlPoints 数量: {len(grid_state.get('controlPoints', []))}，将应用到D1字体生成")
+    
+    # 构建样式覆盖参数
+    try:
+        style_override_path, cookie_vals = build_style_override({}, request.cookies, prefer_form=False)
+    except:
+        # 非请求上下文时使用默认样式
+        style_override_path = style_path
+    return style_override_path, grid_state
+
+
+def _pin_article_inputs(articles_dir: str, basename: str) -> Dict[str, Any]:
+    """把本次排版用到的样式（复制为 {basename}_style.json，覆盖文件会被后续请求改写）与 grid_state
+    记入排版记录，/generate_pdf 据此重现同一份字形，不受之后的网格/样式调整影响。"""
+    from web.services.grid_transform import grid_state_key
+    style_path, grid_state = _article_inputs()
+    pinned_style = None
+    if style_path and os.path.exists(style_path):
+        pinned_style = os.path.join(articles_dir, f"{basename}_style.json")
+        shutil.copyfile(style_path, pinned_style)
+    return {'style_path': pinned_style, 'grid_state': grid_state,
+            'grid_state_key': grid_state_key(grid_state)}
+
+
+def _article_glyph_source(style_path: str, font_size: int, font_type: str, variation=None, inputs=None):
+    """文章字形来源：返回 (glyph_bbox, glyph_content) 两个按字查询的函数。
+    字形按字号取 LOD 版本、首次用到时才生成，并在本次排版内记忆（只随不同字数增长）。
+    variation 为 GridVariation 时 glyph_content(char, variant) 返回该字的扰动变体（每字一次批量生成全部变体）。
+    inputs 为固定的 (样式路径, grid_state)；None 时取当前样式与网格（见 _article_inputs）。"""
+    from web.services.generation import glyph_for_size
+    style_override_path, grid_state = inputs if inputs is not None else _article_inputs(style_path)
+    
+    memo: Dict[str, Any] = {}
+    variant_memo: Dict[str, List[str]] = {}
+    
+    def load(char: str):
+        if char in memo:
+            return memo[char]
+        memo[char] = None
+        try:
+            glyph = glyph_for_size(
+                char, font_type,
+                style_override_path=style_override_path,
+                grid_state=grid_state,
+                target_px=font_size,
+            )
+            if glyph:
+                svg_content = extract_svg_markup(glyph.svg)
+                if svg_content:
+                    # 边界框优先用生成阶段由几何得到的元数据，缺失时才解析
+                    memo[char] = (svg_content, glyph.bounds or extract_svg_bbox(svg_content))
+            if memo[char] is None:
+                print(f"[COMPOSE] 字符{char}的{font_type}类型SVG未生成")
+        except Exception as e:
+            print(f"[COMPOSE] 字符{char}生成失败: {e}")
+        return memo[char]
+    
+    def glyph_bbox(char: str):
+        g = load(char)
+        if not g:
+            return None
+        if variation is None:
+            return g[1]
+        # 扰动变体共用一个排版框：按最大位移外扩，变体字形也不越过页边距
+        m = variation.margin
+        x0, y0, x1, y1 = g[1]
+        return (x0 - m, y0 - m, x1 + m, y1 + m)
+    
+    def glyph_content(char: str, variant: int = 0) -> str:
+        g = load(char)
+        if not g:
+            return ''
+        if not variant or variation is None:
+            return g[0]
+        if char not in variant_memo:
+            variant_memo[char] = variation.variant_markups(g[0])
+        return variant_memo[char][variant % len(variant_memo[char])]
+    
+    return glyph_bbox, glyph_content
+
+
+def _article_variation(font_size: int, line_spacing: int, char_spacing: int, variation: float,
+                       variation_count: int, variation_seed: int):
+    """排版参数 + 逐字扰动引擎；variation（扰动幅度，网格画布像素）<= 0 时不启用。"""
+    from web.services.article_layout import LayoutParams
+    if variation and variation > 0 and variation_count > 1:
+        from web.services.grid_variation import GridVariation
+        engine = GridVariation(seed=variation_seed, variants=variation_count, amplitude=variation)
+        return LayoutParams(font_size, line_spacing, char_spacing, variation_count, variation_seed), engine
+    return LayoutParams(font_size, line_spacing, char_spacing), None
+
+
+def write_article_pages(text: str, out_dir: str, basename: str, style_path: str = None,
+                        font_size: int = 40, line_spacing: int = 40, char_spacing: int = 30,
+                        background_type: str = 'a4', font_type: str = 'D1',
+                        variation: float = 0.0, variation_count: int = 8, variation_seed: int = 0,
+                        inputs=None):
+    """流式排版并逐页写出 SVG 文件，每页完成即产出其路径。
+    第 1 页为 {basename}.svg，其后为 {basename}_p{n}.svg。
+    variation > 0 时每次出现的字从 variation_count 个网格扰动变体中（按 variation_seed）随机取一个。
+    inputs 见 _article_glyph_source。"""
+    from web.services.article_layout import iter_pages, write_page_svg
+    params, engine = _article_variation(font_size, line_spacing, char_spacing, variation, variation_count, variation_seed)
+    glyph_bbox, glyph_content = _article_glyph_source(style_path, font_size, font_type, engine, inputs)
+    os.makedirs(out_dir, exist_ok=True)
+    for page in iter_pages(text, glyph_bbox, params):
+        name = f"{basename}.svg" if page.index == 0 else f"{basename}_p{page.index + 1}.svg"
+        path = os.path.join(out_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            write_page_svg(f, page, glyph_content, params, background_type=background_type)
+        print(f"[COMPOSE] 第{page.index + 1}页完成: {name}（{len(page.placements)}个字）")
+        yield path
+
+
+def write_article_pdf(text: str, pdf_path: str, style_path: str = None,
+                      font_size: int = 40, line_spacing: int = 40, char_spacing: int = 30,
+                      background_type: str = 'a4', font_type: str = 'D1',
+                      variation: float = 0.0, variation_count: int = 8, variation_seed: int = 0,
+                      inputs=None) -> int:
+    """流式排版并逐页画入同一个 PDF 文件，返回页数。
+    有字形无法转为 PDF 绘图指令时抛出 ValueError（不输出缺字的 PDF）。"""
+    from web.services.article_layout import iter_pages, write_pages_pdf
+    params, engine = _article_variation(font_size, line_spacing, char_spacing, variation, variation_count, variation_seed)
+    glyph_bbox, glyph_content = _article_glyph_source(style_path, font_size, font_type, engine, inputs)
+    os.makedirs(os.path.dirname(pdf_path) or '.', exist_ok=True)
+    with open(pdf_path, 'wb') as f:
+        return write_pages_pdf(f, iter_pages(text, glyph_bbox, params), glyph_content, params,
+                               background_type=background_type)
+
+
 def compose_article_svg(text: str, style_path: str, font_size: int = 40, 
                        line_spacing: int = 40, char_spacing: int = 30,
                        background_type: str = 'a4', font_type: str = 'D1') -> str:
-    """合成文章SVG - 直接调用/gen接口"""
+    """合成文章SVG（第 1 页）。多页输出见 write_article_pages。"""
     try:
+        import io
+        from web.services.article_layout import LayoutParams, iter_pages, write_page_svg
         print(f"[COMPOSE] 开始合成文章SVG，文本长度: {len(text)}, 字体类型: {font_type}")
-        
-        # A4尺寸 (210x297mm at 96dpi)
-        a4_width = 794  # 210mm * 96dpi / 25.4
-        a4_height = 1123  # 297mm * 96dpi / 25.4
-        margin = 60
-        
-        # 加载网格变形状态（如果存在）
-        from web.services.grid_state import load_grid_state, has_grid_deformation
-        grid_state = load_grid_state()
-        use_grid = has_grid_deformation()
-        
-        print(f"[COMPOSE] ===== 网格变形调试信息 =====")
-        print(f"[COMPOSE] grid_state 是否存在: {grid_state is not None}")
-        print(f"[COMPOSE] use_grid 标志: {use_grid}")
-        if grid_state:
-            print(f"[COMPOSE] grid_state 包含的键: {grid_state.keys()}")
-            print(f"[COMPOSE] controlPoints 数量: {len(grid_state.get('controlPoints', []))}")
-            if grid_state.get('controlPoints'):
-                # 显示第一个和最后一个控制点
-                cps = grid_state['controlPoints']
-                print(f"[COMPOSE] 第一个控制点: {cps[0]}")
-                print(f"[COMPOSE] 最后一个控制点: {cps[-1]}")
-            print(f"[COMPOSE] 检测到网格变形状态，将应用到D1字体生成")
-        else:
-            print(f"[COMPOSE] 未检测到网格变形状态")
-        print(f"[COMPOSE] =================================")
-        
-        # 1. 使用/gen接口逻辑生成所有字符的SVG (根据字体类型选择D1或D2)
-        char_svgs = {}  # {char: {'content': svg_content, 'bbox': (min_x, min_y, max_x, max_y)}}
-        unique_chars = list(set(text))  # 去重优化
-        
-        # 构建样式覆盖参数
-        try:
-            style_override_path, cookie_vals = build_style_override({}, request.cookies, prefer_form=False)
-        except:
-            # 非请求上下文时使用默认样式
-            style_override_path = style_path
-        
-        for char in unique_chars:
-            if char.strip():  # 跳过空白字符
-                try:
-                    # 直接调用generate_abcd，就像/gen接口一样
-                    from web.services.generation import generate_abcd
-                    
-                    # 传递网格变形参数
-                    urls = generate_abcd(
-                        char, 
-                        style_override_path=style_override_path,
-                        grid_state=grid_state,
-                        use_grid_deformation=use_grid
-                    )
-                    
-                    # 根据字体类型选择相应的SVG文件
-                    if urls and font_type in urls:
-                        svg_url = urls[font_type]
-                        # 修复路径解析 - 直接使用文件名
-                        svg_path = svg_url.split('/')[-1]  # 提取文件名
-                        
-                        # 根据字体类型确定目录
-                        if font_type == 'D1':
-                            svg_dir = 'D1_grid_transform'
-                        elif font_type == 'D2':
-                            svg_dir = 'D2_median_fill'
-                        else:
-                            svg_dir = 'C_processed_centerline'  # 默认
-                        
-                        svg_full_path = os.path.join('output', 'compare', svg_dir, svg_path)
-                        print(f"[COMPOSE] {font_type}文件路径: {svg_full_path}")
-                        print(f"[COMPOSE] {font_type} URL: {svg_url}")
-                        
-                        # 检查文件是否存在
-                        import glob
-                        pattern = os.path.join('output', 'compare', svg_dir, f'*{char}_{font_type}.svg')
-                        matches = glob.glob(pattern)
-                        if matches:
-                            svg_full_path = matches[-1]  # 使用最新的文件
-                            print(f"[COMPOSE] 找到匹配文件: {svg_full_path}")
-                        
-                        if os.path.exists(svg_full_path):
-                            svg_content = extract_svg_content(svg_full_path)
-                            # 提取实际边界框
-                            bbox = extract_svg_bbox(svg_content)
-                            char_svgs[char] = {
-                                'content': svg_content,
-                                'bbox': bbox
-                            }
-                            bbox_width = bbox[2] - bbox[0]
-                            bbox_height = bbox[3] - bbox[1]
-                            print(f"[COMPOSE] 成功提取字符SVG ({font_type}): {char}, bbox: {bbox_width:.1f}x{bbox_height:.1f}")
-                        else:
-                            print(f"[COMPOSE] SVG文件不存在: {svg_full_path}")
-                    else:
-                        print(f"[COMPOSE] 字符{char}的{font_type}类型SVG未生成")
-                            
-                except Exception as e:
-                    print(f"[COMPOSE] 字符{char}生成失败: {e}")
-        
-        # 2. 创建文章SVG画布
-        article_svg = f'''<svg xmlns="http://www.w3.org/2000/svg" 
-                              width="{a4_width}" height="{a4_height}" 
-                              viewBox="0 0 {a4_width} {a4_height}">
-        <rect x="0" y="0" width="{a4_width}" height="{a4_height}" fill="white"/>
-        '''
-        
-        # 根据背景类型添加背景元素
-        if background_type == 'lined':
-            # 添加下划线背景
-            line_spacing_bg = font_size + line_spacing  # 使用与文字相同的行间距
-            y_start = margin + font_size + 5  # 稍微向下偏移，避免与文字重叠
-            
-            # 生成横线
-            y_pos = y_start
-            while y_pos < a4_height - margin:
-                article_svg += f'''
-        <line x1="{margin}" y1="{y_pos}" x2="{a4_width - margin}" y2="{y_pos}" 
-              stroke="#e0e0e0" stroke-width="1" opacity="0.8"/>'''
-                y_pos += line_spacing_bg
-        
-        print(f"[COMPOSE] 背景类型: {background_type}")
-        
-        # 3. 布局字符SVG - 使用实际边界框计算
-        current_x = margin
-        current_y = margin + font_size
-        max_width = a4_width - 2 * margin
-        
-        for i, char in enumerate(text):
-            if char == '\n':
-                # 换行
-                current_x = margin
-                current_y += font_size + line_spacing
-                continue
-            elif char.strip() == '':
-                # 空格
-                current_x += font_size // 2
-                continue
-            
-            # 添加字符SVG
-            if char in char_svgs:
-                char_data = char_svgs[char]
-                if char_data and char_data['content']:
-                    # 获取字符的实际边界框
-                    bbox = char_data['bbox']
-                    bbox_width = bbox[2] - bbox[0]
-                    bbox_height = bbox[3] - bbox[1]
-                    
-                    # 计算缩放比例
-                    # 目标是让字符的实际内容适应font_size
-                    scale = font_size / max(bbox_width, bbox_height)
-                    
-                    # 计算缩放后的实际宽度（用于布局）
-                    scaled_width = bbox_width * scale
-                    scaled_height = bbox_height * scale
-                    
-                    # 检查是否需要自动换行
-                    if current_x + scaled_width > max_width:
-                        current_x = margin
-                        current_y += font_size + line_spacing
-                    
-                    # 计算偏移量，使字符居中对齐
-                    offset_x = bbox[0] * scale
-                    offset_y = bbox[1] * scale
-                    
-                    # 添加变换后的字符SVG
-                    article_svg += f'''
-        <g transform="translate({current_x - offset_x}, {current_y - font_size - offset_y}) scale({scale})">
-            {char_data['content']}
-        </g>'''
-                    print(f"[COMPOSE] 添加字符: {char} at ({current_x}, {current_y}), scaled_width={scaled_width:.1f}")
-                    
-                    # 根据实际宽度移动光标
-                    current_x += scaled_width + char_spacing
-            else:
-                # 如果字符没有SVG，使用默认宽度
-                current_x += font_size + char_spacing
-        
-        # 4. 关闭SVG标签
-        article_svg += '\n</svg>'
-        
-        print(f"[COMPOSE] 文章SVG合成完成，包含{len(char_svgs)}个字符")
-        return article_svg
+        params = LayoutParams(font_size, line_spacing, char_spacing)
+        glyph_bbox, glyph_content = _article_glyph_source(style_path, font_size, font_type)
+        page = next(iter_pages(text, glyph_bbox, params))
+        out = io.StringIO()
+        write_page_svg(out, page, glyph_content, params, background_type=background_type)
+        return out.getvalue()
         
     except Exception as e:
         print(f"[COMPOSE] SVG合成失败: {e}")
@@ -2255,44 +2242,17 @@ def compose_article_svg(text: str, style_path: str, font_size: int = 40,
 
 
 def generate_single_char_for_article(char: str, style_path: str):
-    """为文章生成单个字符的图像 - 使用D1 SVG渲染"""
+    """为文章生成单个字符的图像 - 由D1中轴几何直接栅格化"""
     try:
         print(f"[ARTICLE] 生成字符: {char}")
         
-        # 方法1: 尝试使用现有的D1 SVG生成逻辑
+        # 方法1: 直接由D1中轴几何栅格化（不经过SVG/cairosvg往返）
         try:
-            # 调用现有的生成逻辑，获取D1 SVG
-            from web.services.generation import generate_abcd
-            import time
-            
-            # 直接调用generate_abcd生成ABCD四种版本
-            result = generate_abcd(char, style_path)
-            
-            if result and 'C_processed_centerline' in result:
-                d1_svg_url = result['C_processed_centerline']
-                # 从URL获取实际文件路径
-                d1_svg_path = d1_svg_url.replace('/compare/C_processed_centerline/', '')
-                d1_svg_full_path = os.path.join(OUTPUT_COMPARE, 'C_processed_centerline', d1_svg_path)
-                
-                if os.path.exists(d1_svg_full_path):
-                    print(f"[ARTICLE] 找到D1 SVG: {d1_svg_full_path}")
-                    
-                    # 使用CairoSVG转换为PNG
-                    try:
-                        import cairosvg
-                        import io
-                        
-                        print(f"[ARTICLE] 使用CairoSVG转换...")
-                        png_data = cairosvg.svg2png(url=d1_svg_full_path, output_width=256, output_height=256)
-                        img = Image.open(io.BytesIO(png_data))
-                        print(f"[ARTICLE] CairoSVG转换成功: {char}")
-                        return img
-                        
-                    except ImportError:
-                        print(f"[ARTICLE] CairoSVG未安装，使用后备方案")
-                    except Exception as e:
-                        print(f"[ARTICLE] CairoSVG转换失败: {e}")
-        
+            from web.services.generation import render_char_image
+            img = render_char_image(char, style_path, size=256, render_mode='centerline')
+            if img is not None:
+                print(f"[ARTICLE] 几何栅格化成功: {char}")
+                return img
         except Exception as e:
             print(f"[ARTICLE] D1生成失败: {e}")
         
@@ -2359,23 +2319,15 @@ def generate_single_char_for_article(char: str, style_path: str):
 def convert_svg_to_png(svg_path: str, size: int = 256):
     """将SVG文件转换为PNG图像"""
     try:
-        from PIL import Image
-        import cairosvg
-        import io
+        from src.raster import svg_to_image
         
         print(f"开始转换SVG到PNG: {svg_path}")
         
-        # 使用cairosvg将SVG转换为PNG，不设置背景色让其保持透明
-        png_data = cairosvg.svg2png(
-            url=svg_path, 
-            output_width=size, 
-            output_height=size
-        )
-        
-        print(f"cairosvg转换完成，数据大小: {len(png_data)} bytes")
-        
-        # 创建PIL图像
-        img = Image.open(io.BytesIO(png_data))
+        # 原生栅格化（不支持的内容回退cairosvg），不设置背景色让其保持透明
+        with open(svg_path, 'r', encoding='utf-8') as f:
+            img = svg_to_image(f.read(), size, size)
+        if img is None:
+            return convert_svg_alternative(svg_path, size)
         print(f"PIL图像创建成功，模式: {img.mode}, 尺寸: {img.size}")
         
         # 确保图像为RGBA模式
@@ -2386,7 +2338,7 @@ def convert_svg_to_png(svg_path: str, size: int = 256):
         return img
         
     except ImportError:
-        print("cairosvg not available, trying alternative method")
+        print("raster backend not available, trying alternative method")
         return convert_svg_alternative(svg_path, size)
         
     except Exception as e:
@@ -453,6 +453,8 @@ class ArticleGenerator {
             fontSize: parseInt(document.getElementById('fontSize')?.value) || 26,
             lineSpacing: parseInt(document.getElementById('lineSpacing')?.value) || 16,
             charSpacing: parseInt(document.getElementById('charSpacing')?.value) || 3,
+            variation: parseFloat(document.getElementById('variationAmount')?.value) || 0,
+            variationSeed: parseInt(document.getElementById('variationSeed')?.value) || 0,
             referenceChar: '一' // 默认参考字符
         };
 
@@ -589,7 +591,7 @@ class ArticleGenerator {
             const result = await response.json();
             
             if (result.success) {
-                if (result.method === 'cairosvg') {
+                if (result.method === 'cairosvg' || result.method === 'native') {
                     // 真正的PDF文件
                     const a = document.createElement('a');
                     a.href = result.pdf_url;
@@ -691,6 +693,12 @@ class ArticleGenerator {
         if (lineSpacing) lineSpacing.value = '16';
         if (charSpacing) charSpacing.value = '3';
         
+        // 重置逐字变化
+        const variationAmount = document.getElementById('variationAmount');
+        const variationSeed = document.getElementById('variationSeed');
+        if (variationAmount) variationAmount.value = '0';
+        if (variationSeed) variationSeed.value = '0';
+        
         // 重置字体大小
         const fontSize = document.getElementById('fontSize');
         const fontSizeValue = document.getElementById('fontSizeValue');
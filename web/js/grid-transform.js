@@ -1137,10 +1137,73 @@ function drawImageTriangleAffine(ctx, image,
   ctx.restore();
 }
 
+/**
+ * 将路径数据规范化为绝对坐标命令（服务端输出使用相对命令与紧凑数字写法）
+ * H/V 转为 L，S/T 展开反射控制点，圆弧 A 近似为直线
+ */
+function absolutizePathData(pathData) {
+  const tokens = pathData.match(/[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?/g);
+  if (!tokens) return '';
+  const arity = { M: 2, L: 2, H: 1, V: 1, C: 6, S: 4, Q: 4, T: 2, A: 7, Z: 0 };
+  const fmt = v => +v.toFixed(4);
+  const out = [];
+  let x = 0, y = 0, sx = 0, sy = 0;
+  let prevCtrl = null, prevCmd = '', cmd = '';
+  let i = 0;
+  while (i < tokens.length) {
+    if (/[A-Za-z]/.test(tokens[i])) {
+      cmd = tokens[i++];
+      if (cmd === 'Z' || cmd === 'z') {
+        out.push('Z');
+        x = sx; y = sy; prevCmd = 'Z'; prevCtrl = null;
+        continue;
+      }
+    } else if (!cmd) {
+      break;
+    }
+    const up = cmd.toUpperCase();
+    const n = arity[up];
+    if (!n || i + n > tokens.length) break;
+    const v = tokens.slice(i, i + n).map(parseFloat);
+    if (v.some(isNaN)) break;
+    i += n;
+    const rel = cmd !== up;
+    const ox = rel ? x : 0, oy = rel ? y : 0;
+    if (up === 'M') {
+      x = ox + v[0]; y = oy + v[1]; sx = x; sy = y;
+      out.push(`M${fmt(x)},${fmt(y)}`);
+      cmd = rel ? 'l' : 'L';
+      prevCtrl = null; prevCmd = 'M';
+      continue;
+    }
+    if (up === 'L' || up === 'H' || up === 'V' || up === 'A') {
+      if (up === 'L') { x = ox + v[0]; y = oy + v[1]; }
+      else if (up === 'H') { x = (rel ? x : 0) + v[0]; }
+      else if (up === 'V') { y = (rel ? y : 0) + v[0]; }
+      else { x = ox + v[5]; y = oy + v[6]; }
+      out.push(`L${fmt(x)},${fmt(y)}`);
+      prevCtrl = null; prevCmd = up;
+      continue;
+    }
+    const pts = [];
+    if (up === 'S' || up === 'T') {
+      const same = (up === 'S' && (prevCmd === 'C' || prevCmd === 'S')) || (up === 'T' && (prevCmd === 'Q' || prevCmd === 'T'));
+      pts.push(same && prevCtrl ? [2 * x - prevCtrl[0], 2 * y - prevCtrl[1]] : [x, y]);
+    }
+    for (let k = 0; k < n; k += 2) pts.push([ox + v[k], oy + v[k + 1]]);
+    prevCtrl = pts[pts.length - 2];
+    [x, y] = pts[pts.length - 1];
+    prevCmd = up;
+    out.push((pts.length === 3 ? 'C' : 'Q') + pts.map(p => `${fmt(p[0])},${fmt(p[1])}`).join(' '));
+  }
+  return out.join(' ');
+}
+
 /**
  * 解析SVG路径数据，提取坐标点
  */
 function parsePathData(pathData) {
+  pathData = absolutizePathData(pathData);
   const points = [];
   const commands = pathData.match(/[MmLlHhVvCcSsQqTtAaZz][^MmLlHhVvCcSsQqTtAaZz]*/g);
   
@@ -1313,11 +1376,15 @@ function applyBilinearInterpolation(x, y) {
  * 变形路径数据
  */
 function deformPathData(pathData) {
-  // 解析路径命令并变形坐标点
-  return pathData.replace(/([ML])\s*([\d.-]+)\s*,?\s*([\d.-]+)/g, (match, command, x, y) => {
-    const deformed = applyBilinearInterpolation(parseFloat(x), parseFloat(y));
-    return `${command}${deformed[0].toFixed(2)},${deformed[1].toFixed(2)}`;
-  });
+  // 先绝对化（只剩 M/L/C/Q/Z，每个点写作 x,y），再变形每条命令的全部端点与控制点
+  return absolutizePathData(pathData).replace(/([MLCQ])([^MLCQZ]*)/g, (match, command, body) => {
+    const pts = body.trim().split(/\s+/).filter(p => p).map(p => {
+      const [x, y] = p.split(',').map(parseFloat);
+      const deformed = applyBilinearInterpolation(x, y);
+      return `${deformed[0].toFixed(2)},${deformed[1].toFixed(2)}`;
+    });
+    return `${command}${pts.join(' ')} `;
+  }).trim();
 }
 
 /**
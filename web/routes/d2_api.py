@@ -11,6 +11,7 @@ from typing import Dict, Any
 # 导入D2生成器
 from src.d2_generator import D2Generator
 from web.services.grid_state import save_grid_state, load_grid_state
+from web.services.deform_cache import cached_transform_d1_to_d2, deform_cache_stats
 
 # 创建蓝图
 d2_api = Blueprint('d2_api', __name__)
@@ -64,7 +65,7 @@ def generate_d2_api():
             logger.info(f"保存网格状态: {grid_state.get('hasDeformation', False)}")
         
         # 创建D2生成器并生成D2
-        generator = D2Generator()
+        generator = D2Generator(deform=cached_transform_d1_to_d2)
         result = generator.generate_d2(char, grid_state)
         
         if result['success']:
@@ -97,7 +98,7 @@ def generate_d2_simple(char: str):
         grid_state = load_grid_state()
         
         # 创建D2生成器并生成D2
-        generator = D2Generator()
+        generator = D2Generator(deform=cached_transform_d1_to_d2)
         result = generator.generate_d2(char, grid_state)
         
         if result['success']:
@@ -128,7 +129,8 @@ def get_d2_status():
         "has_grid_state": true,
         "has_deformation": true,
         "grid_size": 3,
-        "last_updated": "2024-08-22T14:20:00"
+        "last_updated": "2024-08-22T14:20:00",
+        "deform_cache": {"size": 12, "memory_hits": 30, "disk_hits": 2, "misses": 12, "hit_rate": 0.7273}
     }
     """
     try:
@@ -139,14 +141,16 @@ def get_d2_status():
                 'has_grid_state': True,
                 'has_deformation': grid_state.get('hasDeformation', False),
                 'grid_size': grid_state.get('size', 3),
-                'last_updated': grid_state.get('timestamp')
+                'last_updated': grid_state.get('timestamp'),
+                'deform_cache': deform_cache_stats()
             })
         else:
             return jsonify({
                 'has_grid_state': False,
                 'has_deformation': False,
                 'grid_size': 3,
-                'last_updated': None
+                'last_updated': None,
+                'deform_cache': deform_cache_stats()
             })
             
     except Exception as e:
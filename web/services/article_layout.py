@@ -0,0 +1,180 @@
+"""
+文章排版引擎
+
+逐字流式排版：字符 -> 行 -> 页，均为生成器，页面排满即产出；
+内存只与单页字形数量和不同字形数量有关，与全文长度无关。
+每页 SVG 直接写入文本流（文件），不拼接整篇字符串。
+"""
+
+import random
+from typing import Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.svgpath import fmt_number
+
+BBox = Tuple[float, float, float, float]
+
+
+class PageSpec(NamedTuple):
+    """页面尺寸（A4 @ 96dpi）与页边距。"""
+    width: int = 794   # 210mm * 96dpi / 25.4
+    height: int = 1123  # 297mm * 96dpi / 25.4
+    margin: int = 60
+
+
+class LayoutParams(NamedTuple):
+    font_size: int = 40
+    line_spacing: int = 40
+    char_spacing: int = 30
+    variants: int = 1       # 每字的字形变体数（>1 时逐次出现随机取一个，见 grid_variation）
+    variant_seed: int = 0
+
+
+class Placement(NamedTuple):
+    """一个字形的放置：translate(tx ty) scale(scale)，字形坐标为其 256 画布坐标。
+    variant 为字形变体编号（0 为原字形）。"""
+    char: str
+    tx: float
+    ty: float
+    scale: float
+    variant: int = 0
+
+
+class Page(NamedTuple):
+    index: int
+    placements: List[Placement]
+
+
+def layout_lines(chars: Iterable[str], glyph_bbox: Callable[[str], Optional[BBox]],
+                 params: LayoutParams = LayoutParams(), spec: PageSpec = PageSpec()) -> Iterator[List[Placement]]:
+    """逐行产出放置（ty 相对行顶）。换行符与自动换行都结束一行；连续换行产出空行。
+    glyph_bbox(char) 返回字形实际边界框，无字形时返回 None（按默认宽度空出）。
+    params.variants > 1 时每次出现按 variant_seed 确定性地随机取一个变体。"""
+    fs = params.font_size
+    pick = random.Random(params.variant_seed).randrange if params.variants > 1 else None
+    right = spec.width - spec.margin   # x 为页面绝对坐标（从左边距起）
+    line: List[Placement] = []
+    x = float(spec.margin)
+    for char in chars:
+        if char == '\n':
+            yield line
+            line, x = [], float(spec.margin)
+            continue
+        if char.strip() == '':
+            x += fs // 2
+            continue
+        bbox = glyph_bbox(char)
+        if bbox is None:
+            x += fs + params.char_spacing
+            continue
+        bw, bh = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        scale = fs / max(bw, bh, 1e-9)
+        scaled_width = bw * scale
+        # 自动换行
+        if x + scaled_width > right and line:
+            yield line
+            line, x = [], float(spec.margin)
+        line.append(Placement(char, x - bbox[0] * scale, -bbox[1] * scale, scale,
+                              pick(params.variants) if pick else 0))
+        x += scaled_width + params.char_spacing
+    if line:
+        yield line
+
+
+def paginate(lines: Iterable[List[Placement]], params: LayoutParams = LayoutParams(),
+             spec: PageSpec = PageSpec()) -> Iterator[Page]:
+    """行 -> 页：行底（基线）超出下边距时换页，页面排满即产出。"""
+    pitch = params.font_size + params.line_spacing
+    bottom = spec.height - spec.margin
+    index = 0
+    top = float(spec.margin)
+    placements: List[Placement] = []
+    used = False
+    for line in lines:
+        if used and top + params.font_size > bottom:
+            yield Page(index, placements)
+            index += 1
+            top = float(spec.margin)
+            placements = []
+        placements.extend(p._replace(ty=top + p.ty) for p in line)
+        used = True
+        top += pitch
+    if placements or index == 0:
+        yield Page(index, placements)
+
+
+def iter_pages(chars: Iterable[str], glyph_bbox: Callable[[str], Optional[BBox]],
+               params: LayoutParams = LayoutParams(), spec: PageSpec = PageSpec()) -> Iterator[Page]:
+    return paginate(layout_lines(chars, glyph_bbox, params, spec), params, spec)
+
+
+def _glyph_markup(glyph_content: Callable[..., str], p: Placement) -> str:
+    # 变体字形按 glyph_content(char, variant) 取，原字形仍为 glyph_content(char)
+    return glyph_content(p.char, p.variant) if p.variant else glyph_content(p.char)
+
+
+def write_page_svg(out: IO[str], page: Page, glyph_content: Callable[..., str],
+                   params: LayoutParams = LayoutParams(), spec: PageSpec = PageSpec(),
+                   background_type: str = 'a4') -> None:
+    """把一页写入文本流：本页用到的字形（及变体）各定义一次 <symbol>，出现处 <use> 引用。"""
+    W, H, margin = spec.width, spec.height, spec.margin
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">\n')
+    out.write(f'<rect x="0" y="0" width="{W}" height="{H}" fill="white"/>\n')
+    symbol_ids: Dict[Tuple[str, int], str] = {}
+    out.write('<defs>')
+    for p in page.placements:
+        if (p.char, p.variant) not in symbol_ids:
+            sid = symbol_ids[p.char, p.variant] = f"g{len(symbol_ids)}"
+            out.write(f'<symbol id="{sid}" overflow="visible">{_glyph_markup(glyph_content, p)}</symbol>')
+    out.write('</defs>\n')
+    if background_type == 'lined':
+        # 下划线背景：行距与文字一致，稍向下偏移避免与文字重叠
+        y = margin + params.font_size + 5
+        while y < H - margin:
+            out.write(f'<line x1="{margin}" y1="{y}" x2="{W - margin}" y2="{y}" stroke="#e0e0e0" stroke-width="1" opacity="0.8"/>\n')
+            y += params.font_size + params.line_spacing
+    for p in page.placements:
+        out.write(f'<use href="#{symbol_ids[p.char, p.variant]}" transform="translate({fmt_number(p.tx, 2)} {fmt_number(p.ty, 2)}) '
+                  f'scale({p.scale:.5g})"/>\n')
+    out.write('</svg>\n')
+
+
+def write_pages_pdf(stream: IO[bytes], pages: Iterable[Page], glyph_content: Callable[..., str],
+                    params: LayoutParams = LayoutParams(), spec: PageSpec = PageSpec(),
+                    background_type: str = 'a4') -> int:
+    """逐页把排版结果画到同一个 PDF：每个字形首次出现时写成 Form XObject，之后只引用。
+    返回页数。字形片段无法转换时抛出 ValueError。"""
+    from src.pdf_writer import PdfWriter, svg_markup_to_ops
+    pdf = PdfWriter(stream)
+    forms: Dict[Tuple[str, int], Optional[str]] = {}
+    W, H, margin = spec.width, spec.height, spec.margin
+    lined = b''
+    if background_type == 'lined':
+        ys = []
+        y = margin + params.font_size + 5
+        while y < H - margin:
+            ys.append(f'{margin} {y} m {W - margin} {y} l')
+            y += params.font_size + params.line_spacing
+        # #e0e0e0 @ 0.8 不透明度叠在白底上
+        lined = ('q 0.902 0.902 0.902 RG 1 w\n' + '\n'.join(ys) + '\nS Q\n').encode('ascii') if ys else b''
+    for page in pages:
+        pdf.begin_page(W, H)
+        if lined:
+            pdf.draw_ops(lined)
+        for p in page.placements:
+            key = (p.char, p.variant)
+            if key not in forms:
+                name = None
+                try:
+                    ops, bbox = svg_markup_to_ops(_glyph_markup(glyph_content, p))
+                except ValueError as e:
+                    # 不输出缺字的 PDF：交给调用方失败或回退
+                    raise ValueError(f"字形{p.char}无法转换为PDF: {e}") from e
+                if ops:
+                    name = f'G{len(forms)}'
+                    pdf.define_form(name, ops, bbox)
+                forms[key] = name
+            if forms[key]:
+                pdf.draw_form(forms[key], (p.scale, 0.0, 0.0, p.scale, p.tx, p.ty))
+        pdf.end_page()
+    pdf.close()
+    return pdf.page_count
@@ -0,0 +1,214 @@
+"""
+网格变形结果缓存
+
+同一份 D1 内容在同一网格下会被反复变形（重新打开网格弹窗、重复导出 D2、对比页重新生成），
+结果只取决于输入 SVG 与 grid_state，因此按内容哈希缓存：
+内存 LRU 一级 + 磁盘文件二级（进程重启后仍可命中），两级都有条目上限。
+键含变形算法版本：算法改动后旧的磁盘条目不再命中，由条目上限逐步淘汰。
+回退结果（变形失败返回原文、改走次选算法）与未变形结果不写入缓存。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from web.config import ROOT
+from web.services.grid_transform import (apply_grid_deformation_to_svg, apply_smooth_grid_deformation,
+                                         fell_back, reset_fallback, transform_d1_to_d2)
+
+DEFORM_CACHE_DIR = os.path.join(ROOT, 'output', 'cache', 'deform')
+# 变形算法或缓存格式改动时递增
+DEFORM_CACHE_VERSION = 2
+
+
+def _grid_blob(grid_state: Optional[Dict[str, Any]]) -> Optional[list]:
+    """grid_state 中变形会读到的全部字段（控制点坐标与原始坐标、size、hasDeformation）"""
+    if not isinstance(grid_state, dict) or not grid_state.get('controlPoints'):
+        return None
+    try:
+        pts = [[round(float(p[k]), 6) if k in p else None for k in ('x', 'y', 'originalX', 'originalY')]
+               for p in grid_state['controlPoints']]
+    except (TypeError, ValueError):
+        return None
+    if any(p[0] is None or p[1] is None for p in pts):
+        return None
+    return [grid_state.get('size', 4), bool(grid_state.get('hasDeformation')), pts]
+
+
+class DeformCache:
+    """变形结果两级缓存：键为 (操作名, 输入 SVG 哈希, grid_state 哈希, 其余参数)。"""
+
+    def __init__(self, maxsize: int = 256, cache_dir: Optional[str] = DEFORM_CACHE_DIR,
+                 max_disk_entries: int = 4096):
+        self.maxsize = int(maxsize)
+        self.cache_dir = cache_dir
+        self.max_disk_entries = int(max_disk_entries)
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        # Flask 请求线程共享同一实例：内存表与计数器的读写都在锁内，磁盘 IO 不持锁
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(op: str, svg_content: str, grid_state: Optional[Dict[str, Any]], **params: Any) -> Optional[str]:
+        """无有效网格时返回 None（不缓存）。"""
+        grid = _grid_blob(grid_state)
+        if grid is None:
+            return None
+        svg_hash = hashlib.sha1(svg_content.encode('utf-8')).hexdigest()
+        blob = json.dumps([DEFORM_CACHE_VERSION, op, svg_hash, grid, params],
+                          sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.svg')
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.memory_hits += 1
+                return value
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = f.read()
+                os.utime(path)  # 磁盘按修改时间近似 LRU
+            except OSError:
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp, path)  # 原子替换，并发读不会看到半个文件
+        except OSError as e:
+            print(f"[DEFORM_CACHE] 写入磁盘缓存失败: {e}")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 64 == 0
+        if prune:
+            self._prune_disk()
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _disk_files(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        out = []
+        for sub in os.scandir(self.cache_dir):
+            if sub.is_dir():
+                out.extend(e for e in os.scandir(sub.path) if e.name.endswith('.svg'))
+        return out
+
+    def _prune_disk(self) -> None:
+        """磁盘条目超出上限时删除最久未用的文件。"""
+        files = self._disk_files()
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for e in files[:excess]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+    def get_or_compute(self, op: str, svg_content: str, grid_state: Optional[Dict[str, Any]],
+                       compute: Callable[[], str], **params: Any) -> str:
+        key = self.key(op, svg_content, grid_state, **params)
+        if key is None:
+            return compute()
+        value = self.get(key)
+        if value is None:
+            reset_fallback()
+            value = compute()
+            # 未变形（原样返回）或回退的结果不缓存，下次仍重新计算
+            if value and value != svg_content and not fell_back():
+                self.put(key, value)
+        return value
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._data.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+        if disk:
+            for e in self._disk_files():
+                try:
+                    os.remove(e.path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+            memory_hits, disk_hits, misses = self.memory_hits, self.disk_hits, self.misses
+        lookups = memory_hits + disk_hits + misses
+        return {
+            'size': size,
+            'memory_hits': memory_hits,
+            'disk_hits': disk_hits,
+            'misses': misses,
+            'hit_rate': round((memory_hits + disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+DEFORM_CACHE = DeformCache()
+
+
+def cached_smooth_grid_deformation(svg_content: str, grid_state: Dict[str, Any],
+                                   canvas_dimensions: Dict[str, int] = None,
+                                   pixel_size: float = 1.0) -> str:
+    """apply_smooth_grid_deformation 的缓存版本"""
+    return DEFORM_CACHE.get_or_compute(
+        'smooth', svg_content, grid_state,
+        lambda: apply_smooth_grid_deformation(svg_content, grid_state, canvas_dimensions, pixel_size=pixel_size),
+        canvas=canvas_dimensions, pixel_size=pixel_size)
+
+
+def cached_transform_d1_to_d2(d1_content: str, grid_state: Dict[str, Any],
+                              canvas_dimensions: Dict[str, int] = None) -> str:
+    """transform_d1_to_d2 的缓存版本"""
+    return DEFORM_CACHE.get_or_compute(
+        'd1_to_d2', d1_content, grid_state,
+        lambda: transform_d1_to_d2(d1_content, grid_state, canvas_dimensions),
+        canvas=canvas_dimensions)
+
+
+def cached_grid_deformation_to_svg(svg_content: str, grid_state: Dict[str, Any], **kwargs: Any) -> str:
+    """apply_grid_deformation_to_svg 的缓存版本（关键字参数一并计入键）"""
+    return DEFORM_CACHE.get_or_compute(
+        'grid_svg', svg_content, grid_state,
+        lambda: apply_grid_deformation_to_svg(svg_content, grid_state, **kwargs),
+        **kwargs)
+
+
+def deform_cache_stats() -> Dict[str, Any]:
+    return DEFORM_CACHE.stats()
@@ -2,7 +2,10 @@ from __future__ import annotations
 import os
 import time
 import json
-from typing import Dict, Any, List
+import hashlib
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 from web.config import ROOT, OUTPUT_COMPARE, MERGED_JSON, BASE_STYLE
 from web.services.files import latest_filenames_for_char
@@ -10,7 +13,13 @@ from src.parser import normalize_medians_1024
 from src.classifier import classify_glyph
 from src.styler import load_style, build_rng, sample_hierarchical_style
 from src.centerline import CenterlineProcessor
-from src.transformer import transform_medians
+from src.transformer import transform_medians, transform_medians_batch, svg_transform_attr
+from src import lod
+from src import segments as seg
+from src.curvefit import fit_path_d
+from src.svgdoc import drop_background_rects, rewrite_svg
+from src.svgpath import encode_polyline
+from web.services.grid_transform import FLATNESS_PX, apply_cropping_logic, deform_polyline, geometry_deformer
 
 DEFAULT_SIZE = 256
 DEFAULT_PAD = 8
@@ -70,13 +79,18 @@ def _stable_seed_for_char(ch: str, style_json: Dict[str, Any]) -> int:
     return ((_coherence_seed(style_json) * 1000003) ^ (ord(ch) if ch else 0)) & 0x7fffffff
 
 
-def _render_centerline_svg(med: List[List[tuple]], *, size: int = DEFAULT_SIZE, pad: int = DEFAULT_PAD, color: str = '#3aa3ff') -> str:
+def _render_centerline_svg(med: List[List[tuple]], *, size: int = DEFAULT_SIZE, pad: int = DEFAULT_PAD, color: str = '#3aa3ff', transform: str = '') -> str:
     W = H = size
     sx = sy = (W - 2 * pad)
     def map_pt(x: float, y: float):
         return pad + x * sx, pad + (1.0 - y) * sy
     parts = [f"<svg xmlns='http://www.w3.org/2000/svg' width='{W}' height='{H}' viewBox='0 0 {W} {H}'>",
              f"<rect x='0' y='0' width='{W}' height='{H}' fill='white'/>"]
+    # 全局仿射以 transform 输出，线宽不随矩阵缩放
+    extra = ''
+    if transform:
+        parts.append(f"<g transform='{transform}'>")
+        extra = " vector-effect='non-scaling-stroke'"
     for st in med:
         if not st:
             continue
@@ -85,7 +99,9 @@ def _render_centerline_svg(med: List[List[tuple]], *, size: int = DEFAULT_SIZE,
         for (x, y) in st[1:]:
             X, Y = map_pt(x, y)
             d.append(f"L{X:.2f},{Y:.2f}")
-        parts.append(f"<path d='{' '.join(d)}' stroke='{color}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
+        parts.append(f"<path d='{' '.join(d)}' stroke='{color}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'{extra}/>")
+    if transform:
+        parts.append('</g>')
     parts.append('</svg>')
     return ''.join(parts)
 
@@ -96,9 +112,86 @@ def quick_raw_svg(ch: str, size: int = DEFAULT_SIZE, *, style: Dict[str, Any] |
     if not meta:
         return '<p>无该字数据</p>'
     med = normalize_medians_1024(meta.get('medians', []))
-    if style:
-        med = transform_medians(med, style)
-    return _render_centerline_svg(med, size=size, pad=DEFAULT_PAD, color='#3aa3ff')
+    transform = svg_transform_attr(style, size, DEFAULT_PAD) if style else ''
+    return _render_centerline_svg(med, size=size, pad=DEFAULT_PAD, color='#3aa3ff', transform=transform)
+
+
+# ---- B/C/D1 三色预览：统一的分段着色内核 ----
+# 分类在 src.segments 中按笔向量化完成（窗口/折点/短笔画/固定分段），
+# 这里只负责颜色映射与输出：相邻同色线段合并为一条折线 path。
+
+_WINDOW_COLORS = {
+    seg.START: '#1e90ff', seg.MIDDLE: '#282828', seg.PEAK: '#dc322f', seg.ISOLATE: '#800080',
+}
+
+
+BBox = Tuple[float, float, float, float]
+
+
+class GlyphSvg(NamedTuple):
+    """SVG 文本 + 由几何数组直接得到的内容包围盒（画布像素，不含线宽；无几何时为 None）。"""
+    svg: str
+    bounds: Optional[BBox]
+
+
+def _union_bounds(pts: np.ndarray, bounds: Optional[BBox]) -> Optional[BBox]:
+    if not len(pts):
+        return bounds
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    if bounds is None:
+        return (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]))
+    return (min(bounds[0], float(lo[0])), min(bounds[1], float(lo[1])),
+            max(bounds[2], float(hi[0])), max(bounds[3], float(hi[1])))
+
+
+def _emit_runs_svg(runs: List[Tuple[int, Any]], colors: Dict[int, str], *, size: int, pad: int,
+                   fit_curves: bool = False, pixel_size: float = 1.0, deform=None,
+                   with_bounds: bool = False):
+    """fit_curves: Chaikin 平滑后的致密中轴拟合为三次贝塞尔段输出（误差 <= 0.25px）。
+    pixel_size > 1（LOD，一个输出像素对应的画布像素数）时按 LOD 容差（输出像素的 1/4）做 RDP 抽稀后直接输出折线。
+    deform: 画布像素坐标的批量变形函数（见 grid_transform.geometry_deformer），在拟合/编码前直接作用于中轴折线。
+    with_bounds: 返回 GlyphSvg（附带输出折线的包围盒），否则只返回 SVG 文本。"""
+    W = H = size
+    bounds = None
+    s = float(W - 2 * pad)
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' width='{W}' height='{H}' viewBox='0 0 {W} {H}'>",
+        f"<rect x='0' y='0' width='{W}' height='{H}' fill='white'/>",
+    ]
+    for label, P in runs:
+        px = np.empty_like(P)
+        px[:, 0] = pad + P[:, 0] * s
+        px[:, 1] = pad + (1.0 - P[:, 1]) * s
+        if deform is not None:
+            px = deform_polyline(px, deform, tolerance=FLATNESS_PX * pixel_size)
+        if with_bounds:
+            bounds = _union_bounds(px, bounds)
+        if pixel_size > 1.0:
+            d = encode_polyline(lod.rdp(px, lod.LOD_TOLERANCE_PX * pixel_size), pixel_size=pixel_size)
+        else:
+            d = fit_path_d(px) if fit_curves and len(px) > 3 else encode_polyline(px)
+        parts.append(f"<path d='{d}' stroke='{colors[label]}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
+    parts.append('</svg>')
+    return GlyphSvg(''.join(parts), bounds) if with_bounds else ''.join(parts)
+
+
+def _glyph_geoms(med: List[List[tuple]], geoms: List[Any] | None) -> List[Any]:
+    return geoms if geoms is not None else seg.glyph_geometry(med)
+
+
+def _short_mask_for(geoms: List[Any], style: Dict[str, Any]) -> List[bool]:
+    """基于 Raw 中轴总长的"短边全紫"判断，供 C/D1 短笔画强制单折点。"""
+    iso_on = False
+    iso_min = 0.0
+    try:
+        so = style.get('centerline', {}).get('start_orientation', {})
+        iso_on = bool(so.get('isolate_on', False) or style.get('preview', {}).get('isolate_on', False))
+        iso_min = float(so.get('isolate_min_len', style.get('preview', {}).get('isolate_min_len', 0.0)))
+    except Exception:
+        pass
+    if iso_on and iso_min > 0.0:
+        return seg.short_mask(geoms, iso_min)
+    return [False] * len(geoms)
 
 
 def _render_centerline_svg_windowed(
@@ -110,83 +203,19 @@ def _render_centerline_svg_windowed(
     end_region_frac: float = 0.30,
     isolate_enabled: bool = False,
     isolate_min_len: float = 0.0,
+    geoms: List[Any] | None = None,
 ) -> str:
-    """Render tri-color by windows based on total point count (not arc-length):
-    start window | middle | end window. Visualizes 'judgment ranges'.
+    """Render tri-color by arc-length windows: start window | middle | end window.
+    Visualizes 'judgment ranges'. Short strokes (isolate) are purple as a whole.
     """
-    W = H = size
-    sx = sy = (W - 2 * pad)
-    def map_pt(x: float, y: float):
-        return pad + x * sx, pad + (1.0 - y) * sy
-    start_color = '#1e90ff'
-    middle_color = '#282828'
-    peak_color = '#dc322f'
-    isolate_color = '#800080'
-    parts = [
-        f"<svg xmlns='http://www.w3.org/2000/svg' width='{W}' height='{H}' viewBox='0 0 {W} {H}'>",
-        f"<rect x='0' y='0' width='{W}' height='{H}' fill='white'/>",
-    ]
     sr = max(0.0, min(0.9, float(start_region_frac)))
     er = max(0.0, min(0.9, float(end_region_frac)))
-    for st in med:
-        if not st or len(st) < 2:
-            continue
-        # arc-length based window with sub-segment split for precise比例
-        import math
-        N = len(st)
-        nseg = N - 1
-        L = [math.hypot(st[i+1][0]-st[i][0], st[i+1][1]-st[i][1]) for i in range(nseg)]
-        total = sum(L)
-        if total <= 1e-12:
-            continue
-        # Isolation: short stroke colored purple as a whole
-        if isolate_enabled and total < max(0.0, float(isolate_min_len)):
-            for i in range(nseg):
-                x0,y0 = map_pt(st[i][0], st[i][1]); x1,y1 = map_pt(st[i+1][0], st[i+1][1])
-                parts.append(f"<path d='M{x0:.2f},{y0:.2f} L{x1:.2f},{y1:.2f}' stroke='{isolate_color}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
-            continue
-        S = [0.0]
-        for d in L:
-            S.append(S[-1] + d)
-        start_len = max(0.0, min(total, sr * total))
-        tip_len = max(0.0, min(total, (1.0 - er) * total))
-        if tip_len <= start_len:
-            tip_len = min(total, start_len + 0.05 * total)
-        from bisect import bisect_right
-        js = max(0, min(nseg - 1, bisect_right(S, start_len) - 1))
-        jt = max(0, min(nseg - 1, bisect_right(S, tip_len) - 1))
-        rs = 0.0 if L[js] <= 1e-12 else (start_len - S[js]) / L[js]
-        rt = 0.0 if L[jt] <= 1e-12 else (tip_len - S[jt]) / L[jt]
-        def lerp(p, q, t):
-            return (p[0] + (q[0]-p[0]) * t, p[1] + (q[1]-p[1]) * t)
-        Pstart = lerp(st[js], st[js+1], rs) if start_len > 0 else st[0]
-        Ptip = lerp(st[jt], st[jt+1], rt) if tip_len < total else st[-1]
-        # draw helper
-        def draw_seg(p0, p1, col):
-            x0,y0 = map_pt(p0[0], p0[1]); x1,y1 = map_pt(p1[0], p1[1])
-            # 画成连续线段，而不是点列
-            parts.append(f"<path d='M{x0:.2f},{y0:.2f} L{x1:.2f},{y1:.2f}' stroke='{col}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
-        # Start part
-        for i in range(js):
-            draw_seg(st[i], st[i+1], start_color)
-        if start_len > 0:
-            draw_seg(st[js], Pstart, start_color)
-        # Middle part
-        if js == jt:
-            draw_seg(Pstart, Ptip, middle_color)
-        else:
-            draw_seg(Pstart, st[js+1], middle_color)
-            for i in range(js+1, jt):
-                draw_seg(st[i], st[i+1], middle_color)
-            draw_seg(st[jt], Ptip, middle_color)
-        # Tip part
-        if tip_len < total:
-            if jt < nseg:
-                draw_seg(Ptip, st[jt+1], peak_color)
-            for i in range(jt+1, nseg):
-                draw_seg(st[i], st[i+1], peak_color)
-    parts.append('</svg>')
-    return ''.join(parts)
+    iso = float(isolate_min_len) if isolate_enabled else None
+    runs: List[Tuple[int, Any]] = []
+    for g in _glyph_geoms(med, geoms):
+        if g is not None:
+            runs.extend(seg.window_runs(g, sr, er, iso))
+    return _emit_runs_svg(runs, _WINDOW_COLORS, size=size, pad=pad)
 
 
 def _render_centerline_svg_segmented(
@@ -195,15 +224,9 @@ def _render_centerline_svg_segmented(
     size: int = DEFAULT_SIZE,
     pad: int = DEFAULT_PAD,
     style_json: Dict[str, Any] | None = None,
+    geoms: List[Any] | None = None,
 ) -> str:
-    W = H = size
-    sx = sy = (W - 2 * pad)
-    def map_pt(x: float, y: float):
-        return pad + x * sx, pad + (1.0 - y) * sy
     # colors: 起笔(blue) | 中间(gray) | 笔锋(red)
-    start_color = '#1e90ff'
-    middle_color = '#282828'
-    peak_color = '#dc322f'
     corner_thresh = 35.0
     frac_fallback = 0.15
     try:
@@ -213,45 +236,11 @@ def _render_centerline_svg_segmented(
     except Exception:
         pass
     frac_fallback = max(0.05, min(0.35, frac_fallback))
-    parts = [
-        f"<svg xmlns='http://www.w3.org/2000/svg' width='{W}' height='{H}' viewBox='0 0 {W} {H}'>",
-        f"<rect x='0' y='0' width='{W}' height='{H}' fill='white'/>",
-    ]
-    import math
-    for st in med:
-        if not st or len(st) < 2:
-            continue
-        # find corners
-        def turn(a,b,c):
-            v1=(b[0]-a[0], b[1]-a[1]); v2=(c[0]-b[0], c[1]-b[1])
-            n1=(v1[0]**2+v1[1]**2)**0.5; n2=(v2[0]**2+v2[1]**2)**0.5
-            if n1<1e-9 or n2<1e-9: return 0.0
-            cosv=(v1[0]*v2[0]+v1[1]*v2[1])/(n1*n2)
-            cosv=max(-1.0,min(1.0,cosv))
-            return abs(math.degrees(math.acos(cosv)))
-        corners=[i for i in range(1,len(st)-1) if turn(st[i-1],st[i],st[i+1])>=corner_thresh]
-        first_corner = corners[0] if corners else None
-        last_corner = corners[-1] if corners else None
-        N = max(2, len(st))
-        if (first_corner is None) or (last_corner is None) or (first_corner >= last_corner):
-            fc = int(round(frac_fallback * (N - 1)))
-            lc = int(round((1.0 - frac_fallback) * (N - 1)))
-            fc = max(0, min(N - 2, fc))
-            lc = max(fc + 1, min(N - 2, lc))
-            first_corner, last_corner = fc, lc
-        # draw segments
-        for i in range(N - 1):
-            x0,y0 = map_pt(st[i][0], st[i][1])
-            x1,y1 = map_pt(st[i+1][0], st[i+1][1])
-            if i <= first_corner:
-                col = start_color
-            elif i >= last_corner:
-                col = peak_color
-            else:
-                col = middle_color
-            parts.append(f"<path d='M{x0:.2f},{y0:.2f} L{x1:.2f},{y1:.2f}' stroke='{col}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
-    parts.append('</svg>')
-    return ''.join(parts)
+    runs: List[Tuple[int, Any]] = []
+    for g in _glyph_geoms(med, geoms):
+        if g is not None:
+            runs.extend(seg.segmented_runs(g, corner_thresh, frac_fallback))
+    return _emit_runs_svg(runs, _WINDOW_COLORS, size=size, pad=pad)
 
 
 def _render_processed_centerline_svg_mixed(
@@ -268,34 +257,50 @@ def _render_processed_centerline_svg_mixed(
     short_second_color: str = '#32cd32', # 绿色
     start_color: str = '#1e90ff',        # 起笔-蓝
     middle_color: str = '#808080',       # 中-灰
-    peak_color: str = '#dc322f'          # 笔锋-红
-) -> str:
-    W = H = size
-    sx = sy = (W - 2 * pad)
-    def map_pt(x: float, y: float):
-        return pad + x * sx, pad + (1.0 - y) * sy
-    parts = [
-        f"<svg xmlns='http://www.w3.org/2000/svg' width='{W}' height='{H}' viewBox='0 0 {W} {H}'>",
-        f"<rect x='0' y='0' width='{W}' height='{H}' fill='white'/>",
-    ]
-    debug_info: List[Dict[str, Any]] = []
-    import math
-    # 阈值配置（用于非短笔画的常规三段）——修复：使用更合理的角度范围
-    corner_min = 35.0  # 修改：从90.0改为35.0，与centerline.py保持一致
+    peak_color: str = '#dc322f',         # 笔锋-红
+    geoms: List[Any] | None = None,
+    pixel_size: float = 1.0,
+    deform=None,
+) -> tuple:
+    runs, colors, debug_info = _processed_runs(
+        med, style_json=style_json, short_mask=short_mask, start_region_frac=start_region_frac,
+        end_region_frac=end_region_frac, fixed_info=fixed_info, short_first_color=short_first_color,
+        short_second_color=short_second_color, start_color=start_color, middle_color=middle_color,
+        peak_color=peak_color, geoms=geoms)
+    return _emit_runs_svg(runs, colors, size=size, pad=pad, fit_curves=True, pixel_size=pixel_size,
+                          deform=deform), debug_info
+
+
+def _processed_runs(
+    med: List[List[tuple]],
+    *,
+    style_json: Dict[str, Any] | None = None,
+    short_mask: List[bool] | None = None,
+    start_region_frac: float | None = None,
+    end_region_frac: float | None = None,
+    fixed_info: List[Dict[str, Any]] | None = None,
+    short_first_color: str = '#ff8c00',  # 橙色
+    short_second_color: str = '#32cd32', # 绿色
+    start_color: str = '#1e90ff',        # 起笔-蓝
+    middle_color: str = '#808080',       # 中-灰
+    peak_color: str = '#dc322f',         # 笔锋-红
+    geoms: List[Any] | None = None,
+) -> tuple:
+    """处理后中轴的着色分段：返回 (runs, colors, debug_info)，供一次或多次（原样/变形）输出。"""
+    # 阈值配置（用于非短笔画的常规三段）——与centerline.py保持一致的折点阈值
+    corner_min = 35.0
     corner_max = 179.0
     sr = 0.30 if start_region_frac is None else float(start_region_frac)
     er = 0.30 if end_region_frac is None else float(end_region_frac)
     try:
         so = (style_json or {}).get('centerline', {}).get('start_orientation', {})
-        # 优先使用UI设置的夹角范围
+        # 优先使用UI设置的夹角范围，否则使用默认的折点检测阈值
         if 'corner_thresh_min_deg' in so and 'corner_thresh_max_deg' in so:
             corner_min = float(so.get('corner_thresh_min_deg'))
             corner_max = float(so.get('corner_thresh_max_deg'))
-        # 否则使用默认的折点检测阈值（与centerline.py保持一致）
         else:
             corner_min = float(so.get('corner_thresh_deg', 35.0))
             corner_max = 179.0  # 钝角上限
-        
         if start_region_frac is None:
             sr = float(so.get('start_region_frac', sr))
         if end_region_frac is None:
@@ -306,132 +311,23 @@ def _render_processed_centerline_svg_mixed(
     corner_max = max(corner_min, min(corner_max, 179.0))
     sr = max(0.0, min(0.9, sr))
     er = max(0.0, min(0.9, er))
+    colors = {seg.START: start_color, seg.MIDDLE: middle_color, seg.PEAK: peak_color,
+              seg.SHORT_FIRST: short_first_color, seg.SHORT_SECOND: short_second_color}
 
-    def turn_angle(a, b, c) -> float:
-        v1 = (b[0]-a[0], b[1]-a[1])
-        v2 = (c[0]-b[0], c[1]-b[1])
-        n1 = (v1[0]*v1[0] + v1[1]*v1[1]) ** 0.5
-        n2 = (v2[0]*v2[0] + v2[1]*v2[1]) ** 0.5
-        if n1 < 1e-9 or n2 < 1e-9:
-            return 0.0
-        cosv = (v1[0]*v2[0] + v1[1]*v2[1]) / (n1 * n2)
-        cosv = max(-1.0, min(1.0, cosv))
-        inner = abs(math.degrees(math.acos(cosv)))  # 内角 [0,180]
-        ext = 180.0 - inner                         # 外角 [0,180]
-        if ext < 0.0: ext = 0.0
-        if ext > 180.0: ext = 180.0
-        return ext
-
-    def draw_seg(p0, p1, col):
-        x0, y0 = map_pt(p0[0], p0[1]); x1, y1 = map_pt(p1[0], p1[1])
-        parts.append(f"<path d='M{x0:.2f},{y0:.2f} L{x1:.2f},{y1:.2f}' stroke='{col}' stroke-width='2' fill='none' stroke-linecap='round' stroke-linejoin='round'/>")
-
-    for idx, st in enumerate(med):
-        if not st or len(st) < 2:
+    runs: List[Tuple[int, Any]] = []
+    debug_info: List[Dict[str, Any]] = []
+    for idx, g in enumerate(_glyph_geoms(med, geoms)):
+        if g is None:
             continue
-        N = len(st)
-        # 短笔画：强制单折点，两段着色（橙/绿）
         is_short = bool(short_mask[idx]) if (short_mask is not None and idx < len(short_mask)) else False
-        if is_short:
-            if N == 2:
-                draw_seg(st[0], st[1], short_first_color)
-                debug_info.append({'stroke': idx, 'is_short': True, 'short_split_idx': 0, 'short_angle': None, 'first_idx': None, 'last_idx': None, 'first_angle': None, 'last_angle': None})
-                continue
-            # 选择全局最大折角作为"唯一折点"，若无有效折点，则取中点
-            best_i = 1
-            best_ang = -1.0
-            for i in range(1, N-1):
-                ang = turn_angle(st[i-1], st[i], st[i+1])
-                if ang > best_ang:
-                    best_ang = ang; best_i = i
-            split_i = best_i if best_ang > 0.5 else max(1, (N-1)//2)
-            # 左段：0..split_i 橙色；右段：split_i..end 绿色
-            for i in range(0, split_i):
-                draw_seg(st[i], st[i+1], short_first_color)
-            for i in range(split_i, N-1):
-                draw_seg(st[i], st[i+1], short_second_color)
-            debug_info.append({'stroke': idx, 'is_short': True, 'short_split_idx': split_i, 'short_angle': round(float(best_ang), 1) if best_ang >= 0 else None, 'first_idx': None, 'last_idx': None, 'first_angle': None, 'last_angle': None})
-            continue
-
-        # 普通笔画：按三段着色；折点搜索受 Raw 三色窗口约束
-        # 计算弧长累积（点级别）
-        import math
-        L = [math.hypot(st[i+1][0]-st[i][0], st[i+1][1]-st[i][1]) for i in range(N-1)]
-        total = sum(L)
-        if total <= 1e-12:
-            continue
-        SP = [0.0]
-        for d in L:
-            SP.append(SP[-1] + d)
-        start_len = max(0.0, min(total, sr * total))
-        tip_len = max(0.0, min(total, (1.0 - er) * total))
-        if tip_len <= start_len:
-            tip_len = min(total, start_len + 0.05 * total)
-        # 在前窗口内寻找首折点；在后窗口内寻找末折点
-        # 修改规则：首端取"第一个满足条件"的点，末端取"最后一个满足条件"的点；不做全局回退
-        angles = [0.0]*N
-        for i in range(1, N-1):
-            angles[i] = turn_angle(st[i-1], st[i], st[i+1])
-        # 若提供固定分段信息（来自原图），优先使用
-        use_fixed = bool(fixed_info is not None and idx < len(fixed_info))
-        if use_fixed:
-            fi = fixed_info[idx] or {}
-            first_corner = fi.get('first_idx', None)
-            last_corner = fi.get('last_idx', None)
-        else:
-            first_corner = None
-            for i in range(1, N-1):
-                if SP[i] > start_len:
-                    break
-                if corner_min <= angles[i] <= corner_max:
-                    first_corner = i
-                    break
-            last_corner = None
-            for i in range(N-2, 0, -1):
-                if SP[i] < tip_len:
-                    break
-                if corner_min <= angles[i] <= corner_max:
-                    last_corner = i
-                    break
-        # 改进退化规则：
-        # - 两端都缺失 → 全灰
-        # - 仅缺首折点 → 仅红端着色，其余灰
-        # - 仅缺末折点 → 仅蓝端着色，其余灰
-        # - 两端都有且 first<last → 蓝|灰|红
-        has_first = (first_corner is not None)
-        has_last = (last_corner is not None)
-        # 新退化：窗口内各自独立判定，缺一段则该端不着色（灰）
-        if has_first and has_last and first_corner is not None and last_corner is not None and first_corner < last_corner:
-            for i in range(N - 1):
-                if i < first_corner:
-                    col = start_color
-                elif i >= last_corner:
-                    col = peak_color
-                else:
-                    col = middle_color
-                draw_seg(st[i], st[i+1], col)
-            debug_info.append({'stroke': idx, 'is_short': False, 'first_idx': int(first_corner), 'last_idx': int(last_corner), 'first_angle': round(float(angles[first_corner]),1), 'last_angle': round(float(angles[last_corner]),1)})
-            continue
-        # 单端存在：只着色该端，其余灰
-        if has_first and (not has_last):
-            for i in range(N - 1):
-                col = start_color if i < first_corner else middle_color
-                draw_seg(st[i], st[i+1], col)
-            debug_info.append({'stroke': idx, 'is_short': False, 'first_idx': int(first_corner), 'last_idx': None, 'first_angle': round(float(angles[first_corner]),1), 'last_angle': None})
-            continue
-        if has_last and (not has_first):
-            for i in range(N - 1):
-                col = peak_color if i >= last_corner else middle_color
-                draw_seg(st[i], st[i+1], col)
-            debug_info.append({'stroke': idx, 'is_short': False, 'first_idx': None, 'last_idx': int(last_corner), 'first_angle': None, 'last_angle': round(float(angles[last_corner]),1)})
-            continue
-        # 两端都缺失：全灰
-        for i in range(N - 1):
-            draw_seg(st[i], st[i+1], middle_color)
-        debug_info.append({'stroke': idx, 'is_short': False, 'first_idx': None, 'last_idx': None, 'first_angle': None, 'last_angle': None})
-        continue
-    parts.append('</svg>')
-    return ''.join(parts), debug_info
+        # 若提供固定分段信息（来自D0基线），优先使用
+        fixed = (fixed_info[idx] or {}) if (fixed_info is not None and idx < len(fixed_info)) else None
+        stroke_runs, dbg = seg.mixed_runs(g, is_short=is_short, sr=sr, er=er,
+                                          corner_min=corner_min, corner_max=corner_max, fixed=fixed)
+        runs.extend(stroke_runs)
+        if dbg is not None:
+            debug_info.append({'stroke': idx, **dbg})
+    return runs, colors, debug_info
 
 
 def _load_style_with_fallback(path: str, label: str) -> Dict[str, Any]:
@@ -466,6 +362,110 @@ def _merge_styles(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, A
     return _merge_dict(base, override)
 
 
+def _resolve_style(style_override_path: str | None) -> Dict[str, Any]:
+    """基础风格 + 覆盖文件（若存在）。"""
+    style: Dict[str, Any] = _load_base_style()
+    if style_override_path and os.path.exists(style_override_path):
+        ov = _load_style_with_fallback(style_override_path, '覆盖')
+        style = _merge_styles(style, ov)
+    return style
+
+
+def _baseline_style(style: Dict[str, Any]) -> Dict[str, Any]:
+    """D0 基线风格：禁用起笔/中间/笔锋细化与所有用户变换，仅用于获取分段信息。"""
+    # 使用浅拷贝代替深拷贝以提高性能
+    style_base = dict(style)
+    if 'centerline' in style_base:
+        style_base['centerline'] = dict(style_base['centerline'])
+        if 'start_orientation' in style_base['centerline']:
+            style_base['centerline']['start_orientation'] = dict(style_base['centerline']['start_orientation'])
+    if 'preview' in style_base:
+        style_base['preview'] = dict(style_base['preview'])
+    try:
+        cl = style_base.setdefault('centerline', {})
+        cl['start_trim'] = 0.0
+        cl['end_trim'] = 0.0
+        cl['protect_end_k'] = 0
+        cl['chaikin_iters'] = 0
+        cl['resample_points'] = 0
+        cl['smooth_window'] = 1
+        cl.setdefault('stroke_tilt', {})['range_deg'] = 0.0
+        cl.setdefault('post_scale', {})['range'] = 0.0
+        cl.setdefault('stroke_move', {})['offset'] = 0.0  # 禁用笔画移动
+        so0 = cl.setdefault('start_orientation', {})
+        so0['angle_range_deg'] = 0.0
+        # 清理笔锋相关参数，确保D0不受笔锋界面影响
+        so0['end_angle_range_deg'] = 0.0
+        so0['end_frac_len'] = 1.0
+        # 移除所有角度范围相关的UI参数，使用固定默认值
+        so0.pop('corner_thresh_min_deg', None)
+        so0.pop('corner_thresh_max_deg', None)
+        so0['corner_thresh_deg'] = 35.0
+        so0.pop('frac_len', None)
+        so0.pop('isolate_on', None)
+        so0.pop('isolate_min_len', None)
+        so0.pop('start_region_frac', None)  # 原始中轴三色窗口参数
+        so0.pop('end_region_frac', None)
+        so0.pop('fix_segments', None)       # 分段边界冻结参数
+        if 'preview' in style_base:
+            preview = style_base['preview']
+            preview.pop('fix_segments', None)
+            preview.pop('corner_range_on', None)
+            preview.pop('corner_min', None)
+            preview.pop('corner_max', None)
+    except Exception:
+        pass
+    return style_base
+
+
+def _corner_range_enabled(style: Dict[str, Any]) -> bool:
+    """启用"夹角范围"时不使用D0的固定分段，让UI角度范围生效。"""
+    so_cfg = style.get('centerline', {}).get('start_orientation', {}) if isinstance(style, dict) else {}
+    preview_cfg = style.get('preview', {}) if isinstance(style, dict) else {}
+    if 'corner_thresh_min_deg' in so_cfg and 'corner_thresh_max_deg' in so_cfg:
+        return True
+    return bool(preview_cfg.get('corner_range_on', False))
+
+
+def _render_processed_with_baseline(
+    med: List[List[tuple]],
+    med_proc_t: List[List[tuple]],
+    style: Dict[str, Any],
+    seed: int,
+    rep_style: Dict[str, Any],
+    short_mask: List[bool],
+    pixel_size: float = 1.0,
+    deform=None,
+) -> tuple:
+    """C/D1 共用：先生成 D0 基线取分段信息，再对处理后中轴着色。
+    返回 (svg_text0, proc, debug_info_proc, deformed)，proc/deformed 为 GlyphSvg；
+    pixel_size 只作用于处理后输出（D0 仅取分段信息）。
+    给定 deform 时，同一组着色分段再按变形后的几何输出一次（deformed，未裁剪），否则为 None。"""
+    med0 = CenterlineProcessor(_baseline_style(style), seed=seed).process(med)
+    pts_proc0 = transform_medians(med0, rep_style)
+    svg_text0, dbg0 = _render_processed_centerline_svg_mixed(
+        pts_proc0, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
+        style_json=None, short_mask=short_mask,
+        start_region_frac=None,
+        end_region_frac=None
+    )
+    so = style.get('centerline', {}).get('start_orientation', {})
+    runs, colors, debug_info = _processed_runs(
+        med_proc_t,
+        style_json=style, short_mask=short_mask,
+        start_region_frac=so.get('start_region_frac'),
+        end_region_frac=so.get('end_region_frac'),
+        fixed_info=None if _corner_range_enabled(style) else dbg0,
+    )
+    proc = _emit_runs_svg(runs, colors, size=DEFAULT_SIZE, pad=DEFAULT_PAD, fit_curves=True,
+                          pixel_size=pixel_size, with_bounds=True)
+    deformed = None
+    if deform is not None:
+        deformed = _emit_runs_svg(runs, colors, size=DEFAULT_SIZE, pad=DEFAULT_PAD, fit_curves=True,
+                                  pixel_size=pixel_size, deform=deform, with_bounds=True)
+    return svg_text0, proc, debug_info, deformed
+
+
 def build_processed_centerline_svg(
     ch: str,
     size: int = DEFAULT_SIZE,
@@ -499,6 +499,33 @@ def build_processed_centerline_svg(
         return _render_centerline_svg(med1, size=size, pad=DEFAULT_PAD, color='#d33')
 
 
+def render_char_image(
+    ch: str,
+    style_override_path: str | None = None,
+    *,
+    size: int = DEFAULT_SIZE,
+    scale: float = 1.0,
+    render_mode: str = 'centerline',
+):
+    """单字 RGBA 图像（透明底黑字），由 D1 中轴几何直接栅格化，不生成 SVG。
+    size 为逻辑画布（与 SVG 预览一致），输出像素 = size*scale；字符不存在时返回 None。
+    默认与 C/D1 预览相同的 2px 中轴线；median_fill / outline 需显式指定。"""
+    from src.raster import rasterize_char
+    meta = load_merged_cache().get(ch)
+    if not meta:
+        return None
+    style = _resolve_style(style_override_path)
+    med = normalize_medians_1024(meta.get('medians', []))
+    seed = _stable_seed_for_char(ch, style)
+    rng = build_rng(seed)
+    labels = classify_glyph(med)
+    sampled = [sample_hierarchical_style(style.get('global', {}), style.get('stroke_types', {}), lb, rng, rng, rng, style.get('coherence', {})) for lb in labels]
+    rep_style = (sampled[0] if sampled else style.get('global', {}))
+    med_d1_t = transform_medians(CenterlineProcessor(style, seed=seed).process(med), rep_style)
+    return rasterize_char(med_d1_t, sampled, render_mode=render_mode, size_px=size, padding=DEFAULT_PAD,
+                          scale=scale, outlines=meta.get('strokes'), rep_style=rep_style)
+
+
 def cleanup_single_type_svg_files(image_type: str, max_files_per_dir: int = 20):
     """清理特定类型的SVG文件，保持该目录最多max_files_per_dir个文件"""
     import glob
@@ -597,8 +624,17 @@ def generate_abcd(
     style_override_path: str | None = None,
     grid_state: Dict[str, Any] | None = None,
     use_grid_deformation: bool = False,
+    target_px: int | None = None,
+    geometry_deformation: bool = False,
+    deform_d2: bool = False,
 ) -> Dict[str, str]:
     # 注意：文件清理已移至API层面，避免重复清理
+    # target_px: 目标输出字号（像素）。给定时 C/D1/D2 按该尺寸做 LOD 抽稀，
+    # 结果只含 'svg'（三者的 SVG 文本，供文章排版直接取用）与 'bounds'：
+    # 不生成 A/B，也不写 output/compare，免得抽稀版本成为对比页与 generate_single_type 读到的最新文件
+    # geometry_deformation: grid_state 直接作用于处理后中轴（D1）的像素数组，
+    # 变形后只序列化一次，不再对成品 SVG 做 解析->采样->变形->重写
+    # deform_d2: 笔画多边形（D2）也按 grid_state 做几何级变形并裁剪；默认关闭，D2 与以往一样不变形
     
     # 调试日志：检查传入的网格变形参数
     print(f"[GENERATE_ABCD] ===== 字符 '{ch}' 生成参数 =====")
@@ -613,16 +649,15 @@ def generate_abcd(
     meta = merged.get(ch)
     if not meta:
         raise RuntimeError('char not found in merged data')
-    style: Dict[str, Any] = _load_base_style()
-
-    if style_override_path and os.path.exists(style_override_path):
-        ov = _load_style_with_fallback(style_override_path, '覆盖')
-        style = _merge_styles(style, ov)
+    style = _resolve_style(style_override_path)
     med = normalize_medians_1024(meta.get('medians', []))
     seed = _stable_seed_for_char(ch, style)
     rng = build_rng(seed)
     labels = classify_glyph(med)
     sampled = [sample_hierarchical_style(style.get('global', {}), style.get('stroke_types', {}), lb, rng, rng, rng, style.get('coherence', {})) for lb in labels]
+    pixel_size = lod.lod_pixel_size(target_px, DEFAULT_SIZE) if target_px else 1.0
+    geo_deform = geometry_deformer(grid_state) if (grid_state and geometry_deformation) else None
+    d2_deform = geometry_deformer(grid_state) if (grid_state and deform_d2) else None
     
     # 先用原始参数生成D1（用户风格化版本）
     proc_d1 = CenterlineProcessor(style, seed=seed)
@@ -650,16 +685,26 @@ def generate_abcd(
     # outD1_base = os.path.join(OUTPUT_COMPARE, 'D1_grid_transform', name_D1_base)  # 基础D1 - 不再需要保存
     outD1 = os.path.join(OUTPUT_COMPARE, 'D1_grid_transform', name_D1)           # 最终D1
     outD2 = os.path.join(OUTPUT_COMPARE, 'D2_median_fill', name_D2)            # D2窗口: 中轴填充
-    for p in (os.path.dirname(outA), os.path.dirname(outB), os.path.dirname(outC), os.path.dirname(outD1), os.path.dirname(outD2)):
-        os.makedirs(p, exist_ok=True)
+    write_files = not target_px
+    if write_files:
+        for p in (os.path.dirname(outA), os.path.dirname(outB), os.path.dirname(outC), os.path.dirname(outD1), os.path.dirname(outD2)):
+            os.makedirs(p, exist_ok=True)
+
+    def write(path: str, text: str) -> None:
+        if write_files:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
 
     rep_style = (sampled[0] if sampled else style.get('global', {}))
+    # 同一 rep_style 下原始/D1 中轴只做一次批量仿射，A/B/C/D1/D2 共用
+    med_t, med_d1_t = transform_medians_batch([med, med_d1], rep_style)
     # A窗口: 轮廓 (outlines)
-    try:
-        pts = transform_medians(med, rep_style)
-        renderer.render_char(pts, sampled, outA, outlines=outlines, rep_style=(sampled[0] if sampled else style.get('global', {})), render_mode='auto')
-    except Exception:
-        with open(outA, 'w', encoding='utf-8') as f: f.write(quick_raw_svg(ch))
+    if write_files:
+        try:
+            pts = med_t
+            renderer.render_char(pts, sampled, outA, outlines=outlines, rep_style=(sampled[0] if sampled else style.get('global', {})), render_mode='auto')
+        except Exception:
+            write(outA, quick_raw_svg(ch))
 
     # B窗口: 原始中轴 (raw centerline with tri-color windows)
     try:
@@ -681,122 +726,75 @@ def generate_abcd(
                                style.get('preview', {}).get('isolate_min_len', 0.0)))
     except Exception:
         iso_min = 0.0
-    with open(outB, 'w', encoding='utf-8') as f: f.write(_render_centerline_svg_windowed(transform_medians(med, rep_style), size=DEFAULT_SIZE, pad=DEFAULT_PAD, start_region_frac=sr, end_region_frac=er, isolate_enabled=iso_on, isolate_min_len=iso_min))
+    # 原始中轴的线段长度/转角只算一次：B 窗口与 C/D1 的短笔画遮罩共用
+    raw_geoms = seg.glyph_geometry(med_t)
+    if write_files:
+        write(outB, _render_centerline_svg_windowed(med_t, size=DEFAULT_SIZE, pad=DEFAULT_PAD, start_region_frac=sr, end_region_frac=er, isolate_enabled=iso_on, isolate_min_len=iso_min, geoms=raw_geoms))
+
+    # D2窗口: 中轴填充 (median fill)
+    # bounds: 各输出由几何数组直接得到的内容包围盒（随 'svg' 返回，排版/裁剪无需再解析 SVG）
+    d2_svg = None
+    bounds: Dict[str, Any] = {'C': None, 'D1': None, 'D2': None}
+    try:
+        pts = med_t
+        d2_svg = renderer.render_char(pts, sampled, None, render_mode='median_fill', pixel_size=pixel_size,
+                                      deform=d2_deform).decode('utf-8')
+        bounds['D2'] = renderer.last_bounds
+        if d2_deform is not None:
+            d2_svg = apply_cropping_logic(d2_svg, bounds=bounds['D2'])
+        write(outD2, d2_svg)
+    except Exception:
+        write(outD2, '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
+
+    # C窗口 + D1基础版本: 处理中轴（D1中轴线），基于D0基线分段信息着色。
+    # 两者输入完全相同，D0 与着色只做一次；D1 在此基础上做网格变形。
+    # 基于 Raw 的"短边全紫"判断，为 D 列短笔画强制单折点（橙/绿）
+    svg_proc = d1_geo = None
+    try:
+        short_mask = _short_mask_for(raw_geoms, style)
+        svg_text0, proc, processed_debug, d1_geo = _render_processed_with_baseline(
+            med, med_d1_t, style, seed, rep_style, short_mask, pixel_size=pixel_size, deform=geo_deform)
+        svg_proc = proc.svg
+        bounds['C'] = bounds['D1'] = proc.bounds
+        if write_files:
+            name0 = f"{ts}_{ch}_C_orig.svg"  # Fichier de base pour C (temporaire)
+            temp_dir = os.path.join(OUTPUT_COMPARE, '.temp')
+            os.makedirs(temp_dir, exist_ok=True)
+            outD0 = os.path.join(temp_dir, name0)
+            write(outD0, svg_text0)
+        write(outC, svg_proc)
+    except Exception:
+        # 回退到简单单色线（极端情况下）
+        write(outC, build_processed_centerline_svg(ch, size=DEFAULT_SIZE, geom_style=rep_style, style_full=style, seed=seed))
+        processed_debug = []
 
     # D1窗口: 网格变形 (基础版本 + 变形版本)
     print(f"[DEBUG ENTRY] D1 generation - use_grid_deformation: {use_grid_deformation}")
     print(f"[DEBUG ENTRY] D1 generation - grid_state type: {type(grid_state)}")
     print(f"[DEBUG ENTRY] D1 generation - grid_state: {grid_state}")
+    d1_final_svg = None
     try:
-        pts_d1 = transform_medians(med_d1, rep_style)
-        
-        # 使用与generate_single_type相同的着色逻辑：基于D0基线分段信息
-        # 短笔画遮罩处理
-        iso_on_d1 = False
-        iso_min_d1 = 0.0
-        try:
-            so = style.get('centerline', {}).get('start_orientation', {})
-            iso_on_d1 = bool(so.get('isolate_on', False) or style.get('preview', {}).get('isolate_on', False))
-            iso_min_d1 = float(so.get('isolate_min_len', style.get('preview', {}).get('isolate_min_len', 0.0)))
-        except Exception:
-            pass
-        
-        short_mask_d1 = []
-        if iso_on_d1 and iso_min_d1 > 0.0:
-            med_raw_t_d1 = transform_medians(med, rep_style)
-            import math
-            for st in med_raw_t_d1:
-                if not st or len(st) < 2:
-                    short_mask_d1.append(False)
-                    continue
-                total = 0.0
-                for i in range(len(st) - 1):
-                    dx = st[i+1][0] - st[i][0]
-                    dy = st[i+1][1] - st[i][1]
-                    total += math.hypot(dx, dy)
-                short_mask_d1.append(total < iso_min_d1)
-        else:
-            short_mask_d1 = [False] * len(pts_d1)
-
-        # 构建D0基线风格用于获取分段信息
-        style_base_d1 = dict(style)
-        if 'centerline' in style_base_d1:
-            style_base_d1['centerline'] = dict(style_base_d1['centerline'])
-            if 'start_orientation' in style_base_d1['centerline']:
-                style_base_d1['centerline']['start_orientation'] = dict(style_base_d1['centerline']['start_orientation'])
-        if 'preview' in style_base_d1:
-            style_base_d1['preview'] = dict(style_base_d1['preview'])
-        
-        try:
-            cl_d1 = style_base_d1.setdefault('centerline', {})
-            cl_d1['start_trim'] = 0.0
-            cl_d1['end_trim'] = 0.0
-            cl_d1['protect_end_k'] = 0
-            cl_d1['chaikin_iters'] = 0
-            cl_d1['resample_points'] = 0
-            cl_d1['smooth_window'] = 1
-            cl_d1.setdefault('stroke_tilt', {})['range_deg'] = 0.0
-            cl_d1.setdefault('post_scale', {})['range'] = 0.0
-            cl_d1.setdefault('stroke_move', {})['offset'] = 0.0
-            so0_d1 = cl_d1.setdefault('start_orientation', {})
-            so0_d1['angle_range_deg'] = 0.0
-            so0_d1['end_angle_range_deg'] = 0.0
-            so0_d1['end_frac_len'] = 1.0
-            so0_d1.pop('corner_thresh_min_deg', None)
-            so0_d1.pop('corner_thresh_max_deg', None)
-            so0_d1['corner_thresh_deg'] = 35.0
-            so0_d1.pop('frac_len', None)
-            so0_d1.pop('isolate_on', None)
-            so0_d1.pop('isolate_min_len', None)
-            so0_d1.pop('start_region_frac', None)
-            so0_d1.pop('end_region_frac', None)
-            so0_d1.pop('fix_segments', None)
-            if 'preview' in style_base_d1:
-                preview_d1 = style_base_d1['preview']
-                preview_d1.pop('fix_segments', None)
-        except Exception:
-            pass
-
-        # 生成D0基线版本获取分段信息
-        proc_base_d1 = CenterlineProcessor(style_base_d1, seed=seed)
-        med_base_d1 = proc_base_d1.process(med)
-        pts_proc0_d1 = transform_medians(med_base_d1, rep_style)
-        svg_text0_d1, dbg0_d1 = _render_processed_centerline_svg_mixed(
-            pts_proc0_d1, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-            style_json=None, short_mask=short_mask_d1,
-            start_region_frac=None,
-            end_region_frac=None
-        )
-
-        # 使用D0的分段信息对D1着色，确保与"全部"一致
-        so_cfg_d1 = style.get('centerline', {}).get('start_orientation', {}) if isinstance(style, dict) else {}
-        preview_cfg_d1 = style.get('preview', {}) if isinstance(style, dict) else {}
-        corner_range_enabled_d1 = ('corner_thresh_min_deg' in so_cfg_d1 and 'corner_thresh_max_deg' in so_cfg_d1)
-        if not corner_range_enabled_d1:
-            corner_range_enabled_d1 = bool(preview_cfg_d1.get('corner_range_on', False))
-
-        fixed_info_to_use_d1 = None if corner_range_enabled_d1 else dbg0_d1
-
-        d1_base_svg, _debug_info_d1 = _render_processed_centerline_svg_mixed(
-            pts_d1, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-            style_json=style, short_mask=short_mask_d1,
-            start_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('start_region_frac'),
-            end_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('end_region_frac'),
-            fixed_info=fixed_info_to_use_d1
-        )
-
-        # 不再保存基础版本文件，直接在内存中处理
-
+        if svg_proc is None:
+            raise RuntimeError('processed centerline unavailable')
+        d1_base_svg = svg_proc
         d1_final_svg = d1_base_svg
-        if grid_state:  # 修复：与generate_single_type保持一致，只检查grid_state是否存在
+        if geometry_deformation and grid_state:
+            # 几何级变形已在着色输出时完成，只需按变形后内容裁剪
+            if d1_geo is not None:
+                d1_final_svg = apply_cropping_logic(d1_geo.svg, bounds=d1_geo.bounds)
+                bounds['D1'] = d1_geo.bounds
+            print(f"[D1] 几何级网格变形: {d1_geo is not None}")
+        elif grid_state:  # 修复：与generate_single_type保持一致，只检查grid_state是否存在
             print(f"[DEBUG] Applying grid deformation - grid_state exists")
             print(f"[DEBUG] grid_state keys: {list(grid_state.keys()) if grid_state else 'None'}")
             if grid_state and 'controlPoints' in grid_state:
                 print(f"[DEBUG] controlPoints count: {len(grid_state['controlPoints'])}")
             try:
-                from web.services.grid_transform import apply_smooth_grid_deformation
+                from web.services.deform_cache import cached_smooth_grid_deformation
                 print(f"[DEBUG] D1 base SVG length: {len(d1_base_svg)}")
-                d1_final_svg = apply_smooth_grid_deformation(d1_base_svg, grid_state)
+                d1_final_svg = cached_smooth_grid_deformation(d1_base_svg, grid_state, pixel_size=pixel_size)
+                if d1_final_svg != d1_base_svg:
+                    bounds['D1'] = None  # 字符串级变形后几何未知，由使用方按需解析
                 print(f"[DEBUG] D1 final SVG length: {len(d1_final_svg)}")
                 print(f"[DEBUG] Deformation applied: {d1_final_svg != d1_base_svg}")
             except Exception as deform_err:
@@ -807,164 +805,13 @@ def generate_abcd(
         else:
             print(f"[DEBUG] Skipping grid deformation - no grid_state provided")
 
-        with open(outD1, 'w', encoding='utf-8') as f:
-            f.write(d1_final_svg)
-    except Exception:
-        with open(outD1, 'w', encoding='utf-8') as f: 
-            f.write('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
-
-    # D2窗口: 中轴填充 (median fill)
-    try:
-        pts = transform_medians(med, rep_style)
-        renderer.render_char(pts, sampled, outD2, render_mode='median_fill')
+        write(outD1, d1_final_svg)
     except Exception:
-        with open(outD2, 'w', encoding='utf-8') as f: f.write('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
-    # C窗口: 处理中轴 (processed centerline)
-    try:
-        pts_proc = transform_medians(med_d1, rep_style)  # 使用D1中轴线
-        # 基于 Raw 的"短边全紫"判断，为 D 列短笔画强制单折点（橙/绿）
-        iso_on = False
-        iso_min = 0.0
-        try:
-            so = style.get('centerline', {}).get('start_orientation', {})
-            iso_on = bool(so.get('isolate_on', False) or style.get('preview', {}).get('isolate_on', False))
-            iso_min = float(so.get('isolate_min_len', style.get('preview', {}).get('isolate_min_len', 0.0)))
-        except Exception:
-            pass
-        short_mask: List[bool] = []
-        if iso_on and iso_min > 0.0:
-            med_raw_t = transform_medians(med, rep_style)
-            import math
-            for st in med_raw_t:
-                if not st or len(st) < 2:
-                    short_mask.append(False)
-                    continue
-                total = 0.0
-                for i in range(len(st)-1):
-                    dx = st[i+1][0]-st[i][0]; dy = st[i+1][1]-st[i][1]
-                    total += math.hypot(dx, dy)
-                short_mask.append(total < iso_min)
-        else:
-            short_mask = [False] * len(pts_proc)
+        write(outD1, '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
 
-        # 暂时跳过C单独渲染，等待D0完成后统一处理
-        svg_text = ""
-        debug_info = []
-        processed_debug = debug_info
-        
-    except Exception as e:
-        # C窗口生成异常处理
-        # 回退到简单单色线（极端情况下）
-        with open(outC, 'w', encoding='utf-8') as f:
-            f.write(build_processed_centerline_svg(ch, size=DEFAULT_SIZE, geom_style=rep_style, style_full=style, seed=seed))
-        processed_debug = []
-
-    # 生成基线原图（原始参数：禁用起笔/中间/笔锋细化）
-    try:
-        import copy as _copy
-        # 使用浅拷贝代替深拷贝以提高性能
-        style_base = dict(style)
-        if 'centerline' in style_base:
-            style_base['centerline'] = dict(style_base['centerline'])
-            if 'start_orientation' in style_base['centerline']:
-                style_base['centerline']['start_orientation'] = dict(style_base['centerline']['start_orientation'])
-        if 'preview' in style_base:
-            style_base['preview'] = dict(style_base['preview'])
-        try:
-            # 开始D0参数清理
-            cl = style_base.setdefault('centerline', {})
-            
-            # 记录清理前的笔锋参数
-            original_so = cl.get('start_orientation', {})
-            # 记录清理前的笔锋参数
-            
-            cl['start_trim'] = 0.0
-            cl['end_trim'] = 0.0
-            cl['protect_end_k'] = 0
-            cl['chaikin_iters'] = 0
-            cl['resample_points'] = 0
-            cl['smooth_window'] = 1
-            cl.setdefault('stroke_tilt', {})['range_deg'] = 0.0
-            cl.setdefault('post_scale', {})['range'] = 0.0
-            cl.setdefault('stroke_move', {})['offset'] = 0.0  # 禁用笔画移动
-            so0 = cl.setdefault('start_orientation', {})
-            so0['angle_range_deg'] = 0.0
-            
-            # 记录笔锋参数清理过程
-            # 记录笔锋参数清理过程
-            
-            # 清理笔锋相关参数，确保D0不受笔锋界面影响
-            so0['end_angle_range_deg'] = 0.0  # 禁用笔锋角度调整
-            so0['end_frac_len'] = 1.0         # 重置笔锋长度比例为默认值
-            
-            # 笔锋参数清理完成
-            # 移除所有角度范围相关的UI参数，使用固定默认值
-            so0.pop('corner_thresh_min_deg', None)
-            so0.pop('corner_thresh_max_deg', None)
-            so0['corner_thresh_deg'] = 35.0  # 使用固定的默认折点阈值
-            # 移除其他可能影响D0的参数
-            so0.pop('frac_len', None)
-            so0.pop('isolate_on', None)
-            so0.pop('isolate_min_len', None)
-            so0.pop('start_region_frac', None)  # 移除原始中轴三色窗口参数
-            so0.pop('end_region_frac', None)    # 移除原始中轴三色窗口参数
-            so0.pop('fix_segments', None)       # 移除分段边界冻结参数
-            # 清理preview配置
-            if 'preview' in style_base:
-                preview = style_base['preview']
-                preview.pop('fix_segments', None)
-                preview.pop('corner_range_on', None)
-                preview.pop('corner_min', None)
-                preview.pop('corner_max', None)
-            
-            # D0配置完成
-
-        except Exception as e:
-            # 参数清理异常处理
-            pass
-        
-        # 创建CenterlineProcessor
-        proc0 = CenterlineProcessor(style_base, seed=seed)
-        # CenterlineProcessor配置完成
-        # 开始处理D0中轴线
-        med0 = proc0.process(med)
-        # D0中轴线处理完成
-        pts_proc0 = transform_medians(med0, rep_style)
-        svg_text0, dbg0 = _render_processed_centerline_svg_mixed(
-            pts_proc0, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-            style_json=None, short_mask=short_mask,
-            start_region_frac=None,
-            end_region_frac=None
-        )
-        name0 = f"{ts}_{ch}_C_orig.svg"  # Fichier de base pour C (temporaire)
-        temp_dir = os.path.join(OUTPUT_COMPARE, '.temp')
-        os.makedirs(temp_dir, exist_ok=True)
-        outD0 = os.path.join(temp_dir, name0)
-        with open(outD0, 'w', encoding='utf-8') as f:
-            f.write(svg_text0)
-        # D1使用D0的分段信息，确保颜色完全一致
-        # 若启用了"夹角范围"，则不使用D0的固定分段，让UI角度范围生效
-        so_cfg = style.get('centerline', {}).get('start_orientation', {}) if isinstance(style, dict) else {}
-        corner_range_enabled = ('corner_thresh_min_deg' in so_cfg and 'corner_thresh_max_deg' in so_cfg)
-        preview_cfg = style.get('preview', {}) if isinstance(style, dict) else {}
-        if not corner_range_enabled:
-            corner_range_enabled = bool(preview_cfg.get('corner_range_on', False))
-        fixed_info_to_use = None if corner_range_enabled else dbg0
-        svg_text_d1, debug_info_d1 = _render_processed_centerline_svg_mixed(
-            pts_proc, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-            style_json=style, short_mask=short_mask,
-            start_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('start_region_frac'),
-            end_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('end_region_frac'),
-            fixed_info=fixed_info_to_use
-        )
-        with open(outC, 'w', encoding='utf-8') as f:
-            f.write(svg_text_d1)
-        processed_debug = debug_info_d1
-    except Exception:
-        # 回退到简单单色线（极端情况下）
-        with open(outC, 'w', encoding='utf-8') as f:
-            f.write(build_processed_centerline_svg(ch, size=DEFAULT_SIZE, geom_style=rep_style, style_full=style, seed=seed))
-        processed_debug = []
+    if not write_files:
+        return {'svg': {'C': svg_proc, 'D1': d1_final_svg, 'D2': d2_svg}, 'bounds': bounds,
+                'angles': processed_debug, 'version': ts}
 
     # 优化文件存在性检查，减少等待时间
     targets = [outA, outB, outC, outD1, outD2] + ([outD0] if 'outD0' in locals() else [])
@@ -985,7 +832,6 @@ def generate_abcd(
             'angles': processed_debug,
             'version': ts
         }
-        return result
     except RuntimeError:
         # 在非Flask上下文中返回文件路径
         result = {
@@ -998,10 +844,63 @@ def generate_abcd(
             'angles': processed_debug,
             'version': ts
         }
-        return result
+    return result
+
+
+# 文章/样例按字号取用的 LOD 字形：(字, 风格+网格摘要) x 层级 -> {'C'/'D1'/'D2': svg_text}
+_LOD_CACHE = lod.LodCache(maxsize=512)
+
 
+def _lod_glyph_key(ch: str, style: Dict[str, Any], grid_state: Dict[str, Any] | None) -> tuple:
+    blob = json.dumps([style, grid_state or None], sort_keys=True, ensure_ascii=False, default=str)
+    return ch, hashlib.sha1(blob.encode('utf-8')).hexdigest()
 
-def generate_single_type(ch: str, image_type: str, style_override_path: str = None, grid_state: Dict[str, Any] | None = None):
+
+def glyph_for_size(
+    ch: str,
+    font_type: str = 'D1',
+    *,
+    style_override_path: str | None = None,
+    grid_state: Dict[str, Any] | None = None,
+    target_px: int | None = None,
+) -> GlyphSvg | None:
+    """按目标字号取单字 SVG 文本（C/D1/D2）及其几何包围盒，LOD 结果按字形与层级缓存；失败返回 None。
+    包围盒为 None 时（如字符串级变形的结果）由使用方自行解析。
+    字形只含笔画几何：生成器写入的白色背景矩形在入缓存前去掉（排版背景由页面提供），各页共用同一份。"""
+    key = _lod_glyph_key(ch, _resolve_style(style_override_path), grid_state)
+    level = lod.lod_level(target_px, DEFAULT_SIZE)
+
+    def build():
+        res = generate_abcd(ch, style_override_path=style_override_path, grid_state=grid_state,
+                            use_grid_deformation=bool(grid_state), target_px=level,
+                            geometry_deformation=True)  # 只作用于 D1，D2 与字符串级流程一样不变形
+        svgs, bounds = res.get('svg') or {}, res.get('bounds') or {}
+        return {k: GlyphSvg(rewrite_svg(v, [drop_background_rects]), bounds.get(k)) for k, v in svgs.items() if v}
+
+    try:
+        variants = _LOD_CACHE.get_or_build(key, level, build)
+    except Exception as e:
+        print(f"[LOD] 字符{ch}生成失败: {e}")
+        return None
+    return (variants or {}).get(font_type)
+
+
+def glyph_svg_for_size(
+    ch: str,
+    font_type: str = 'D1',
+    *,
+    style_override_path: str | None = None,
+    grid_state: Dict[str, Any] | None = None,
+    target_px: int | None = None,
+) -> str | None:
+    """按目标字号取单字 SVG 文本（C/D1/D2），LOD 结果按字形与层级缓存；失败返回 None。"""
+    glyph = glyph_for_size(ch, font_type, style_override_path=style_override_path,
+                           grid_state=grid_state, target_px=target_px)
+    return glyph.svg if glyph else None
+
+
+def generate_single_type(ch: str, image_type: str, style_override_path: str = None, grid_state: Dict[str, Any] | None = None,
+                         geometry_deformation: bool = False, deform_d2: bool = False):
     """
     生成单个类型的图像，真正只生成请求的类型
     
@@ -1009,6 +908,8 @@ def generate_single_type(ch: str, image_type: str, style_override_path: str = No
         ch (str): 要生成的字符
         image_type (str): 图像类型 ('A', 'B', 'C', 'D1', 'D2')
         style_override_path (str, optional): 样式覆盖文件路径
+        geometry_deformation (bool): D1 在几何数组上直接应用 grid_state 变形，只序列化一次
+        deform_d2 (bool): D2 也按 grid_state 做几何级变形（默认不变形）
     
     Returns:
         dict: 包含生成的图像URL的字典
@@ -1073,106 +974,16 @@ def generate_single_type(ch: str, image_type: str, style_override_path: str = No
                 try:
                     rep_style = (sampled[0] if sampled else style.get('global', {}))
 
-                    # 处理后的中轴线（D1）
-                    proc = CenterlineProcessor(style, seed=seed)
-                    med_processed = proc.process(med)
-                    pts_processed = transform_medians(med_processed, rep_style)
-
-                    # 短笔画遮罩（与generate_abcd一致）
-                    iso_on = False
-                    iso_min = 0.0
-                    try:
-                        so = style.get('centerline', {}).get('start_orientation', {})
-                        iso_on = bool(so.get('isolate_on', False) or style.get('preview', {}).get('isolate_on', False))
-                        iso_min = float(so.get('isolate_min_len', style.get('preview', {}).get('isolate_min_len', 0.0)))
-                    except Exception:
-                        pass
-                    short_mask: List[bool] = []
-                    if iso_on and iso_min > 0.0:
-                        med_raw_t = transform_medians(med, rep_style)
-                        import math
-                        for st in med_raw_t:
-                            if not st or len(st) < 2:
-                                short_mask.append(False)
-                                continue
-                            total = 0.0
-                            for i in range(len(st)-1):
-                                dx = st[i+1][0]-st[i][0]; dy = st[i+1][1]-st[i][1]
-                                total += math.hypot(dx, dy)
-                            short_mask.append(total < iso_min)
-                    else:
-                        short_mask = [False] * len(pts_processed)
-
-                    # 构建D0基线风格（禁用所有用户变换），获取分段信息
-                    style_base = dict(style)
-                    if 'centerline' in style_base:
-                        style_base['centerline'] = dict(style_base['centerline'])
-                        if 'start_orientation' in style_base['centerline']:
-                            style_base['centerline']['start_orientation'] = dict(style_base['centerline']['start_orientation'])
-                    if 'preview' in style_base:
-                        style_base['preview'] = dict(style_base['preview'])
-                    try:
-                        cl = style_base.setdefault('centerline', {})
-                        cl['start_trim'] = 0.0
-                        cl['end_trim'] = 0.0
-                        cl['protect_end_k'] = 0
-                        cl['chaikin_iters'] = 0
-                        cl['resample_points'] = 0
-                        cl['smooth_window'] = 1
-                        cl.setdefault('stroke_tilt', {})['range_deg'] = 0.0
-                        cl.setdefault('post_scale', {})['range'] = 0.0
-                        cl.setdefault('stroke_move', {})['offset'] = 0.0
-                        so0 = cl.setdefault('start_orientation', {})
-                        so0['angle_range_deg'] = 0.0
-                        so0['end_angle_range_deg'] = 0.0
-                        so0['end_frac_len'] = 1.0
-                        so0.pop('corner_thresh_min_deg', None)
-                        so0.pop('corner_thresh_max_deg', None)
-                        so0['corner_thresh_deg'] = 35.0
-                        so0.pop('frac_len', None)
-                        so0.pop('isolate_on', None)
-                        so0.pop('isolate_min_len', None)
-                        so0.pop('start_region_frac', None)
-                        so0.pop('end_region_frac', None)
-                        so0.pop('fix_segments', None)
-                        if 'preview' in style_base:
-                            preview = style_base['preview']
-                            preview.pop('fix_segments', None)
-                            preview.pop('corner_range_on', None)
-                            preview.pop('corner_min', None)
-                            preview.pop('corner_max', None)
-                    except Exception:
-                        pass
-
-                    proc0 = CenterlineProcessor(style_base, seed=seed)
-                    med0 = proc0.process(med)
-                    pts_proc0 = transform_medians(med0, rep_style)
-                    svg_text0, dbg0 = _render_processed_centerline_svg_mixed(
-                        pts_proc0, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-                        style_json=None, short_mask=short_mask,
-                        start_region_frac=None,
-                        end_region_frac=None
-                    )
-
-                    # 使用D0的分段信息对D1着色，确保与"全部"一致
-                    so_cfg = style.get('centerline', {}).get('start_orientation', {}) if isinstance(style, dict) else {}
-                    preview_cfg = style.get('preview', {}) if isinstance(style, dict) else {}
-                    corner_range_enabled = ('corner_thresh_min_deg' in so_cfg and 'corner_thresh_max_deg' in so_cfg)
-                    if not corner_range_enabled:
-                        corner_range_enabled = bool(preview_cfg.get('corner_range_on', False))
-
-                    fixed_info_to_use = None if corner_range_enabled else dbg0
-
-                    svg_text_d1, _debug_info_d1 = _render_processed_centerline_svg_mixed(
-                        pts_processed, size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-                        style_json=style, short_mask=short_mask,
-                        start_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('start_region_frac'),
-                        end_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('end_region_frac'),
-                        fixed_info=fixed_info_to_use
-                    )
+                    # 原始中轴与处理后的中轴线（即 med_d1）一次批量仿射
+                    med_raw_t, pts_processed = transform_medians_batch([med, med_d1], rep_style)
+
+                    # 短笔画遮罩 + D0基线分段着色（与generate_abcd一致）
+                    short_mask = _short_mask_for(seg.glyph_geometry(med_raw_t), style)
+                    _svg_text0, proc_d1, _debug_info_d1, _ = _render_processed_with_baseline(
+                        med, pts_processed, style, seed, rep_style, short_mask)
 
                     with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(svg_text_d1)
+                        f.write(proc_d1.svg)
                 except Exception:
                     with open(output_path, 'w', encoding='utf-8') as f:
                         f.write('<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>')
@@ -1184,50 +995,61 @@ def generate_single_type(ch: str, image_type: str, style_override_path: str = No
                 output_path = os.path.join(output_dir, filename)
                 
                 try:
-                    # 优先读取最近生成的C图，保证与界面显示的C颜色/样式完全一致
-                    svg_c = None
-                    try:
-                        latest = latest_filenames_for_char(ch) or {}
-                        c_name = latest.get('C')
-                        if c_name:
-                            c_path = os.path.join(OUTPUT_COMPARE, 'C_processed_centerline', c_name)
-                            if os.path.exists(c_path):
-                                with open(c_path, 'r', encoding='utf-8') as cf:
-                                    svg_c = cf.read()
-                    except Exception:
-                        svg_c = None
-
-                    # 若没有现成的C文件，则临时生成一个C（但依然不引入D0着色）
-                    if not svg_c:
+                    geo_deform = geometry_deformer(grid_state) if (grid_state and geometry_deformation) else None
+                    if geo_deform is not None:
+                        # 几何级：与C相同的D0基线着色分段，直接按变形后的中轴输出并裁剪
                         rep_style = (sampled[0] if sampled else style.get('global', {}))
-                        proc = CenterlineProcessor(style, seed=seed)
-                        med_processed = proc.process(med)
-                        pts_processed = transform_medians(med_processed, rep_style)
-                        svg_c = _render_centerline_svg_windowed(
-                            pts_processed,
-                            size=DEFAULT_SIZE, pad=DEFAULT_PAD,
-                            start_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('start_region_frac', 0.30),
-                            end_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('end_region_frac', 0.30),
-                            isolate_enabled=False,
-                            isolate_min_len=0.0
-                        )
-
-                    # 若提供grid_state，则对C应用网格变形，输出为D1
-                    if grid_state:
-                        from web.services.grid_transform import apply_grid_deformation_to_svg
+                        med_raw_t, pts_processed = transform_medians_batch([med, med_d1], rep_style)
+                        short_mask = _short_mask_for(seg.glyph_geometry(med_raw_t), style)
+                        _svg_text0, _proc, _debug, geo = _render_processed_with_baseline(
+                            med, pts_processed, style, seed, rep_style, short_mask, deform=geo_deform)
+                        with open(output_path, 'w', encoding='utf-8') as f:
+                            f.write(apply_cropping_logic(geo.svg, bounds=geo.bounds))
+                    else:
+                        # 优先读取最近生成的C图，保证与界面显示的C颜色/样式完全一致
+                        svg_c = None
                         try:
-                            # Phase 2：以矢量warp+可选栅格化双线性下采样，保证边缘平滑
-                            # 使用改进的变形算法
-                            from web.services.grid_transform import apply_smooth_grid_deformation
-                            svg_d1 = apply_smooth_grid_deformation(svg_c, grid_state)
-                        except Exception as e:
-                            print(f"[D1] 网格变形失败，回退为未变形C: {e}")
+                            latest = latest_filenames_for_char(ch) or {}
+                            c_name = latest.get('C')
+                            if c_name:
+                                c_path = os.path.join(OUTPUT_COMPARE, 'C_processed_centerline', c_name)
+                                if os.path.exists(c_path):
+                                    with open(c_path, 'r', encoding='utf-8') as cf:
+                                        svg_c = cf.read()
+                        except Exception:
+                            svg_c = None
+
+                        # 若没有现成的C文件，则临时生成一个C（但依然不引入D0着色）
+                        if not svg_c:
+                            rep_style = (sampled[0] if sampled else style.get('global', {}))
+                            proc = CenterlineProcessor(style, seed=seed)
+                            med_processed = proc.process(med)
+                            pts_processed = transform_medians(med_processed, rep_style)
+                            svg_c = _render_centerline_svg_windowed(
+                                pts_processed,
+                                size=DEFAULT_SIZE, pad=DEFAULT_PAD,
+                                start_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('start_region_frac', 0.30),
+                                end_region_frac=style.get('centerline', {}).get('start_orientation', {}).get('end_region_frac', 0.30),
+                                isolate_enabled=False,
+                                isolate_min_len=0.0
+                            )
+
+                        # 若提供grid_state，则对C应用网格变形，输出为D1
+                        if grid_state:
+                            from web.services.grid_transform import apply_grid_deformation_to_svg
+                            try:
+                                # Phase 2：以矢量warp+可选栅格化双线性下采样，保证边缘平滑
+                                # 使用改进的变形算法
+                                from web.services.deform_cache import cached_smooth_grid_deformation
+                                svg_d1 = cached_smooth_grid_deformation(svg_c, grid_state)
+                            except Exception as e:
+                                print(f"[D1] 网格变形失败，回退为未变形C: {e}")
+                                svg_d1 = svg_c
+                        else:
                             svg_d1 = svg_c
-                    else:
-                        svg_d1 = svg_c
 
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(svg_d1)
+                        with open(output_path, 'w', encoding='utf-8') as f:
+                            f.write(svg_d1)
                         
                 except Exception as e:
                     print(f"❌ [D1] 生成失败: {e}")
@@ -1349,7 +1171,13 @@ def generate_single_type(ch: str, image_type: str, style_override_path: str = No
             output_path = os.path.join(output_dir, filename)
             
             pts = transform_medians(med, rep_style)
-            renderer.render_char(pts, sampled, output_path, render_mode='median_fill')
+            geo_deform = geometry_deformer(grid_state) if (grid_state and deform_d2) else None
+            if geo_deform is not None:
+                svg_d2 = renderer.render_char(pts, sampled, None, render_mode='median_fill', deform=geo_deform)
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(apply_cropping_logic(svg_d2.decode('utf-8'), bounds=renderer.last_bounds))
+            else:
+                renderer.render_char(pts, sampled, output_path, render_mode='median_fill')
         
         # 构造返回结果
         try:
@@ -8,37 +8,49 @@ import json
 import math
 import io
 import base64
+import hashlib
+import threading
 from typing import List, Tuple, Optional, Dict, Any
 
+import numpy as np
+
+from src.curvefit import corner_indices, fit_path_d
+from src.lod import LodCache
+from src.svgdoc import is_background_rect, rewrite_svg, shapes_to_paths, svg_bounds
+from src.svgpath import encode_polyline, fmt_number, path_subpaths, scan_path
+
+
+# 变形失败而回退（返回原文、改走次选算法或放弃栅格化）时在当前线程置位，
+# 结果缓存据此跳过这类临时结果
+_FALLBACK = threading.local()
+
+
+def _mark_fallback() -> None:
+    _FALLBACK.hit = True
+
+
+def reset_fallback() -> None:
+    _FALLBACK.hit = False
+
+
+def fell_back() -> bool:
+    """自上次 reset_fallback() 以来当前线程的变形是否发生过回退"""
+    return getattr(_FALLBACK, 'hit', False)
+
 
 def parse_svg_path(path_data: str) -> List[Tuple[str, List[float]]]:
-    """解析SVG路径数据"""
-    commands = re.findall(r'[MmLlHhVvCcSsQqTtAaZz][^MmLlHhVvCcSsQqTtAaZz]*', path_data)
-    parsed = []
-    
-    for cmd in commands:
-        cmd_type = cmd[0]
-        coords_str = cmd[1:].strip()
-        if coords_str:
-            # 支持科学计数与更宽松格式，避免解析失败造成折线
-            coords = [float(x) for x in re.findall(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?', coords_str)]
-        else:
-            coords = []
-        parsed.append((cmd_type, coords))
-    
-    return parsed
+    """解析SVG路径数据：单遍扫描，逐组返回 (命令字母, 参数)（支持科学计数、紧凑的圆弧标志位）"""
+    return list(scan_path(path_data))
 
 
-def build_svg_path(commands: List[Tuple[str, List[float]]]) -> str:
-    """重建SVG路径数据"""
+def build_svg_path(commands: List[Tuple[str, List[float]]], decimals: int = 2) -> str:
+    """重建SVG路径数据（最短数字写法；256px 输出下 2 位小数已低于 0.01 像素）"""
     result = []
     for cmd_type, coords in commands:
-        if coords:
-            # 使用更高精度并在数值之间添加空格，减少量化造成的折线感
-            coords_str = ' '.join(f'{x:.4f}' for x in coords)
-            result.append(f'{cmd_type}{coords_str}')
-        else:
-            result.append(cmd_type)
+        result.append(cmd_type)
+        for i, x in enumerate(coords):
+            num = fmt_number(x, decimals)
+            result.append(num if (i == 0 or num[0] == '-') else ' ' + num)
     return ''.join(result)
 
 
@@ -270,6 +282,264 @@ def deform_point(x: float, y: float, grid_state: Dict[str, Any]) -> Tuple[float,
     return (safe_x, safe_y)
 
 
+class GridDeformer:
+    """
+    编译后的 Catmull-Rom + Coons Patch 网格变形（与 deform_point 结果一致）
+
+    控制点一次性转为数组，并预先算好每个单元格四条边的贝塞尔控制点；
+    之后对任意形状 (..., 2) 的点数组批量求值。
+    """
+
+    # 前端坐标系：800×600 画布中央的 300×300 网格，SVG 占网格中央 80%
+    CANVAS = (800.0, 600.0)
+    GRID_EXTENT = 300.0
+    SVG_RATIO = 0.8
+
+    def __init__(self, control_points: np.ndarray, size: int):
+        self.size = int(size)
+        self.cells = self.size - 1
+        cx, cy = self.CANVAS[0] / 2, self.CANVAS[1] / 2
+        self.grid_start = np.array([cx - self.GRID_EXTENT / 2, cy - self.GRID_EXTENT / 2])
+        svg_extent = self.GRID_EXTENT * self.SVG_RATIO
+        self.svg_start = np.array([cx - svg_extent / 2, cy - svg_extent / 2])
+        self.svg_scale = svg_extent / 256.0
+        P = np.asarray(control_points, dtype=float).reshape(self.size, self.size, 2)
+        self.corners = P
+        self.edges = self._build_edges(P)
+
+    @classmethod
+    def from_grid_state(cls, grid_state: Optional[Dict[str, Any]]) -> Optional['GridDeformer']:
+        """由 grid_state 编译；无控制点或数据不完整时返回 None（调用方按恒等变换处理）"""
+        if not grid_state:
+            return None
+        control_points = grid_state.get('controlPoints', [])
+        size = grid_state.get('size', 4)
+        if not control_points or size < 2:
+            return None
+        try:
+            # 缺失的控制点按标准网格位置补齐（与 coons_patch_interpolation 一致）
+            step = cls.GRID_EXTENT / (size - 1)
+            x0 = cls.CANVAS[0] / 2 - cls.GRID_EXTENT / 2
+            y0 = cls.CANVAS[1] / 2 - cls.GRID_EXTENT / 2
+            pts = []
+            for idx in range(size * size):
+                if idx < len(control_points):
+                    cp = control_points[idx]
+                    pts.append((float(cp['x']), float(cp['y'])))
+                else:
+                    pts.append((x0 + (idx % size) * step, y0 + (idx // size) * step))
+            return cls(np.array(pts), size)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[GRID_DEBUG] 控制点数据无效，跳过变形: {e}")
+            return None
+
+    def _build_edges(self, P: np.ndarray) -> np.ndarray:
+        """每个单元格的 [上, 下, 左, 右] 四条边的三次贝塞尔控制点，形状 (cells, cells, 4, 4, 2)"""
+        n, c = self.size, self.cells
+        gy, gx = np.meshgrid(np.arange(c), np.arange(c), indexing='ij')
+
+        def at(r, col):
+            return P[np.clip(r, 0, n - 1), np.clip(col, 0, n - 1)]
+
+        def cr_bezier(p0, p1, p2, p3):
+            return np.stack([p1, p1 + (p2 - p0) / 6, p2 - (p3 - p1) / 6, p2], axis=-2)
+
+        top = cr_bezier(at(gy, gx - 1), at(gy, gx), at(gy, gx + 1), at(gy, gx + 2))
+        bottom = cr_bezier(at(gy + 1, gx - 1), at(gy + 1, gx), at(gy + 1, gx + 1), at(gy + 1, gx + 2))
+        left = cr_bezier(at(gy - 1, gx), at(gy, gx), at(gy + 1, gx), at(gy + 2, gx))
+        right = cr_bezier(at(gy - 1, gx + 1), at(gy, gx + 1), at(gy + 1, gx + 1), at(gy + 2, gx + 1))
+        return np.stack([top, bottom, left, right], axis=2)
+
+    @staticmethod
+    def _bernstein(t: np.ndarray) -> np.ndarray:
+        it = 1.0 - t
+        return np.stack([it * it * it, 3 * it * it * t, 3 * it * t * t, t * t * t], axis=-1)
+
+    def coons(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """网格参数 (u, v) ∈ [0,1]² -> 前端画布坐标，返回 (..., 2)"""
+        u = np.clip(np.asarray(u, dtype=float), 0.0, 1.0)
+        v = np.clip(np.asarray(v, dtype=float), 0.0, 1.0)
+        gu, gv = u * self.cells, v * self.cells
+        gx = np.clip(gu.astype(np.int64), 0, self.cells - 1)
+        gy = np.clip(gv.astype(np.int64), 0, self.cells - 1)
+        lu, lv = (gu - gx)[..., None], (gv - gy)[..., None]
+        E = self.edges[gy, gx]                      # (..., 4, 4, 2)
+        bu = self._bernstein(lu[..., 0])[..., :, None]
+        bv = self._bernstein(lv[..., 0])[..., :, None]
+        top = (E[..., 0, :, :] * bu).sum(-2)
+        bottom = (E[..., 1, :, :] * bu).sum(-2)
+        left = (E[..., 2, :, :] * bv).sum(-2)
+        right = (E[..., 3, :, :] * bv).sum(-2)
+        P = self.corners
+        blend = ((1 - lu) * (1 - lv) * P[gy, gx] + lu * (1 - lv) * P[gy, gx + 1] +
+                 (1 - lu) * lv * P[gy + 1, gx] + lu * lv * P[gy + 1, gx + 1])
+        return (1 - lv) * top + lv * bottom + (1 - lu) * left + lu * right - blend
+
+    def deform_svg(self, points: np.ndarray) -> np.ndarray:
+        """SVG 坐标 (0-256) 批量变形，等价于逐点调用 deform_point_catmull_rom_coons"""
+        pts = np.asarray(points, dtype=float)
+        grid = self.svg_start + pts * self.svg_scale
+        uv = (grid - self.grid_start) / self.GRID_EXTENT
+        out = self.coons(uv[..., 0], uv[..., 1])
+        return (out - self.svg_start) / self.svg_scale
+
+    def deform(self, points: np.ndarray) -> np.ndarray:
+        """批量版 deform_point：变形后限制在安全坐标范围内"""
+        return np.clip(self.deform_svg(points), -500.0, 800.0)
+
+    def coons_grid(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """在张量网格 v × u 上求值，返回 (len(v), len(u), 2)。
+        边曲线只依赖 u 或 v，先按一维求值再广播，避免逐点取四条边。"""
+        u = np.clip(np.asarray(u, dtype=float), 0.0, 1.0)
+        v = np.clip(np.asarray(v, dtype=float), 0.0, 1.0)
+        gx = np.clip((u * self.cells).astype(np.int64), 0, self.cells - 1)
+        gy = np.clip((v * self.cells).astype(np.int64), 0, self.cells - 1)
+        lu, lv = u * self.cells - gx, v * self.cells - gy
+        bu, bv = self._bernstein(lu), self._bernstein(lv)
+        top = np.einsum('rjkd,jk->rjd', self.edges[:, gx, 0], bu)[gy]       # (V, U, 2)
+        bottom = np.einsum('rjkd,jk->rjd', self.edges[:, gx, 1], bu)[gy]
+        left = np.einsum('ickd,ik->icd', self.edges[gy, :, 2], bv)[:, gx]   # (V, U, 2)
+        right = np.einsum('ickd,ik->icd', self.edges[gy, :, 3], bv)[:, gx]
+        LU, LV = lu[None, :, None], lv[:, None, None]
+        P = self.corners
+        Y, X = gy[:, None], gx[None, :]
+        blend = ((1 - LU) * (1 - LV) * P[Y, X] + LU * (1 - LV) * P[Y, X + 1] +
+                 (1 - LU) * LV * P[Y + 1, X] + LU * LV * P[Y + 1, X + 1])
+        return (1 - LV) * top + LV * bottom + (1 - LU) * left + LU * right - blend
+
+    def bake(self, resolution: int = 513) -> 'DeformationField':
+        """把变形烘焙为覆盖整个网格（u, v ∈ [0,1]）的稠密位移场"""
+        t = np.linspace(0.0, 1.0, resolution)
+        # 网格参数 -> SVG 坐标：网格全域对应 SVG 的 [-32, 288]
+        origin = (self.grid_start - self.svg_start) / self.svg_scale
+        step = self.GRID_EXTENT / self.svg_scale / (resolution - 1)
+        src = origin + np.stack(np.meshgrid(t, t), axis=-1) * (step * (resolution - 1))
+        dst = (self.coons_grid(t, t) - self.svg_start) / self.svg_scale
+        return DeformationField(origin, step, (dst - src).astype(np.float32))
+
+
+class DeformationField:
+    """
+    烘焙后的网格变形：SVG 坐标上的稠密位移场（float32，形状 (R, R, 2)，[行=y, 列=x]）
+
+    点变形为一次双线性查表；网格范围外的点按 Coons 插值的做法钳制到边界。
+    """
+
+    def __init__(self, origin: np.ndarray, step: float, displacement: np.ndarray):
+        self.origin = np.asarray(origin, dtype=float)
+        self.step = float(step)
+        self.displacement = displacement
+        self.resolution = displacement.shape[0]
+
+    def sample(self, fx: np.ndarray, fy: np.ndarray, grad: bool = False):
+        """在场的索引坐标 (fx, fy) 处双线性取位移（先钳制到场内），返回 (dx, dy)；
+        grad=True 时另返回位移对索引坐标的偏导 ((dx/dfx, dx/dfy), (dy/dfx, dy/dfy))"""
+        hi = self.resolution - 1
+        fx = np.clip(fx, 0.0, hi)
+        fy = np.clip(fy, 0.0, hi)
+        ix = np.minimum(fx.astype(np.int64), hi - 1)
+        iy = np.minimum(fy.astype(np.int64), hi - 1)
+        tx, ty = fx - ix, fy - iy
+        k = iy * self.resolution + ix
+        out, grads = [], []
+        for plane in self._planes():
+            a, b = plane[k], plane[k + 1]
+            c, d = plane[k + self.resolution], plane[k + self.resolution + 1]
+            top, bottom = a + tx * (b - a), c + tx * (d - c)
+            out.append(top + ty * (bottom - top))
+            if grad:
+                grads.append(((b - a) + ty * ((d - c) - (b - a)), bottom - top))
+        return (out[0], out[1], grads) if grad else (out[0], out[1])
+
+    def _planes(self) -> Tuple[np.ndarray, np.ndarray]:
+        if getattr(self, '_flat', None) is None:
+            self._flat = (np.ascontiguousarray(self.displacement[..., 0]).ravel(),
+                          np.ascontiguousarray(self.displacement[..., 1]).ravel())
+        return self._flat
+
+    def deform_svg(self, points: np.ndarray) -> np.ndarray:
+        pts = np.asarray(points, dtype=float)
+        hi = self.resolution - 1
+        f = np.clip((pts - self.origin) / self.step, 0.0, hi)
+        dx, dy = self.sample(f[..., 0], f[..., 1])
+        return self.origin + f * self.step + np.stack([dx, dy], axis=-1)
+
+    def invert_svg(self, targets: np.ndarray, iterations: int = 12,
+                   tol: float = 1e-3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逆映射：对每个目标点求源点 s，使 s + D(s) = target。
+        以 s = target 为初值做牛顿迭代（雅可比取自双线性位移场），只对未收敛的点继续迭代。
+        返回 (源点 SVG 坐标, 有效掩码)；源点落在网格外或不收敛时无效。
+        """
+        q = np.asarray(targets, dtype=float)
+        shape = q.shape[:-1]
+        qx = ((q[..., 0] - self.origin[0]) / self.step).ravel()
+        qy = ((q[..., 1] - self.origin[1]) / self.step).ravel()
+        fx, fy = qx.copy(), qy.copy()
+        active = np.arange(qx.size)
+        for _ in range(iterations):
+            if active.size == 0:
+                break
+            ax, ay = fx[active], fy[active]
+            dx, dy, ((jxx, jxy), (jyx, jyy)) = self.sample(ax, ay, grad=True)
+            # 残差 r = s + D(s) - target，J = I + dD/ds（索引坐标下）
+            rx, ry = ax + dx / self.step - qx[active], ay + dy / self.step - qy[active]
+            jxx, jxy, jyx, jyy = 1 + jxx / self.step, jxy / self.step, jyx / self.step, 1 + jyy / self.step
+            det = jxx * jyy - jxy * jyx
+            det = np.where(np.abs(det) < 1e-6, 1.0, det)   # 折叠处退化为不动点迭代步
+            sx, sy = (jyy * rx - jxy * ry) / det, (jxx * ry - jyx * rx) / det
+            moving = np.maximum(np.abs(sx), np.abs(sy)) >= tol
+            fx[active], fy[active] = ax - sx, ay - sy
+            # 只继续迭代尚未收敛的点
+            active = active[moving]
+        fx, fy, qx, qy = fx.reshape(shape), fy.reshape(shape), qx.reshape(shape), qy.reshape(shape)
+        hi = self.resolution - 1
+        dx, dy = self.sample(fx, fy)
+        residual = np.hypot(fx + dx / self.step - qx, fy + dy / self.step - qy) * self.step
+        valid = (fx >= 0) & (fx <= hi) & (fy >= 0) & (fy <= hi) & (residual < 0.05)
+        src = self.origin + np.stack([fx, fy], axis=-1) * self.step
+        return src, valid
+
+    def deform(self, points: np.ndarray) -> np.ndarray:
+        """与 GridDeformer.deform 相同的接口与安全坐标限制"""
+        return np.clip(self.deform_svg(points), -500.0, 800.0)
+
+    @property
+    def nbytes(self) -> int:
+        return self.displacement.nbytes
+
+
+FIELD_RESOLUTION = 513
+# 同一 grid_state 会作用于整篇文章 / 字体样例 / D2 批量中的每个字，只烘焙一次
+_FIELD_CACHE = LodCache(maxsize=8)
+
+
+def grid_state_key(grid_state: Optional[Dict[str, Any]]) -> Optional[str]:
+    """grid_state 的规范哈希：只含影响变形的 size 与控制点坐标（四舍五入到 1e-6）"""
+    if not grid_state or not grid_state.get('controlPoints'):
+        return None
+    try:
+        pts = [[round(float(p['x']), 6), round(float(p['y']), 6)] for p in grid_state['controlPoints']]
+    except (KeyError, TypeError, ValueError):
+        return None
+    blob = json.dumps([int(grid_state.get('size', 4)), pts], separators=(',', ':'))
+    return hashlib.sha1(blob.encode('ascii')).hexdigest()
+
+
+def get_deformation_field(grid_state: Optional[Dict[str, Any]],
+                          resolution: int = FIELD_RESOLUTION) -> Optional[DeformationField]:
+    """按 grid_state 哈希取烘焙位移场（LRU 内存缓存），无有效网格时返回 None"""
+    key = grid_state_key(grid_state)
+    if key is None:
+        return None
+
+    def build():
+        deformer = GridDeformer.from_grid_state(grid_state)
+        return deformer.bake(resolution) if deformer is not None else None
+
+    return _FIELD_CACHE.get_or_build(key, resolution, build)
+
+
 def has_grid_deformation(grid_state):
     """
     检查网格状态是否包含实际变形
@@ -332,84 +602,101 @@ def transform_d1_to_d2(d1_content: str, grid_state: Dict[str, Any], canvas_dimen
         print(f"[D1_TO_D2] 图像级变形失败: {e}", flush=True)
     
     # 回退到改进的路径级变形（确保平滑）
+    _mark_fallback()
     print("[D1_TO_D2] 使用改进的路径级变形", flush=True)
     return apply_smooth_grid_deformation(d1_content, grid_state, canvas_dimensions)
 
 
 def convert_svg_shapes_to_paths(svg_content: str) -> str:
     """
-    将SVG基本形状转换为path元素，以便进行变形处理
+    将SVG基本形状（rect/circle/ellipse/line/polyline/polygon）转换为path元素，以便进行变形处理
+    纯白背景矩形保留原样
     """
-    import re
-    
-    def convert_circle_to_path(match):
-        """将circle转换为path"""
-        circle_str = match.group(0)
-        
-        # 提取属性
-        cx_match = re.search(r'cx="([^"]*)"', circle_str)
-        cy_match = re.search(r'cy="([^"]*)"', circle_str)
-        r_match = re.search(r'r="([^"]*)"', circle_str)
-        
-        if not (cx_match and cy_match and r_match):
-            return circle_str
-        
-        try:
-            cx = float(cx_match.group(1))
-            cy = float(cy_match.group(1))
-            r = float(r_match.group(1))
-        except ValueError:
-            return circle_str
-        
-        # 生成圆形路径 (使用4个贝塞尔弧)
-        path_d = f"M{cx-r},{cy} A{r},{r} 0 0,1 {cx},{cy-r} A{r},{r} 0 0,1 {cx+r},{cy} A{r},{r} 0 0,1 {cx},{cy+r} A{r},{r} 0 0,1 {cx-r},{cy} Z"
-        
-        # 保留其他属性，替换为path
-        other_attrs = re.sub(r'\s*(cx|cy|r)="[^"]*"', '', circle_str)
-        other_attrs = other_attrs.replace('<circle', '').replace('>', '').strip()
-        
-        return f'<path d="{path_d}" {other_attrs}>'
-    
-    def convert_rect_to_path(match):
-        """将rect转换为path（只转换有描边或填充的rect，跳过背景）"""
-        rect_str = match.group(0)
-        
-        # 跳过纯背景矩形（只有fill="white"或类似的）
-        if 'fill="white"' in rect_str and 'stroke' not in rect_str:
-            return rect_str
-        
-        # 提取属性
-        x_match = re.search(r'x="([^"]*)"', rect_str)
-        y_match = re.search(r'y="([^"]*)"', rect_str)
-        w_match = re.search(r'width="([^"]*)"', rect_str)
-        h_match = re.search(r'height="([^"]*)"', rect_str)
-        
-        if not (x_match and y_match and w_match and h_match):
-            return rect_str
-        
-        try:
-            x = float(x_match.group(1))
-            y = float(y_match.group(1))
-            w = float(w_match.group(1))
-            h = float(h_match.group(1))
-        except ValueError:
-            return rect_str
-        
-        # 生成矩形路径
-        path_d = f"M{x},{y} L{x+w},{y} L{x+w},{y+h} L{x},{y+h} Z"
-        
-        # 保留其他属性，替换为path
-        other_attrs = re.sub(r'\s*(x|y|width|height)="[^"]*"', '', rect_str)
-        other_attrs = other_attrs.replace('<rect', '').replace('>', '').strip()
-        
-        return f'<path d="{path_d}" {other_attrs}>'
-    
-    # 应用转换
-    result = svg_content
-    result = re.sub(r'<circle[^>]*>', convert_circle_to_path, result)
-    result = re.sub(r'<rect[^>]*(?:stroke|fill="(?!white")[^"]*")[^>]*>', convert_rect_to_path, result)  # 转换有描边或非白色填充的rect
-    
-    return result
+    return rewrite_svg(svg_content, [shapes_to_paths()])
+
+
+# 自适应采样的平直度容差（输出像素）：远小于曲线拟合容差 0.25px
+FLATNESS_PX = 0.05
+
+
+def _cubic_points(segments: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """segments (n, 4, 2) 在参数 t (n, k) 处求值，返回 (n, k, 2)"""
+    it = 1.0 - t
+    B = np.stack([it * it * it, 3 * it * it * t, 3 * it * t * t, t * t * t], axis=-1)
+    return np.einsum('nkj,njd->nkd', B, segments)
+
+
+def flatten_deformed(segments: np.ndarray, deform, tolerance: float = FLATNESS_PX,
+                     max_depth: int = 14) -> np.ndarray:
+    """
+    把首尾相接的三次贝塞尔段 (m, 4, 2) 经 deform 变形后展平为折线。
+    每个参数区间取 1/4、1/2、3/4 三个内点，变形后到端点弦的距离都不超过 tolerance 时接受，
+    否则二分；源曲线与变形场的弯曲都体现在这个距离里，整批区间一起求值。
+    """
+    m = len(segments)
+    seg = np.arange(m)
+    t0, t1 = np.zeros(m), np.ones(m)
+    depth = 0
+    done_seg, done_t = [], []
+    probe = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+    while seg.size:
+        ts = t0[:, None] + (t1 - t0)[:, None] * probe
+        D = deform(_cubic_points(segments[seg], ts).reshape(-1, 2)).reshape(len(seg), 5, 2)
+        a, b = D[:, :1], D[:, 4:]
+        ab = b - a
+        L2 = (ab * ab).sum(-1)
+        u = np.clip(((D[:, 1:4] - a) * ab).sum(-1) / np.maximum(L2, 1e-18), 0.0, 1.0)
+        err = np.hypot(*(a + u[..., None] * ab - D[:, 1:4]).transpose(2, 0, 1)).max(-1)
+        flat = (err <= tolerance) | (depth >= max_depth)
+        done_seg.append(seg[flat])
+        done_t.append(t1[flat])
+        split = ~flat
+        tm = (t0[split] + t1[split]) / 2
+        seg = np.repeat(seg[split], 2)
+        t0 = np.column_stack([t0[split], tm]).ravel()
+        t1 = np.column_stack([tm, t1[split]]).ravel()
+        depth += 1
+    seg = np.concatenate(done_seg)
+    t = np.concatenate(done_t)
+    order = np.lexsort((t, seg))
+    seg, t = seg[order], t[order]
+    ends = _cubic_points(segments[seg], t[:, None])[:, 0]
+    return deform(np.vstack([segments[0, :1], ends]))
+
+
+def deform_polyline(points: np.ndarray, deform, tolerance: float = FLATNESS_PX) -> np.ndarray:
+    """折线 (N, 2) 逐段按直线变形并自适应加密（线段视为退化三次段），返回变形后的折线"""
+    P = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(P) < 2:
+        return deform(P)
+    a, b = P[:-1], P[1:]
+    segments = np.stack([a, a + (b - a) / 3, a + (b - a) * 2 / 3, b], axis=1)
+    return flatten_deformed(segments, deform, tolerance)
+
+
+def geometry_deformer(grid_state: Optional[Dict[str, Any]]):
+    """
+    生成阶段直接作用于几何数组的变形函数（256 画布像素坐标，(N, 2) -> (N, 2)）。
+    与 apply_smooth_grid_deformation 判定一致：无实际变形、或所有控制点都在标准位置 5px 内时返回 None。
+    """
+    if not has_grid_deformation(grid_state):
+        return None
+    size = int(grid_state.get('size', 4))
+    try:
+        P = np.array([[p['x'], p['y']] for p in grid_state['controlPoints']], dtype=float)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if size < 2 or not 0 < len(P) <= size * size:
+        return None
+    cx, cy = GridDeformer.CANVAS[0] / 2, GridDeformer.CANVAS[1] / 2
+    ext = GridDeformer.GRID_EXTENT
+    cols, rows = np.meshgrid(np.arange(size), np.arange(size))
+    standard = np.stack([cx - ext / 2 + cols.ravel() * ext / (size - 1),
+                         cy - ext / 2 + rows.ravel() * ext / (size - 1)], axis=-1)
+    if not (np.abs(P - standard[:len(P)]) > 5.0).any():
+        return None
+    field = get_deformation_field(grid_state)
+    return field.deform if field is not None else None
 
 
 def apply_grid_deformation_to_svg(svg_content: str,
@@ -417,13 +704,15 @@ def apply_grid_deformation_to_svg(svg_content: str,
                                   canvas_dimensions: Dict[str, int] = None,
                                   rasterize: bool = True,
                                   supersample: int = 2048,
-                                  final_size: int = 256) -> str:
+                                  final_size: int = 256,
+                                  pixel_size: float = 1.0) -> str:
     """
     对SVG内容应用网格变形（内部函数）
     
     Args:
         svg_content: 原始SVG内容
         grid_state: 网格状态数据
+        pixel_size: 一个输出像素对应的画布像素数（LOD），决定曲线拟合容差与坐标精度
     
     Returns:
         变形后的SVG内容
@@ -433,11 +722,6 @@ def apply_grid_deformation_to_svg(svg_content: str,
     print(f"[GRID_DEBUG] 网格状态: {grid_state}")
     print(f"[GRID_DEBUG] 网格状态类型: {type(grid_state)}")
     
-    # 首先将基本形状转换为路径
-    print("[GRID_DEBUG] 转换基本形状为路径...")
-    svg_content = convert_svg_shapes_to_paths(svg_content)
-    print(f"[GRID_DEBUG] 转换后SVG长度: {len(svg_content)}")
-    
     # 强制输出到控制台，确保调试信息可见
     import sys
     sys.stdout.flush()
@@ -512,168 +796,72 @@ def apply_grid_deformation_to_svg(svg_content: str,
         print("[GRID_DEBUG] 提示：要应用网格变形，请先在网格变形界面调整控制点")
         return svg_content
     
-    def _sample_line(p0, p1, step_px=0.25):
-        import math
-        dx = p1[0] - p0[0]
-        dy = p1[1] - p0[1]
-        dist = math.hypot(dx, dy)
-        n = max(4, int(dist / max(0.1, step_px)) + 1)
-        return [(p0[0] + dx * t, p0[1] + dy * t) for t in [i/(n-1) for i in range(n)]]
-
-    def _sample_quad(p0, p1, p2, samples=96):
-        # Quadratic Bezier
-        pts = []
-        for i in range(samples):
-            t = i / (samples - 1)
-            mt = 1 - t
-            x = mt*mt*p0[0] + 2*mt*t*p1[0] + t*t*p2[0]
-            y = mt*mt*p0[1] + 2*mt*t*p1[1] + t*t*p2[1]
-            pts.append((x, y))
-        return pts
-
-    def _sample_cubic(p0, p1, p2, p3, samples=128):
-        # Cubic Bezier
-        pts = []
-        for i in range(samples):
-            t = i / (samples - 1)
-            mt = 1 - t
-            x = (mt**3)*p0[0] + 3*(mt**2)*t*p1[0] + 3*mt*(t**2)*p2[0] + (t**3)*p3[0]
-            y = (mt**3)*p0[1] + 3*(mt**2)*t*p1[1] + 3*mt*(t**2)*p2[1] + (t**3)*p3[1]
-            pts.append((x, y))
-        return pts
-
-    def transform_path_data(match):
-        # 高质量采样：将原路径采样为致密折线，再逐点应用网格变形
-        path_data = match.group(1)
-        commands = parse_svg_path(path_data)
-        if not commands:
-            return match.group(0)
+    # 变形场按 grid_state 烘焙并缓存，所有路径的采样点批量查表
+    deformer = get_deformation_field(grid_state)
+
+    deform = deformer.deform if deformer is not None else (lambda P: P)
+    # 变形后折线的包围盒，顺带交给裁剪，免得再解析一遍结果
+    extent = [np.inf, np.inf, -np.inf, -np.inf]
+
+    def grow(P):
+        if len(P):
+            lo, hi = P.min(axis=0), P.max(axis=0)
+            extent[:] = [min(extent[0], lo[0]), min(extent[1], lo[1]), max(extent[2], hi[0]), max(extent[3], hi[1])]
 
+    def deform_element(el):
+        # 几何元素（背景矩形除外）统一转为三次贝塞尔段，按变形后的平直度自适应采样，再逐子路径拟合
+        if not el.is_shape or is_background_rect(el):
+            return
+        # 每个子路径单独拟合：[三次段列表, 是否闭合, 起点]
+        subpaths = []
         current = (0.0, 0.0)
-        start_point = None
-        sampled = []
-        for cmd_type, coords in commands:
-            t = cmd_type
-            # 统一处理为绝对坐标（假定大多数为绝对命令；相对命令简单转绝对）
-            if t == 'M':
-                if len(coords) >= 2:
-                    current = (coords[0], coords[1])
-                    start_point = current
-                    sampled.append(current)
-                # 后续额外的坐标当作直线到达
-                for i in range(2, len(coords), 2):
-                    nxt = (coords[i], coords[i+1])
-                    seg = _sample_line(current, nxt)
-                    sampled.extend(seg[1:])
-                    current = nxt
-            elif t == 'm':
-                if len(coords) >= 2:
-                    current = (current[0] + coords[0], current[1] + coords[1])
-                    start_point = current
-                    sampled.append(current)
-                for i in range(2, len(coords), 2):
-                    nxt = (current[0] + coords[i], current[1] + coords[i+1])
-                    seg = _sample_line(current, nxt)
-                    sampled.extend(seg[1:])
-                    current = nxt
-            elif t in ('L', 'l'):
-                for i in range(0, len(coords), 2):
-                    if i + 1 >= len(coords): break
-                    x = coords[i] + (0 if t=='L' else current[0])
-                    y = coords[i+1] + (0 if t=='L' else current[1])
-                    nxt = (x if t=='L' else x, y if t=='L' else y)
-                    if t=='l':
-                        nxt = (coords[i] + current[0], coords[i+1] + current[1])
-                    seg = _sample_line(current, nxt)
-                    sampled.extend(seg[1:])
-                    current = nxt
-            elif t in ('H', 'h'):
-                for i in range(len(coords)):
-                    x = coords[i] + (0 if t=='H' else current[0])
-                    nxt = (x if t=='H' else x, current[1])
-                    if t=='h':
-                        nxt = (coords[i] + current[0], current[1])
-                    seg = _sample_line(current, nxt)
-                    sampled.extend(seg[1:])
-                    current = nxt
-            elif t in ('V', 'v'):
-                for i in range(len(coords)):
-                    y = coords[i] + (0 if t=='V' else current[1])
-                    nxt = (current[0], y if t=='V' else y)
-                    if t=='v':
-                        nxt = (current[0], coords[i] + current[1])
-                    seg = _sample_line(current, nxt)
-                    sampled.extend(seg[1:])
-                    current = nxt
-            elif t in ('Q', 'q') and len(coords) >= 4:
-                for i in range(0, len(coords), 4):
-                    if i + 3 >= len(coords): break
-                    cx = coords[i] + (0 if t=='Q' else current[0])
-                    cy = coords[i+1] + (0 if t=='Q' else current[1])
-                    ex = coords[i+2] + (0 if t=='Q' else current[0])
-                    ey = coords[i+3] + (0 if t=='Q' else current[1])
-                    quad_pts = _sample_quad(current, (cx, cy), (ex, ey))
-                    sampled.extend(quad_pts[1:])
-                    current = (ex, ey)
-            elif t in ('C', 'c') and len(coords) >= 6:
-                for i in range(0, len(coords), 6):
-                    if i + 5 >= len(coords): break
-                    c1x = coords[i] + (0 if t=='C' else current[0])
-                    c1y = coords[i+1] + (0 if t=='C' else current[1])
-                    c2x = coords[i+2] + (0 if t=='C' else current[0])
-                    c2y = coords[i+3] + (0 if t=='C' else current[1])
-                    ex = coords[i+4] + (0 if t=='C' else current[0])
-                    ey = coords[i+5] + (0 if t=='C' else current[1])
-                    cubic_pts = _sample_cubic(current, (c1x, c1y), (c2x, c2y), (ex, ey))
-                    sampled.extend(cubic_pts[1:])
-                    current = (ex, ey)
-            elif t in ('Z', 'z') and start_point is not None:
-                seg = _sample_line(current, start_point)
-                sampled.extend(seg[1:])
-                current = start_point
+        for cmd, pts in el.commands:
+            if cmd == 'M':
+                current = pts[0]
+                subpaths.append([[], False, current])
+                continue
+            if not subpaths:
+                subpaths.append([[], False, current])
+            segs = subpaths[-1][0]
+            if cmd == 'L' or cmd == 'Z':
+                p1 = pts[0]
+                if cmd == 'L' or p1 != current:
+                    segs.append((current, (current[0] + (p1[0] - current[0]) / 3, current[1] + (p1[1] - current[1]) / 3),
+                                 (current[0] + (p1[0] - current[0]) * 2 / 3, current[1] + (p1[1] - current[1]) * 2 / 3), p1))
+                if cmd == 'Z':
+                    subpaths[-1][1] = True
+            elif cmd == 'Q':
+                (qx, qy), e = pts
+                # 二次升阶为三次
+                segs.append((current, (current[0] + 2 / 3 * (qx - current[0]), current[1] + 2 / 3 * (qy - current[1])),
+                             (e[0] + 2 / 3 * (qx - e[0]), e[1] + 2 / 3 * (qy - e[1])), e))
             else:
-                # 其他命令(A/S/T等)暂不特殊处理，尽量保持原样坐标变换
-                new_coords = []
-                for i in range(0, len(coords), 2):
-                    if i + 1 < len(coords):
-                        x, y = coords[i], coords[i + 1]
-                        new_coords.extend([x, y])
-                if new_coords:
-                    # 当作直线连接
-                    for i in range(0, len(new_coords), 2):
-                        nxt = (new_coords[i], new_coords[i+1])
-                        seg = _sample_line(current, nxt)
-                        sampled.extend(seg[1:])
-                        current = nxt
-
-        # 对采样点应用网格变形并构建路径（M + 多个L）
-        if not sampled:
-            return match.group(0)
-        deformed = [deform_point(px, py, grid_state) for (px, py) in sampled]
-        # 构建致密折线路径
-        d_parts = []
-        first = deformed[0]
-        d_parts.append(f'M{first[0]:.4f} {first[1]:.4f}')
-        for (x, y) in deformed[1:]:
-            d_parts.append(f'L{x:.4f} {y:.4f}')
-        return f'd="{"".join(d_parts)}"'
-    
-    def transform_path_data_single_quote(match):
-        # 复用相同的致密采样逻辑
-        double_match_like = type('obj', (object,), {'group': lambda self, idx: f'd="{match.group(1)}"' })()
-        converted = transform_path_data(re.match(r'd="([^"]*)"', double_match_like.group(0))) if False else None
-        # 直接调用上面的双引号处理：
-        return transform_path_data(type('obj', (object,), {'group': lambda self, idx: match.group(idx) })())
-    
-    # 替换所有path元素的d属性（支持单引号和双引号）
-    result = re.sub(r'd="([^"]*)"', transform_path_data, svg_content)
-    result = re.sub(r"d='([^']*)'", transform_path_data_single_quote, result)
+                segs.append((current, pts[0], pts[1], pts[2]))
+            current = pts[-1]
+
+        parts = []
+        for seg_list, closed, p0 in subpaths:
+            if not seg_list:
+                point = deform(np.array([p0], dtype=float))
+                grow(point)
+                parts.append(encode_polyline(point, pixel_size=pixel_size))
+                continue
+            deformed = flatten_deformed(np.array(seg_list, dtype=float), deform,
+                                        tolerance=FLATNESS_PX * pixel_size)
+            grow(deformed)
+            parts.append(fit_path_d(deformed, pixel_size=pixel_size, closed=closed))
+        if parts:
+            el.set_path("".join(parts))
+
+    # 单遍扫描文档：基本形状与各种写法的 d 属性（单/双引号）一并变形
+    result = rewrite_svg(svg_content, [deform_element])
     
     # 应用裁剪逻辑：移动裁剪中心到文字中心，确保固定尺寸
     try:
-        result = apply_cropping_logic(result)
+        result = apply_cropping_logic(result, bounds=tuple(float(v) for v in extent) if np.isfinite(extent[0]) else None)
     except Exception as e:
         print(f"[CROP_DEBUG] 裁剪失败，返回原始变形结果: {e}")
+        _mark_fallback()
         # 如果裁剪失败，至少确保SVG有基本的尺寸属性
         if 'width=' not in result and 'height=' not in result:
             result = re.sub(r'<svg([^>]*?)>', r'<svg\1 width="256" height="256">', result)
@@ -683,18 +871,15 @@ def apply_grid_deformation_to_svg(svg_content: str,
         try:
             import io
             import base64
-            try:
-                import cairosvg
-            except ImportError:
-                print('[RASTER] 警告: 未安装cairosvg，返回矢量SVG')
-                return result
             from PIL import Image
+            from src.raster import svg_to_image
             Resampling = getattr(Image, 'Resampling', Image)
             # 高分辨率渲染
-            png_data = cairosvg.svg2png(bytestring=result.encode('utf-8'),
-                                        output_width=supersample,
-                                        output_height=supersample)
-            img = Image.open(io.BytesIO(png_data)).convert('RGBA')
+            img = svg_to_image(result, supersample, supersample)
+            if img is None:
+                print('[RASTER] 警告: SVG无法栅格化，返回矢量SVG')
+                _mark_fallback()
+                return result
             # 下采样（双线性）
             # 与窗口Canvas观感对齐：使用双线性缩放
             img_small = img.resize((final_size, final_size), resample=Resampling.BILINEAR)
@@ -713,6 +898,7 @@ def apply_grid_deformation_to_svg(svg_content: str,
             return wrapper
         except Exception as e:
             print(f"[RASTER] 栅格化失败，返回矢量SVG: {e}")
+            _mark_fallback()
             return result
     else:
         return result
@@ -720,55 +906,26 @@ def apply_grid_deformation_to_svg(svg_content: str,
 
 def calculate_svg_bounds(svg_content: str) -> Tuple[float, float, float, float]:
     """
-    计算SVG内容的边界框
+    计算SVG内容的边界框（几何元素的端点与控制点，背景矩形除外）
     
     Returns:
         (min_x, min_y, max_x, max_y)
     """
-    import re
-    
-    # 提取所有路径数据
-    path_data_list = re.findall(r'd="([^"]*)"', svg_content) + re.findall(r"d='([^']*)'", svg_content)
-    
-    if not path_data_list:
-        print("[CROP_DEBUG] 警告: 未找到任何路径数据")
-        return (0, 0, 256, 256)  # 返回默认边界
-    
-    min_x = min_y = float('inf')
-    max_x = max_y = float('-inf')
-    
-    for path_data in path_data_list:
-        try:
-            commands = parse_svg_path(path_data)
-            
-            for cmd_type, coords in commands:
-                # 处理坐标对
-                for i in range(0, len(coords), 2):
-                    if i + 1 < len(coords):
-                        x, y = coords[i], coords[i + 1]
-                        if not (math.isnan(x) or math.isnan(y) or math.isinf(x) or math.isinf(y)):
-                            min_x = min(min_x, x)
-                            min_y = min(min_y, y)
-                            max_x = max(max_x, x)
-                            max_y = max(max_y, y)
-        except Exception as e:
-            print(f"[CROP_DEBUG] 解析路径数据时出错: {e}")
-            continue
-    
-    # 检查是否找到有效边界
-    if min_x == float('inf') or min_y == float('inf'):
-        print("[CROP_DEBUG] 警告: 未找到有效坐标，使用默认边界")
+    bounds = svg_bounds(svg_content)
+    if bounds is None:
+        print("[CROP_DEBUG] 警告: 未找到任何路径数据，使用默认边界")
         return (0, 0, 256, 256)
-    
-    return (min_x, min_y, max_x, max_y)
+    return bounds
 
 
-def apply_cropping_logic(svg_content: str) -> str:
+def apply_cropping_logic(svg_content: str, bounds: Optional[Tuple[float, float, float, float]] = None) -> str:
     """
     应用裁剪逻辑：移动裁剪中心到文字中心，确保固定尺寸，取消边界限制
     
     Args:
         svg_content: 变形后的SVG内容
+        bounds: 生成阶段由几何数组得到的内容边界 (min_x, min_y, max_x, max_y)；
+                缺省时解析 SVG 计算
     
     Returns:
         裁剪后的SVG内容
@@ -776,7 +933,7 @@ def apply_cropping_logic(svg_content: str) -> str:
     print("[CROP_DEBUG] 开始应用裁剪逻辑")
     
     # 计算文字的实际边界
-    min_x, min_y, max_x, max_y = calculate_svg_bounds(svg_content)
+    min_x, min_y, max_x, max_y = bounds if bounds is not None else calculate_svg_bounds(svg_content)
     
     # 计算文字中心
     text_center_x = (min_x + max_x) / 2
@@ -1009,10 +1166,12 @@ def load_grid_state_from_request(request_data: Dict[str, Any]) -> Optional[Dict[
 
 def apply_image_based_grid_deformation(svg_content: str, grid_state: Dict[str, Any], 
                                      canvas_dimensions: Dict[str, int] = None,
-                                     supersample: int = 3, final_size: int = 256) -> str:
+                                     supersample: int = 3, final_size: int = 256,
+                                     method: str = 'mesh', quality: str = 'normal') -> str:
     """
     图像级网格变形 - 与前端算法一致
     使用与前端相同的Catmull-Rom + Coons Patch算法
+    method/quality 见 apply_catmull_rom_coons_deformation（默认 Pillow MESH 快速路径）
     """
     import sys
     print(f"[IMAGE_DEFORM] 🚀 开始图像级网格变形", flush=True)
@@ -1021,36 +1180,33 @@ def apply_image_based_grid_deformation(svg_content: str, grid_state: Dict[str, A
     if not grid_state or not has_grid_deformation(grid_state):
         print("[IMAGE_DEFORM] 无网格变形，返回原始SVG", flush=True)
         return svg_content
+    if method == 'mesh':
+        mesh_cells(quality)  # 参数错误直接报出，不混入下面的失败回退
     
     try:
         # 导入依赖
-        try:
-            import cairosvg
-        except ImportError:
-            print('[IMAGE_DEFORM] 警告: 未安装cairosvg，回退到路径级变形')
-            return apply_grid_deformation_to_svg(svg_content, grid_state, canvas_dimensions)
-        
         try:
             from PIL import Image
+            from src.raster import svg_to_image
         except ImportError:
             print('[IMAGE_DEFORM] 警告: 未安装PIL，回退到路径级变形')
+            _mark_fallback()
             return apply_grid_deformation_to_svg(svg_content, grid_state, canvas_dimensions)
         
-        # 步骤1: SVG转为高分辨率图像
+        # 步骤1: SVG转为高分辨率图像（原生栅格化，不支持的内容才走cairosvg）
         print("[IMAGE_DEFORM] 步骤1: SVG转高分辨率图像")
         base_size = final_size * supersample
-        png_data = cairosvg.svg2png(
-            bytestring=svg_content.encode('utf-8'),
-            output_width=base_size,
-            output_height=base_size
-        )
-        source_img = Image.open(io.BytesIO(png_data)).convert('RGBA')
+        source_img = svg_to_image(svg_content, base_size, base_size)
+        if source_img is None:
+            print('[IMAGE_DEFORM] 警告: SVG无法栅格化，回退到路径级变形')
+            _mark_fallback()
+            return apply_grid_deformation_to_svg(svg_content, grid_state, canvas_dimensions)
         print(f"[IMAGE_DEFORM] 源图像尺寸: {source_img.size}")
         
         # 步骤2: 应用网格变形
         print("[IMAGE_DEFORM] 步骤2: 应用网格变形")
         deformed_img = apply_catmull_rom_coons_deformation(
-            source_img, grid_state, canvas_dimensions, base_size
+            source_img, grid_state, canvas_dimensions, base_size, method=method, quality=quality
         )
         
         # 步骤3: 下采样到目标尺寸
@@ -1085,14 +1241,132 @@ def apply_image_based_grid_deformation(svg_content: str, grid_state: Dict[str, A
     except Exception as e:
         print(f"[IMAGE_DEFORM] ❌ 图像级变形失败: {e}")
         print(f"[IMAGE_DEFORM] 回退到路径级变形")
+        _mark_fallback()
         return apply_grid_deformation_to_svg(svg_content, grid_state, canvas_dimensions)
 
 
+# Pillow MESH 快速路径的网格密度（每边单元数）：四边形内按双线性映射，单元越密越贴近 Coons 曲面
+MESH_QUALITY = {'draft': 16, 'normal': 48, 'high': 128}
+
+
+def mesh_cells(quality) -> int:
+    """quality（MESH_QUALITY 的键或正整数单元数）-> 每边单元数；无法识别时抛出 ValueError"""
+    if isinstance(quality, str):
+        if quality not in MESH_QUALITY:
+            raise ValueError(f"未知的网格变形质量: {quality!r}（可选 {', '.join(MESH_QUALITY)} 或正整数）")
+        return MESH_QUALITY[quality]
+    if isinstance(quality, (int, np.integer)) and not isinstance(quality, bool) and quality > 0:
+        return int(quality)
+    raise ValueError(f"未知的网格变形质量: {quality!r}（可选 {', '.join(MESH_QUALITY)} 或正整数）")
+
+
 def apply_catmull_rom_coons_deformation(source_img, grid_state: Dict[str, Any], 
                                        canvas_dimensions: Dict[str, int] = None, 
-                                       img_size: int = 768):
+                                       img_size: int = 768,
+                                       method: str = 'mesh',
+                                       quality: str = 'normal'):
+    """
+    应用Catmull-Rom + Coons Patch变形算法（与前端一致）
+    method='mesh'：把变形细分为四边形网格交给 Pillow 的 MESH 变换（C 实现），密度由 quality 决定；
+    method='inverse'：由烘焙位移场逐像素求源坐标，再对整幅 RGBA 图做一次数组采样。
+    """
+    from PIL import Image
+    
+    if method == 'mesh':
+        mesh_cells(quality)  # 参数错误在做任何变形之前报出
+    size = grid_state.get('size', 4)
+    control_points = grid_state.get('controlPoints', [])
+    if not control_points or len(control_points) != size * size:
+        return source_img
+    field = get_deformation_field(grid_state)
+    if field is None:
+        return source_img
+    
+    print(f"[DEFORM_DEBUG] 源图像尺寸: {source_img.size}, 目标尺寸: {img_size}, 方式: {method}/{quality}")
+    if source_img.size != (img_size, img_size):
+        source_img = source_img.resize((img_size, img_size))
+    if method == 'mesh':
+        return mesh_warp_image(source_img, field, img_size, canvas_dimensions, quality)
+    return Image.fromarray(inverse_warp_image(np.asarray(source_img), field, img_size, canvas_dimensions))
+
+
+def _warp_source_coords(field: 'DeformationField', xs: np.ndarray, ys: np.ndarray, img_size: int,
+                        canvas_dimensions: Dict[str, int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    目标图像素坐标 -> 源图像素坐标 (sx, sy, 有效掩码)。
+    源图覆盖整个网格（u, v ∈ [0,1]），目标图对应前端网格中央 80% 的 SVG 区域
+    （与 apply_catmull_rom_coons_deformation_reference 的三角形正向映射一致）。
+    """
+    if canvas_dimensions:
+        canvas_width = canvas_dimensions.get('width', 800)
+        canvas_height = canvas_dimensions.get('height', 600)
+    else:
+        canvas_width, canvas_height = GridDeformer.CANVAS
+    svg_extent = GridDeformer.GRID_EXTENT * GridDeformer.SVG_RATIO
+    # 目标像素 -> 前端画布坐标 -> 位移场所用的 SVG 坐标（场以 800×600 画布烘焙）
+    area_start = np.array([canvas_width / 2 - svg_extent / 2, canvas_height / 2 - svg_extent / 2])
+    field_start = np.array([GridDeformer.CANVAS[0] / 2 - svg_extent / 2, GridDeformer.CANVAS[1] / 2 - svg_extent / 2])
+    offset = (area_start - field_start) / svg_extent * 256.0
+    targets = np.stack([offset[0] + xs * (256.0 / img_size), offset[1] + ys * (256.0 / img_size)], axis=-1)
+    src, valid = field.invert_svg(targets)
+    # SVG 坐标 -> 源图像素（网格全域 = 整幅源图）
+    extent = field.step * (field.resolution - 1)
+    sx = (src[..., 0] - field.origin[0]) / extent * img_size
+    sy = (src[..., 1] - field.origin[1]) / extent * img_size
+    return sx, sy, valid
+
+
+def inverse_warp_image(source_array: np.ndarray, field: 'DeformationField', img_size: int,
+                       canvas_dimensions: Dict[str, int] = None) -> np.ndarray:
+    """逆映射变形整幅图像：逐像素求源坐标后双线性采样，网格外的像素保持透明"""
+    ys, xs = np.mgrid[0:img_size, 0:img_size].astype(float)
+    sx, sy, valid = _warp_source_coords(field, xs, ys, img_size, canvas_dimensions)
+    ix, iy = np.floor(sx).astype(np.int64), np.floor(sy).astype(np.int64)
+    valid &= (ix >= 0) & (ix < img_size - 1) & (iy >= 0) & (iy < img_size - 1)
+    ix, iy = np.where(valid, ix, 0), np.where(valid, iy, 0)
+    fx, fy = (sx - ix)[..., None], (sy - iy)[..., None]
+    S = source_array.astype(np.float32)
+    out = ((S[iy, ix] * (1 - fx) + S[iy, ix + 1] * fx) * (1 - fy) +
+           (S[iy + 1, ix] * (1 - fx) + S[iy + 1, ix + 1] * fx) * fy)
+    out[~valid] = 0
+    return out.astype(np.uint8)
+
+
+def mesh_warp_image(source_img, field: 'DeformationField', img_size: int,
+                    canvas_dimensions: Dict[str, int] = None, quality: str = 'normal'):
+    """
+    Pillow MESH 变换：目标图切成 n×n 个矩形，每个矩形四角逆映射回源图得到四边形，
+    由 Pillow 在 C 中按四边形双线性映射采样。源四边形落到源图外的部分保持透明。
+    """
+    from PIL import Image
+    n = min(mesh_cells(quality), img_size)
+    nodes = np.round(np.linspace(0, img_size, n + 1)).astype(int)
+    # Pillow 以像素边为坐标（像素中心在 +0.5），逆映射沿用像素中心为整数的约定
+    X, Y = np.meshgrid(nodes - 0.5, nodes - 0.5)
+    sx, sy, _ = _warp_source_coords(field, X, Y, img_size, canvas_dimensions)
+    sx, sy = sx + 0.5, sy + 0.5
+    mesh = []
+    for j in range(n):
+        for i in range(n):
+            box = (int(nodes[i]), int(nodes[j]), int(nodes[i + 1]), int(nodes[j + 1]))
+            if box[0] == box[2] or box[1] == box[3]:
+                continue
+            # 四边形顺序：左上、左下、右下、右上
+            quad = (sx[j, i], sy[j, i], sx[j + 1, i], sy[j + 1, i],
+                    sx[j + 1, i + 1], sy[j + 1, i + 1], sx[j, i + 1], sy[j, i + 1])
+            mesh.append((box, tuple(float(v) for v in quad)))
+    img = source_img.convert('RGBA')
+    Resampling = getattr(Image, 'Resampling', Image)
+    Transform = getattr(Image, 'Transform', Image)
+    return img.transform((img_size, img_size), Transform.MESH, mesh, resample=Resampling.BILINEAR)
+
+
+def apply_catmull_rom_coons_deformation_reference(source_img, grid_state: Dict[str, Any], 
+                                                  canvas_dimensions: Dict[str, int] = None, 
+                                                  img_size: int = 768):
     """
     应用Catmull-Rom + Coons Patch变形算法（与前端一致）
+    逐单元细分为三角形、逐像素正向绘制的原始实现，仅作为对照参考（很慢）。
     """
     from PIL import Image, ImageDraw
     import numpy as np
@@ -1295,7 +1569,8 @@ def apply_catmull_rom_coons_deformation(source_img, grid_state: Dict[str, Any],
                              dst_quad[3], dst_quad[2], dst_quad[1])
                         ]
                         
-                        for src_tri, dst_tri in triangles:
+                        for tri in triangles:
+                            src_tri, dst_tri = tri[:3], tri[3:]
                             draw_image_triangle_affine_numpy(
                                 source_array, output_array, img_size,
                                 src_tri[0], src_tri[1], src_tri[2],
@@ -1401,8 +1676,8 @@ def draw_image_triangle_affine_numpy(source_array, output_array, img_size,
                 inv_m21 = -m21 * inv_m_det
                 inv_m22 = m11 * inv_m_det
                 
-                src_x = inv_m11 * dst_x + inv_m12 * dst_y + sx0
-                src_y = inv_m21 * dst_x + inv_m22 * dst_y + sy0
+                src_x = inv_m11 * dst_x + inv_m12 * dst_y
+                src_y = inv_m21 * dst_x + inv_m22 * dst_y
                 
                 # 双线性插值采样
                 src_x_int = int(src_x)
@@ -1431,7 +1706,8 @@ def draw_image_triangle_affine_numpy(source_array, output_array, img_size,
 
 
 def apply_smooth_grid_deformation(svg_content: str, grid_state: Dict[str, Any], 
-                                 canvas_dimensions: Dict[str, int] = None) -> str:
+                                 canvas_dimensions: Dict[str, int] = None,
+                                 pixel_size: float = 1.0) -> str:
     """
     改进的平滑路径级变形 - 确保输出平滑
     """
@@ -1446,7 +1722,8 @@ def apply_smooth_grid_deformation(svg_content: str, grid_state: Dict[str, Any],
             svg_content, grid_state, canvas_dimensions, 
             rasterize=False,  # 不栅格化，保持矢量
             supersample=1,
-            final_size=256
+            final_size=256,
+            pixel_size=pixel_size
         )
         
         # 后处理：将密集折线转换为平滑曲线
@@ -1457,46 +1734,43 @@ def apply_smooth_grid_deformation(svg_content: str, grid_state: Dict[str, Any],
         
     except Exception as e:
         print(f"[SMOOTH_DEFORM] ❌ 平滑变形失败: {e}")
+        _mark_fallback()
         return svg_content
 
 
+# 曲线采样得到的折线：相邻顶点间距不超过该值（输出像素）且没有拐角
+FLATTENED_SEGMENT_PX = 2.0
+
+
+def _is_flattened_curve(points: np.ndarray) -> bool:
+    """折线是否为曲线的密集采样。拟合只约束顶点处的误差，稀疏的直线段折线重新拟合后会在顶点之间鼓出，不能参与。"""
+    if len(points) < 4:
+        return False
+    seg = np.hypot(*np.diff(points, axis=0).T)
+    return bool(seg.max() <= FLATTENED_SEGMENT_PX) and not len(corner_indices(points, 35.0))
+
+
 def smooth_svg_paths(svg_content: str) -> str:
     """
-    将SVG中的密集折线转换为平滑曲线
+    将SVG中由曲线采样得到的密集折线拟合为三次贝塞尔曲线
+    （已含曲线命令的路径视为已拟合，直线段折线保持原样）
     """
-    import re
-    
-    def smooth_path_data(match):
-        path_data = match.group(1)
-        
-        # 提取所有L命令的坐标点
-        points = []
-        l_commands = re.findall(r'L([\d.-]+)\s+([\d.-]+)', path_data)
-        
-        if len(l_commands) < 3:
-            return match.group(0)  # 点太少，不处理
-        
-        # 获取起点
-        m_match = re.search(r'M([\d.-]+)\s+([\d.-]+)', path_data)
-        if m_match:
-            start_x, start_y = float(m_match.group(1)), float(m_match.group(2))
-            points.append((start_x, start_y))
-        
-        # 添加所有L命令的点
-        for x_str, y_str in l_commands:
-            points.append((float(x_str), float(y_str)))
-        
-        if len(points) < 4:
-            return match.group(0)
-        
-        # 使用三次贝塞尔曲线拟合
-        smooth_path = create_smooth_curve(points)
-        
-        return f'd="{smooth_path}"'
+    def smooth_path(el):
+        if el.tag != 'path' or any(cmd in ('C', 'Q') for cmd, _ in el.commands):
+            return
+        subpaths = path_subpaths(el.get('d', ''))
+        if not any(_is_flattened_curve(sub) for sub, _ in subpaths):
+            return
+        parts = []
+        for sub, closed in subpaths:
+            if _is_flattened_curve(sub):
+                parts.append(create_smooth_curve(sub.tolist(), closed=closed))
+            else:
+                parts.append(encode_polyline(np.array([clamp_point(p) for p in sub.tolist()]), pixel_size=1.0, closed=closed))
+        if parts:
+            el.set_path("".join(parts))
     
-    # 替换所有路径数据
-    result = re.sub(r'd="([^"]*)"', smooth_path_data, svg_content)
-    return result
+    return rewrite_svg(svg_content, [smooth_path])
 
 
 def clamp_point(point):
@@ -1511,54 +1785,10 @@ def clamp_point(point):
     return (safe_x, safe_y)
 
 
-def create_smooth_curve(points):
+def create_smooth_curve(points, closed: bool = False):
     """
-    从点列表创建平滑的三次贝塞尔曲线 - 带坐标安全限制的版本
+    从点列表拟合平滑的三次贝塞尔曲线（Schneider 误差受控拟合，误差 <= 0.25px）- 带坐标安全限制的版本
     """
     # 首先对所有输入点进行坐标限制
-    clamped_points = [clamp_point(p) for p in points]
-    
-    if len(clamped_points) < 4:
-        # 点太少，返回直线（使用限制后的点）
-        path_parts = [f"M{clamped_points[0][0]:.1f},{clamped_points[0][1]:.1f}"]
-        for i in range(1, len(clamped_points)):
-            path_parts.append(f"L{clamped_points[i][0]:.1f},{clamped_points[i][1]:.1f}")
-        return " ".join(path_parts)
-    
-    # 简化：每隔几个点才创建一个贝塞尔段，减少复杂度
-    step = max(1, len(clamped_points) // 15)  # 最多15个贝塞尔段，提高性能
-    simplified_points = [clamped_points[i] for i in range(0, len(clamped_points), step)]
-    if simplified_points[-1] != clamped_points[-1]:
-        simplified_points.append(clamped_points[-1])  # 确保包含终点
-    
-    if len(simplified_points) < 4:
-        # 简化后点太少，返回直线
-        path_parts = [f"M{simplified_points[0][0]:.1f},{simplified_points[0][1]:.1f}"]
-        for i in range(1, len(simplified_points)):
-            path_parts.append(f"L{simplified_points[i][0]:.1f},{simplified_points[i][1]:.1f}")
-        return " ".join(path_parts)
-    
-    path_parts = [f"M{simplified_points[0][0]:.1f},{simplified_points[0][1]:.1f}"]
-    
-    # 使用简化的三次贝塞尔曲线
-    for i in range(len(simplified_points) - 1):
-        p1 = simplified_points[i]
-        p2 = simplified_points[i + 1]
-        
-        # 简单的控制点计算：在两点间1/3和2/3处
-        cp1_x = p1[0] + (p2[0] - p1[0]) * 0.33
-        cp1_y = p1[1] + (p2[1] - p1[1]) * 0.33
-        cp2_x = p1[0] + (p2[0] - p1[0]) * 0.67
-        cp2_y = p1[1] + (p2[1] - p1[1]) * 0.67
-        
-        # 确保控制点在合理范围内 - 使用更宽松的范围避免截断
-        cp1_x = max(-500, min(800, cp1_x))
-        cp1_y = max(-500, min(800, cp1_y))
-        cp2_x = max(-500, min(800, cp2_x))
-        cp2_y = max(-500, min(800, cp2_y))
-        p2_x = max(-500, min(800, p2[0]))
-        p2_y = max(-500, min(800, p2[1]))
-        
-        path_parts.append(f"C{cp1_x:.1f},{cp1_y:.1f} {cp2_x:.1f},{cp2_y:.1f} {p2_x:.1f},{p2_y:.1f}")
-    
-    return " ".join(path_parts)
+    clamped_points = np.array([clamp_point(p) for p in points], dtype=float)
+    return fit_path_d(clamped_points, pixel_size=1.0, closed=closed)
@@ -0,0 +1,124 @@
+"""
+逐字网格扰动（自然书写变化）
+
+同一篇文章里每个字都用同一个 grid_state 会显得过于整齐。这里由一个种子派生 K 组控制点小扰动，
+每组烘焙为低分辨率位移场并叠成一个 (K, R, R, 2) 数组；任意多个字形、任意变体编号的点
+一次双线性查表完成变形，变体数与字数无关。
+
+不给 grid_state 时扰动作用于标准网格（即一个小幅抖动场），用于叠加在已经按全局网格变形过的字形上；
+给定 grid_state 时扰动作用于其控制点，用于未变形的字形。
+"""
+
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.svgdoc import commands_to_d, is_background_rect, iter_elements, rewrite_svg
+from web.services.grid_transform import GridDeformer
+
+VARIATION_RESOLUTION = 33   # 网格全域约 320 SVG 像素，步长 10px；扰动场很平滑，低分辨率足够
+DEFAULT_VARIANTS = 8
+MAX_VARIANTS = 32           # 每个变体烘焙一个场，字形控制点按变体数平铺：请求参数须限制在此以内
+
+
+class GridVariation:
+    """由 seed 派生 variants 组控制点扰动（正态分布，标准差 amplitude 个网格画布像素，截断到 ±2.5σ）。"""
+
+    def __init__(self, seed: int = 0, variants: int = DEFAULT_VARIANTS, amplitude: float = 3.0,
+                 grid_state: Optional[Dict[str, Any]] = None, size: int = 4,
+                 resolution: int = VARIATION_RESOLUTION):
+        base = GridDeformer.from_grid_state(grid_state) if grid_state else None
+        if base is None:
+            n = max(2, int(size))
+            step = GridDeformer.GRID_EXTENT / (n - 1)
+            x0 = GridDeformer.CANVAS[0] / 2 - GridDeformer.GRID_EXTENT / 2
+            y0 = GridDeformer.CANVAS[1] / 2 - GridDeformer.GRID_EXTENT / 2
+            ys, xs = np.mgrid[0:n, 0:n]
+            corners = np.stack([x0 + xs * step, y0 + ys * step], axis=-1).astype(float)
+        else:
+            n, corners = base.size, base.corners
+        self.seed = int(seed)
+        self.variants = min(MAX_VARIANTS, max(1, int(variants)))
+        self.amplitude = float(amplitude)
+        rng = np.random.default_rng(self.seed)
+        offsets = np.clip(rng.normal(0.0, self.amplitude, (self.variants, n, n, 2)),
+                          -2.5 * self.amplitude, 2.5 * self.amplitude)
+        fields = [GridDeformer(corners + off, n).bake(resolution) for off in offsets]
+        self.origin = fields[0].origin
+        self.step = fields[0].step
+        self.resolution = resolution
+        # 各变体位移平面首尾相接：变体 k 的 (iy, ix) 位于 k*R*R + iy*R + ix
+        disp = np.stack([f.displacement for f in fields])            # (K, R, R, 2)
+        self._planes = (np.ascontiguousarray(disp[..., 0]).ravel(),
+                        np.ascontiguousarray(disp[..., 1]).ravel())
+        # 任意变体下单个坐标的最大位移（SVG 单位；双线性插值不会超出采样值），排版时按此外扩包围盒
+        self.margin = float(max(np.abs(p).max() for p in self._planes))
+
+    @property
+    def nbytes(self) -> int:
+        return self._planes[0].nbytes * 2
+
+    def deform(self, points: np.ndarray, variant) -> np.ndarray:
+        """SVG 坐标 (N, 2) 按各自的变体编号（标量或 (N,)）变形，一次查表完成。"""
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        R = self.resolution
+        hi = R - 1
+        f = np.clip((pts - self.origin) / self.step, 0.0, hi)
+        ix = np.minimum(f[:, 0].astype(np.int64), hi - 1)
+        iy = np.minimum(f[:, 1].astype(np.int64), hi - 1)
+        tx, ty = f[:, 0] - ix, f[:, 1] - iy
+        k = (np.asarray(variant, dtype=np.int64) % self.variants) * (R * R) + iy * R + ix
+        out = []
+        for plane in self._planes:
+            a, b = plane[k], plane[k + 1]
+            c, d = plane[k + R], plane[k + R + 1]
+            top, bottom = a + tx * (b - a), c + tx * (d - c)
+            out.append(top + ty * (bottom - top))
+        return np.clip(self.origin + f * self.step + np.stack(out, axis=-1), -500.0, 800.0)
+
+    def deform_batch(self, glyphs: Sequence[np.ndarray], variants: Iterable[int]) -> List[np.ndarray]:
+        """一批字形（各为 (n_i, 2) 点数组）各取一个变体，拼接后一次变形再拆回。"""
+        if not glyphs:
+            return []
+        counts = [len(g) for g in glyphs]
+        pts = np.concatenate([np.asarray(g, dtype=float).reshape(-1, 2) for g in glyphs])
+        out = self.deform(pts, np.repeat(np.asarray(list(variants), dtype=np.int64), counts))
+        return np.split(out, np.cumsum(counts)[:-1])
+
+    def variant_markups(self, markup: str) -> List[str]:
+        """
+        字形 SVG 片段的全部变体（下标即变体编号）。
+        片段只扫描一次；所有几何元素的端点与控制点复制 K 份作为一批（deform_batch）一次变形，再逐变体写回。
+        扰动场平滑且幅度小，直接移动贝塞尔控制点即可，不必重新展平拟合。
+        """
+        shapes = []      # (元素下标, 命令名列表, 每条命令的点数)
+        chunks = []
+        for i, (_, _, el) in enumerate(iter_elements(markup)):
+            if not el.is_shape or is_background_rect(el) or not el.commands:
+                continue
+            cmds = el.commands
+            shapes.append((i, [c for c, _ in cmds], [len(p) for _, p in cmds]))
+            chunks.append(np.asarray([p for _, ps in cmds for p in ps], dtype=float).reshape(-1, 2))
+        if not chunks:
+            return [markup] * self.variants
+        pts = np.concatenate(chunks)
+        moved = self.deform_batch([pts] * self.variants, range(self.variants))
+        out = []
+        for v in range(self.variants):
+            ds = {}
+            pos = 0
+            for i, names, counts in shapes:
+                cmds = []
+                for name, c in zip(names, counts):
+                    cmds.append((name, [tuple(p) for p in moved[v][pos:pos + c].tolist()]))
+                    pos += c
+                ds[i] = commands_to_d(cmds)
+            index = itertools.count()
+
+            def visit(el, ds=ds, index=index):
+                d = ds.get(next(index))
+                if d is not None:
+                    el.set_path(d)
+            out.append(rewrite_svg(markup, [visit]))
+        return out